@@ -0,0 +1,104 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# --- Hằng số Cấu hình ---
+FORECAST_TIMEOUT_SECONDS = 120
+
+
+def fit_prophet_forecast(timestamps_ms, values, periods_minutes):
+    """
+    Huấn luyện Prophet và dự báo tải nhiệt. Hàm này chạy trong tiến trình con
+    nên pandas/prophet chỉ được import ở đây, không làm nặng tiến trình web.
+    Trả về dict thuần (picklable) để gửi ngược về vòng lặp mô phỏng.
+    """
+    import pandas as pd
+    from prophet import Prophet
+
+    started = time.perf_counter()
+    df = pd.DataFrame({'ds': pd.to_datetime(timestamps_ms, unit='ms'), 'y': values})
+
+    m = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=True).fit(df)
+    future_df = m.make_future_dataframe(periods=periods_minutes, freq='min')
+    forecast = m.predict(future_df)
+
+    future_forecast = forecast[forecast['ds'] > df['ds'].iloc[-1]]
+    # Đường dự báo được lấy mẫu mỗi 10 phút để gửi về tiến trình chính.
+    curve = future_forecast.iloc[9::10]
+    return {
+        "current_load": float(df['y'].iloc[-1]),
+        "max_predicted_load": float(future_forecast['yhat'].max()),
+        "curve": [[int(ts.value // 1_000_000), round(float(y), 2)] for ts, y in zip(curve['ds'], curve['yhat'])],
+        "fit_seconds": time.perf_counter() - started,
+    }
+
+
+class ForecastWorker:
+    """
+    Pool một tiến trình dành riêng cho việc dự báo, đảm bảo chỉ có tối đa
+    một job đang chạy. Vòng lặp mô phỏng gọi `poll()` mỗi tick để lấy kết quả
+    mà không bao giờ bị chặn.
+    """
+    def __init__(self, timeout_s=FORECAST_TIMEOUT_SECONDS):
+        self.timeout_s = timeout_s
+        self._executor = None
+        self._future = None
+        self._submitted_at = 0
+
+    @property
+    def busy(self):
+        return self._future is not None
+
+    def submit(self, fn, *args):
+        """Gửi một job dự báo. Trả về False nếu đang có job khác chạy."""
+        if self.busy:
+            return False
+        if self._executor is None:
+            # "spawn" tránh fork một tiến trình đang chạy event loop và nhiều luồng.
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self._future = self._executor.submit(fn, *args)
+        self._submitted_at = time.monotonic()
+        return True
+
+    def poll(self):
+        """
+        Kiểm tra job hiện tại, không chặn.
+        Trả về kết quả nếu job vừa hoàn tất, ngược lại trả về None.
+        Job lỗi hoặc quá hạn `timeout_s` sẽ bị hủy và bỏ qua.
+        """
+        if self._future is None:
+            return None
+
+        if not self._future.done():
+            if time.monotonic() - self._submitted_at > self.timeout_s:
+                print(f"Job dự báo vượt quá {self.timeout_s} giây, đang hủy...")
+                self.cancel()
+            return None
+
+        future, self._future = self._future, None
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Job dự báo thất bại: {e!r}")
+            return None
+
+    def cancel(self):
+        """Hủy job đang chạy. Tiến trình con bị dừng hẳn vì Prophet không thể ngắt giữa chừng."""
+        if self._future is None:
+            return
+        if not self._future.cancel():
+            self._terminate_executor()
+        self._future = None
+
+    def shutdown(self):
+        self._future = None
+        self._terminate_executor()
+
+    def _terminate_executor(self):
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # ProcessPoolExecutor không có API public để dừng tiến trình đang chạy job.
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,186 @@
+import math
+
+import numpy as np
+
+# --- Hằng số Cấu hình mặc định ---
+EWMA_ALPHA = 0.05
+WARMUP_SAMPLES = 30
+ZSCORE_ON = 4.0
+ZSCORE_OFF = 2.0
+CUSUM_K = 0.5   # Độ lệch cho phép, tính theo số lần độ lệch chuẩn
+CUSUM_H = 8.0   # Ngưỡng báo động, tính theo số lần độ lệch chuẩn
+MIN_STD = 1e-3
+
+RULES = ("duration", "zscore", "cusum")
+
+
+class StreamingAnomalyDetector:
+    """
+    Phát hiện bất thường dạng luồng cho nhiều tín hiệu cùng lúc.
+
+    Mỗi tín hiệu có ba luật, trạng thái của tất cả tín hiệu nằm trong các mảng
+    NumPy nên mỗi mẫu chỉ tốn chi phí hằng số và cả tick được xử lý vector hóa:
+    - "duration": giá trị nằm ngoài [low, high] liên tục ít nhất `duration_s` giây;
+    - "zscore": |z| so với trung bình/phương sai EWMA vượt `zscore_on`;
+    - "cusum": tổng tích lũy hai phía (CUSUM) vượt `cusum_h` độ lệch chuẩn.
+
+    Báo động được khóa theo (tín hiệu, luật) và có trễ (hysteresis): một báo động
+    chỉ được phát một lần khi bật và chỉ tắt khi tín hiệu trở lại vùng an toàn.
+    Giá trị NaN nghĩa là tín hiệu không có mẫu ở tick này và bị bỏ qua.
+
+    Với `rows`, bộ phát hiện theo dõi cùng các tín hiệu đó cho `rows` nguồn (ví dụ mỗi
+    kho trong đội kho một hàng): mỗi lần cập nhật nhận một ma trận (rows, số tín hiệu)
+    và mỗi báo động có thêm khóa "row". Không có `rows` (một nguồn, vài tín hiệu), trạng
+    thái nằm trong list số thực và được cập nhật bằng vòng lặp thuần Python, cùng công
+    thức với bản vector hóa nhưng không tốn hàng chục lần gọi NumPy trên mảng vài phần tử
+    mỗi tick (chế độ chạy lô gọi hàng triệu lần).
+    """
+    def __init__(self, signals, rows=None):
+        self.signals = [spec["name"] for spec in signals]
+        self.specs = signals
+        self.rows = rows
+        n = len(signals) if rows is None else (rows, len(signals))
+
+        def param(key, default):
+            return np.array([spec.get(key, default) for spec in signals], dtype=np.float64)
+
+        self.high = param("high", np.nan)
+        self.low = param("low", np.nan)
+        self.clear_margin = param("clear_margin", 0.0)
+        self.duration_s = param("duration_s", 0.0)
+        self.zscore_on = np.where(param("zscore", True) > 0, param("zscore_on", ZSCORE_ON), np.inf)
+        self.zscore_off = param("zscore_off", ZSCORE_OFF)
+        self.cusum_h = np.where(param("cusum", False) > 0, param("cusum_h", CUSUM_H), np.inf)
+        self.cusum_k = param("cusum_k", CUSUM_K)
+        self.min_std = param("min_std", MIN_STD)
+        self.alpha = param("alpha", EWMA_ALPHA)
+
+        if rows is None:
+            self._params = list(zip(*(a.tolist() for a in (
+                self.high, self.low, self.clear_margin, self.duration_s, self.zscore_on, self.zscore_off,
+                self.cusum_h, self.cusum_k, self.min_std, self.alpha))))
+            # Mỗi tín hiệu: [mean, var, samples, out_of_band_s, cusum_hi, cusum_lo, báo động theo RULES].
+            self._state = [[math.nan, 0.0, 0, 0.0, 0.0, 0.0, [False] * len(RULES)] for _ in signals]
+            return
+        self.mean = np.full(n, np.nan)
+        self.var = np.zeros(n)
+        self.samples = np.zeros(n, dtype=np.int64)
+        self.out_of_band_s = np.zeros(n)
+        self.cusum_hi = np.zeros(n)
+        self.cusum_lo = np.zeros(n)
+        self.active = {rule: np.zeros(n, dtype=bool) for rule in RULES}
+
+    def update(self, values, ts_ms, dt_s):
+        """
+        Nạp một mẫu cho mỗi tín hiệu. Trả về danh sách báo động vừa bật,
+        mỗi báo động là dict {signal, rule, value, score, timestamp}.
+        """
+        if self.rows is None:
+            return self._update_scalar(values, ts_ms, dt_s)
+        x = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(x)
+        with np.errstate(invalid="ignore"):
+            # Luật ngưỡng - thời gian.
+            outside = (x > self.high) | (x < self.low)
+            inside = (x <= self.high - self.clear_margin) | np.isnan(self.high)
+            inside &= (x >= self.low + self.clear_margin) | np.isnan(self.low)
+            self.out_of_band_s = np.where(outside, self.out_of_band_s + dt_s, np.where(present, 0.0, self.out_of_band_s))
+            duration_on = outside & (self.out_of_band_s >= self.duration_s)
+
+            # Z-score so với EWMA, đánh giá trước khi cập nhật để bất thường không tự che chính nó.
+            std = np.maximum(np.sqrt(self.var), self.min_std)
+            deviation = x - self.mean
+            z = np.abs(deviation) / std
+            warm = present & (self.samples >= WARMUP_SAMPLES)
+            zscore_on = warm & (z > self.zscore_on)
+
+            # CUSUM hai phía.
+            slack = self.cusum_k * std
+            self.cusum_hi = np.where(warm, np.maximum(0.0, self.cusum_hi + deviation - slack), self.cusum_hi)
+            self.cusum_lo = np.where(warm, np.maximum(0.0, self.cusum_lo - deviation - slack), self.cusum_lo)
+            cusum_score = np.maximum(self.cusum_hi, self.cusum_lo) / std
+            cusum_on = warm & (cusum_score > self.cusum_h)
+
+            # Cập nhật EWMA.
+            first = present & np.isnan(self.mean)
+            self.mean = np.where(first, x, self.mean)
+            deviation = np.where(first, 0.0, deviation)
+            alpha = np.where(present, self.alpha, 0.0)
+            self.mean = np.where(present, self.mean + alpha * deviation, self.mean)
+            self.var = np.where(present, (1 - alpha) * (self.var + alpha * deviation ** 2), self.var)
+            self.samples += present
+
+            triggers = {
+                "duration": (duration_on, present & inside, self.out_of_band_s),
+                "zscore": (zscore_on, present & (z < self.zscore_off), z),
+                "cusum": (cusum_on, present & (cusum_score < self.cusum_h / 2), cusum_score),
+            }
+
+        alerts = []
+        for rule, (on, clear, score) in triggers.items():
+            active = self.active[rule]
+            raised = on & ~active
+            self.active[rule] = (active & ~clear) | on
+            if not raised.any():
+                continue
+            for index in np.argwhere(raised).tolist():
+                i = index[-1]
+                alert = {
+                    "signal": self.signals[i], "rule": rule, "value": float(x[tuple(index)]),
+                    "score": round(float(score[tuple(index)]), 2), "timestamp": ts_ms,
+                }
+                if self.rows is not None:
+                    alert["row"] = index[0]
+                alerts.append(alert)
+        return alerts
+
+    def _update_scalar(self, values, ts_ms, dt_s):
+        """Như `update()` cho một nguồn, từng tín hiệu một bằng số thực Python."""
+        raised = []
+        for i, (x, params, state) in enumerate(zip(values, self._params, self._state)):
+            high, low, clear_margin, duration_s, zscore_on, zscore_off, cusum_h, cusum_k, min_std, alpha = params
+            mean, var, samples, out_of_band_s, cusum_hi, cusum_lo, active = state
+            x = float(x)
+            present = x == x
+
+            # Luật ngưỡng - thời gian (so sánh với NaN luôn sai, như ở bản vector hóa).
+            outside = x > high or x < low
+            inside = (x <= high - clear_margin or high != high) and (x >= low + clear_margin or low != low)
+            if outside:
+                out_of_band_s += dt_s
+            elif present:
+                out_of_band_s = 0.0
+            duration_on = outside and out_of_band_s >= duration_s
+
+            # Z-score và CUSUM so với EWMA trước khi cập nhật.
+            std = max(math.sqrt(var), min_std)
+            deviation = x - mean
+            z = abs(deviation) / std
+            warm = present and samples >= WARMUP_SAMPLES
+            if warm:
+                slack = cusum_k * std
+                cusum_hi = max(0.0, cusum_hi + deviation - slack)
+                cusum_lo = max(0.0, cusum_lo - deviation - slack)
+            cusum_score = max(cusum_hi, cusum_lo) / std
+
+            if present:
+                if mean != mean:
+                    mean, deviation = x, 0.0
+                mean += alpha * deviation
+                var = (1 - alpha) * (var + alpha * deviation ** 2)
+                samples += 1
+            state[:6] = mean, var, samples, out_of_band_s, cusum_hi, cusum_lo
+
+            triggers = (
+                (duration_on, present and inside, out_of_band_s),
+                (warm and z > zscore_on, present and z < zscore_off, z),
+                (warm and cusum_score > cusum_h, present and cusum_score < cusum_h / 2, cusum_score),
+            )
+            for r, (on, clear, score) in enumerate(triggers):
+                if on and not active[r]:
+                    raised.append((r, i, x, score))
+                active[r] = (active[r] and not clear) or on
+
+        # Cùng thứ tự với bản vector hóa: theo luật, rồi theo tín hiệu.
+        return [{"signal": self.signals[i], "rule": RULES[r], "value": x, "score": round(score, 2), "timestamp": ts_ms}
+                for r, i, x, score in sorted(raised)]
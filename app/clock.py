@@ -0,0 +1,29 @@
+import time
+from datetime import datetime
+
+
+class SystemClock:
+    """Đồng hồ thật, dùng khi mô phỏng chạy theo thời gian thực."""
+    def time(self):
+        return time.time()
+
+    def now(self):
+        return datetime.now()
+
+
+class VirtualClock:
+    """
+    Đồng hồ ảo chỉ tiến khi được gọi `advance()`, dùng cho chế độ chạy lô
+    nhanh hơn thời gian thực. Mặc định bắt đầu từ thời điểm hiện tại.
+    """
+    def __init__(self, start=None):
+        self._now = time.time() if start is None else float(start)
+
+    def time(self):
+        return self._now
+
+    def now(self):
+        return datetime.fromtimestamp(self._now)
+
+    def advance(self, seconds):
+        self._now += seconds
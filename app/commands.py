@@ -0,0 +1,240 @@
+import asyncio
+import inspect
+import itertools
+import os
+import pickle
+import struct
+
+from .ingest import ingest_queue
+from .sharedstate import ROLE, SOCKET_PATH, WriterUnavailableError
+from .runtime import get_fleet, storage
+
+# --- Lệnh gửi tới tiến trình sở hữu trạng thái ---
+# Router gọi `await command(tên, *tham số)` cho mọi thao tác ghi và các truy vấn không có
+# sẵn trong bộ nhớ chia sẻ. Ở chế độ standalone lệnh chạy ngay trong tiến trình; ở worker
+# (COLD_STORAGE_ROLE=reader) lệnh được gửi qua unix socket tới `python -m app.writer`.
+# Khung tin: 4 byte độ dài + pickle (id, tên, tham số) / (id, ok, kết quả hoặc lỗi).
+# Socket chỉ chủ sở hữu đọc/ghi được (0600) vì pickle chỉ an toàn giữa các tiến trình tin cậy.
+COMMAND_TIMEOUT_SECONDS = 10.0
+_FRAME = struct.Struct("!I")
+# Lỗi được chuyển nguyên kiểu về worker để router xử lý như khi chạy standalone.
+_REMOTE_ERRORS = {"ValueError": ValueError, "KeyError": KeyError}
+
+
+async def _ingest(batch, source):
+    """Đưa một lô vào hàng đợi; luồng WebSocket chờ khi đầy, HTTP thì báo để trả 503."""
+    unknown = [device_id for device_id in batch.device_ids if device_id not in storage.equipment]
+    if unknown:
+        raise ValueError(f"Không có thiết bị: {', '.join(sorted(unknown))}")
+    if source == "websocket":
+        await ingest_queue.put(batch, source)
+        queued = True
+    else:
+        queued = ingest_queue.offer(batch, source)
+    return {"queued": queued, "queued_batches": len(ingest_queue)}
+
+
+def _events(event_type, severity, start_ms, end_ms, cursor, limit):
+    events, next_cursor = storage.system_events.query(event_type, severity, start_ms, end_ms, cursor, limit)
+    return {"events": events, "next_cursor": next_cursor, "facets": storage.system_events.facets()}
+
+
+def _site(fleet, method):
+    """Lệnh theo kho trong đội kho: trả None khi không có kho để router trả 404."""
+    def handler(site_id, *args):
+        return method(site_id, *args) if fleet.has_site(site_id) else None
+    return handler
+
+
+def local_handlers():
+    fleet = get_fleet()
+    return {
+        "ingest": _ingest,
+        "snapshot": storage.snapshots.get,
+        "recommendations": lambda: storage.ai_recommendations,
+        "act_recommendation": storage.act_on_recommendation,
+        "dismiss_recommendation": storage.dismiss_recommendation,
+        "load_history": storage.get_load_history,
+        "energy_history": storage.get_energy_history,
+        "events": _events,
+        "sites": fleet.list_sites,
+        "site_state": _site(fleet, fleet.site_state),
+        "site_load_history": _site(fleet, fleet.site_load_history),
+        "site_energy_history": _site(fleet, fleet.site_energy_history),
+    }
+
+
+def state_stats():
+    """Các con số cho gauge ở /metrics; worker lấy bản tiến trình ghi đã publish."""
+    if ROLE == "reader":
+        return storage.stats()
+    return {
+        "load_history_points": len(storage.load_history),
+        "system_events": len(storage.system_events),
+        "anomalies": len(storage.anomalies),
+        "snapshot_version": storage.snapshots.version,
+        "fleet_history_points": len(get_fleet().load_history),
+    }
+
+
+async def _read_frame(reader):
+    size = _FRAME.unpack(await reader.readexactly(_FRAME.size))[0]
+    return pickle.loads(await reader.readexactly(size))
+
+
+def _write_frame(writer, message):
+    body = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_FRAME.pack(len(body)) + body)
+
+
+class CommandServer:
+    """Phía tiến trình ghi: mỗi lệnh chạy trong task riêng nên một lệnh chờ lâu không chặn lệnh khác."""
+    def __init__(self, handlers, path=SOCKET_PATH):
+        self.handlers = handlers
+        self.path = path
+        self.server = None
+        self._connections = {}
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self._serve, path=self.path)
+        os.chmod(self.path, 0o600)
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            # Đóng các kết nối của worker để task phục vụ kết thúc bình thường thay vì bị hủy.
+            for writer in self._connections:
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await self.server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader, writer):
+        tasks = set()
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_id, name, args = await _read_frame(reader)
+                task = asyncio.create_task(self._dispatch(writer, request_id, name, args))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _dispatch(self, writer, request_id, name, args):
+        try:
+            result = self.handlers[name](*args)
+            if inspect.isawaitable(result):
+                result = await result
+            response = (request_id, True, result)
+        except Exception as e:
+            response = (request_id, False, (type(e).__name__, str(e)))
+        if not writer.is_closing():
+            _write_frame(writer, response)
+
+
+class CommandClient:
+    """Phía worker: một kết nối dùng chung, các lệnh được ghép theo id nên có thể chạy song song."""
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self._ids = itertools.count()
+        self._pending = {}
+        self._writer = None
+        self._receiver = None
+        self._connecting = asyncio.Lock()
+
+    async def call(self, name, args, timeout=COMMAND_TIMEOUT_SECONDS):
+        await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            _write_frame(self._writer, (request_id, name, args))
+            ok, result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise WriterUnavailableError(f"Tiến trình ghi không trả lời lệnh '{name}'.") from None
+        finally:
+            self._pending.pop(request_id, None)
+        if not ok:
+            error_type, message = result
+            raise _REMOTE_ERRORS.get(error_type, RuntimeError)(message)
+        return result
+
+    async def close(self):
+        if self._receiver is not None:
+            self._receiver.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = self._receiver = None
+
+    async def _connect(self):
+        async with self._connecting:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                raise WriterUnavailableError(f"Không kết nối được tới tiến trình ghi ({e}).") from None
+            self._receiver = asyncio.create_task(self._receive(reader, self._writer))
+
+    async def _receive(self, reader, writer):
+        try:
+            while True:
+                request_id, ok, result = await _read_frame(reader)
+                future = self._pending.get(request_id)
+                if future is not None and not future.done():
+                    future.set_result((ok, result))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            # Mất kết nối: báo lỗi cho các lệnh đang chờ, lần gọi sau sẽ kết nối lại.
+            writer.close()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(WriterUnavailableError("Mất kết nối tới tiến trình ghi."))
+
+
+_client = CommandClient() if ROLE == "reader" else None
+_handlers = None
+
+
+async def command(name, *args, timeout=COMMAND_TIMEOUT_SECONDS):
+    global _handlers
+    if _client is not None:
+        return await _client.call(name, args, timeout)
+    if _handlers is None:
+        _handlers = local_handlers()
+    result = _handlers[name](*args)
+    return await result if inspect.isawaitable(result) else result
+
+
+_remote_snapshots = {}  # tên -> (phiên bản frame, bytes, ETag) ở worker
+
+
+async def snapshot(name):
+    """
+    (bytes JSON, ETag) của một snapshot. Ở worker, snapshot không có sẵn trong bộ nhớ chia sẻ
+    được lấy từ tiến trình ghi và giữ lại cho tới khi frame có phiên bản mới.
+    """
+    snapshots = storage.snapshots
+    if _client is None or snapshots.published(name):
+        return snapshots.get(name)
+    version = snapshots.version
+    cached = _remote_snapshots.get(name)
+    if cached is None or cached[0] != version:
+        cached = (version, *await command("snapshot", name))
+        _remote_snapshots[name] = cached
+    return cached[1], cached[2]
+
+
+async def close_command_client():
+    if _client is not None:
+        await _client.close()
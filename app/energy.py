@@ -0,0 +1,216 @@
+import math
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .timeseries import RingBuffer, to_pairs
+
+# --- Kế toán năng lượng trực tuyến ---
+# Công suất máy nén được tích phân mỗi tick thành kWh và cộng dồn vào giờ, ngày và khung
+# giá điện hiện tại. Khi sang ngày mới, ngày vừa xong được đưa vào chuỗi năng lượng theo
+# ngày cùng dải nền (trung bình ± BASELINE_SIGMA độ lệch chuẩn của BASELINE_DAYS ngày
+# trước đó, tính bằng tổng trượt). Mọi cập nhật đều O(1) mỗi tick.
+BASELINE_DAYS = 28
+BASELINE_MIN_DAYS = 3   # Ít ngày hơn thì chưa báo bất thường năng lượng.
+BASELINE_SIGMA = 2.0
+BASELINE_MIN_BAND_RATIO = 0.05  # Nửa độ rộng dải nền tối thiểu, theo tỉ lệ trung bình.
+MAX_GAP_SECONDS = 10    # Khoảng trống lớn hơn (mô phỏng dừng) chỉ được tính tối đa chừng này.
+# Lịch sử tải chỉ có điểm khi máy nén chạy; khi tích phân lại lúc khởi động, khoảng trống
+# ngắn hơn mức này vẫn được xem là có dữ liệu (máy nén nghỉ) chứ không phải mất dữ liệu.
+RESUME_GAP_SECONDS = 300
+# Ngày có dữ liệu ít hơn tỉ lệ này (ví dụ ngày khởi động) không vào dải nền và không bị
+# báo thấp bất thường.
+COMPLETE_DAY_RATIO = 0.9
+HOURLY_HISTORY_HOURS = 24 * 7
+
+# Khung giá điện theo giờ địa phương, khớp với lịch máy nén trên dashboard.
+TARIFF_PERIODS = {"offpeak": "Giá rẻ", "normal": "Bình thường", "peak": "Giá cao"}
+_TARIFF_BY_HOUR = ("offpeak",) * 4 + ("normal",) * 5 + ("peak",) * 3 + ("normal",) * 12
+
+_HOUR_MS = 3_600_000
+
+
+def _day_start_ms(ts_ms):
+    """Nửa đêm (giờ địa phương) của ngày chứa `ts_ms` và của ngày kế tiếp."""
+    day = datetime.fromtimestamp(ts_ms / 1000).replace(hour=0, minute=0, second=0, microsecond=0)
+    return int(day.timestamp() * 1000), int((day + timedelta(days=1)).timestamp() * 1000)
+
+
+class EnergyAccountant:
+    """
+    Tích phân công suất thành kWh theo giờ, ngày và khung giá, kèm dải nền trượt theo ngày.
+
+    `add()` trả về danh sách sự kiện để `ColdStorage` ghi nhận, mỗi sự kiện là dict:
+    - {"kind": "hour", "timestamp", "kwh"}: một giờ vừa kết thúc;
+    - {"kind": "day", "timestamp", "kwh", "min", "max", "tariff", "complete"}: một ngày vừa
+      kết thúc, `min`/`max` là dải nền dự kiến của chính ngày đó;
+    - {"kind": "anomaly", "timestamp", "day", "kwh", "min", "max", "direction"}: năng lượng
+      ngày `day` vượt dải nền ("high", phát ngay khi vượt) hoặc cả ngày thấp hơn dải nền
+      ("low", phát lúc đóng ngày với timestamp là cuối ngày để sự kiện luôn theo thứ tự thời gian).
+    """
+    def __init__(self):
+        self._window = deque(maxlen=BASELINE_DAYS)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self.band = None  # (min, max) cho ngày hiện tại, None khi chưa đủ ngày
+        self.hourly = RingBuffer(HOURLY_HISTORY_HOURS)
+
+        self.day_start = self.day_end = None
+        self.day_kwh = 0.0
+        self.day_covered_s = 0.0
+        self.tariff_kwh = dict.fromkeys(TARIFF_PERIODS, 0.0)
+        self.hour_start = None
+        self.hour_kwh = 0.0
+        self._utc_offset_ms = 0
+        self._last_ts = None
+        self._flagged = False
+
+    # --- Khởi tạo từ lịch sử ---
+    def resume(self, now_ms, daily_history, load_ts=(), load_values=(), hourly=None):
+        """
+        Nạp dải nền từ chuỗi theo ngày đã có và tích phân lại phần hôm nay từ lịch sử tải.
+        `hourly` là (timestamps, kWh) các giờ đã lưu. Trả về số mục cuối của `daily_history`
+        thuộc hôm nay (chưa trọn ngày) mà nơi gọi cần bỏ đi.
+        """
+        self._start_day(now_ms)
+        partial = 0
+        while partial < len(daily_history) and daily_history[-1 - partial][0] >= self.day_start:
+            partial += 1
+        for _, kwh in daily_history[max(0, len(daily_history) - partial - BASELINE_DAYS):len(daily_history) - partial]:
+            self._push_day(kwh)
+        self.band = self._band()
+
+        # Các giờ của hôm nay được tính lại từ lịch sử tải nên không lấy từ bản đã lưu.
+        if hourly is not None:
+            ts, kwh = hourly
+            keep = np.asarray(ts) < self.day_start
+            self.hourly.extend(np.asarray(ts)[keep], np.asarray(kwh)[keep])
+        self._catch_up(np.asarray(load_ts, dtype=np.int64), np.asarray(load_values, dtype=np.float64))
+        return partial
+
+    def _catch_up(self, load_ts, load_values):
+        """
+        Phần hôm nay từ các điểm tải đã ghi theo tick. Lịch sử thưa hơn tick (dữ liệu khởi
+        tạo mỗi 10 phút) không cho biết máy nén nghỉ lúc nào nên không được tích phân.
+        """
+        lo = int(np.searchsorted(load_ts, self.day_start, side="left"))
+        previous = int(load_ts[lo - 1]) if lo > 0 else None
+        load_ts, load_values = load_ts[lo:], load_values[lo:]
+        if len(load_ts) == 0:
+            return
+        steps = np.diff(load_ts, prepend=load_ts[0] if previous is None else previous) / 1000
+        tick_s = float(np.median(steps))
+        if tick_s > MAX_GAP_SECONDS:
+            return
+        # Mỗi điểm đại diện cho một tick; phần còn lại của khoảng trống là lúc máy nén nghỉ.
+        kwh = load_values * np.minimum(steps, tick_s) / 3600
+        covered = np.minimum(steps, RESUME_GAP_SECONDS)
+        hours = (load_ts + self._utc_offset_ms) // _HOUR_MS
+        bounds = np.flatnonzero(np.diff(hours)) + 1
+        for group_ts, group_kwh, group_s in zip(np.split(load_ts, bounds), np.split(kwh, bounds), np.split(covered, bounds)):
+            self._add_kwh(int(group_ts[-1]), float(group_kwh.sum()), float(group_s.sum()))
+        self._last_ts = int(load_ts[-1])
+
+    # --- Cập nhật mỗi tick ---
+    def add(self, ts_ms, power_kw):
+        """Cộng năng lượng từ lần gọi trước tới `ts_ms` với công suất `power_kw`."""
+        if self._last_ts is None:
+            self._last_ts = ts_ms
+            if self.day_start is None:
+                self._start_day(ts_ms)
+            return []
+        dt_s = min(max(ts_ms - self._last_ts, 0) / 1000, MAX_GAP_SECONDS)
+        self._last_ts = ts_ms
+        if self.day_start is None:
+            self._start_day(ts_ms)
+        return self._add_kwh(ts_ms, power_kw * dt_s / 3600, dt_s)
+
+    def _add_kwh(self, ts_ms, kwh, covered_s):
+        events = []
+        if ts_ms >= self.day_end:
+            events += self._close_hour()
+            events += self._close_day()
+            self._start_day(ts_ms)
+        elif ts_ms >= self.hour_start + _HOUR_MS:
+            events += self._close_hour()
+            self._start_hour(ts_ms)
+        self.day_kwh += kwh
+        self.day_covered_s += covered_s
+        self.hour_kwh += kwh
+        self.tariff_kwh[_TARIFF_BY_HOUR[(ts_ms + self._utc_offset_ms) // _HOUR_MS % 24]] += kwh
+        if not self._flagged and self.band is not None and self.day_kwh > self.band[1]:
+            self._flagged = True
+            events.append(self._anomaly(ts_ms, "high"))
+        return events
+
+    def _start_day(self, ts_ms):
+        self.day_start, self.day_end = _day_start_ms(ts_ms)
+        self._utc_offset_ms = int(datetime.fromtimestamp(ts_ms / 1000).astimezone().utcoffset().total_seconds() * 1000)
+        self.day_kwh = 0.0
+        self.day_covered_s = 0.0
+        self.tariff_kwh = dict.fromkeys(TARIFF_PERIODS, 0.0)
+        self._flagged = False
+        self._start_hour(ts_ms)
+
+    def _start_hour(self, ts_ms):
+        self.hour_start = ts_ms - (ts_ms + self._utc_offset_ms) % _HOUR_MS
+        self.hour_kwh = 0.0
+
+    def _close_hour(self):
+        kwh = round(self.hour_kwh, 3)
+        self.hourly.append(self.hour_start, kwh)
+        return [{"kind": "hour", "timestamp": self.hour_start, "kwh": kwh}]
+
+    def _close_day(self):
+        events = []
+        band = self.band or (None, None)
+        complete = self.day_covered_s >= COMPLETE_DAY_RATIO * (self.day_end - self.day_start) / 1000
+        if complete and self.band is not None and not self._flagged and self.day_kwh < self.band[0]:
+            events.append(self._anomaly(self.day_end, "low"))
+        events.append({"kind": "day", "timestamp": self.day_start, "kwh": round(self.day_kwh, 2),
+                       "min": band[0], "max": band[1], "complete": complete,
+                       "tariff": {period: round(kwh, 2) for period, kwh in self.tariff_kwh.items()}})
+        if complete:
+            self._push_day(self.day_kwh)
+            self.band = self._band()
+        return events
+
+    def _anomaly(self, ts_ms, direction):
+        return {"kind": "anomaly", "timestamp": ts_ms, "day": self.day_start, "kwh": round(self.day_kwh, 2),
+                "min": self.band[0], "max": self.band[1], "direction": direction}
+
+    # --- Dải nền trượt ---
+    def _push_day(self, kwh):
+        if len(self._window) == self._window.maxlen:
+            oldest = self._window[0]
+            self._sum -= oldest
+            self._sum_sq -= oldest * oldest
+        self._window.append(kwh)
+        self._sum += kwh
+        self._sum_sq += kwh * kwh
+
+    def _band(self):
+        n = len(self._window)
+        if n < BASELINE_MIN_DAYS:
+            return None
+        mean = self._sum / n
+        std = math.sqrt(max(self._sum_sq / n - mean * mean, 0.0))
+        half = max(BASELINE_SIGMA * std, BASELINE_MIN_BAND_RATIO * mean)
+        return round(mean - half, 2), round(mean + half, 2)
+
+    # --- Dữ liệu cho API ---
+    def today(self):
+        """Năng lượng hôm nay tới hiện tại, theo khung giá và theo giờ (kể cả giờ đang chạy)."""
+        ts, kwh = self.hourly.range(self.day_start)
+        hours = to_pairs(ts, kwh)
+        if self.hour_start is not None:
+            hours.append([self.hour_start, round(self.hour_kwh, 3)])
+        return {
+            "timestamp": self.day_start,
+            "kwh": round(self.day_kwh, 2),
+            "baseline": list(self.band) if self.band is not None else None,
+            "tariff": [{"period": period, "name": name, "kwh": round(self.tariff_kwh[period], 2)}
+                       for period, name in TARIFF_PERIODS.items()],
+            "hourly": hours,
+        }
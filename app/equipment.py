@@ -0,0 +1,133 @@
+import numpy as np
+
+# --- Hằng số Cấu hình ---
+ACTIVE_STATUS = "Hoạt động"
+# Mức giảm điểm sức khỏe mỗi tick theo loại thiết bị (thiết bị đang hoạt động).
+DEGRADATION_BY_TYPE = {"Máy nén": 0.005, "Quạt": 0.01}
+DEFAULT_DEGRADATION = 0.01
+HEALTH_FLOOR = 40.0
+
+
+class EquipmentRegistry:
+    """
+    Danh mục thiết bị của một kho.
+
+    - Tra cứu theo id O(1); chỉ mục theo loại, trạng thái và cặp (loại, trạng thái)
+      giữ thứ tự thêm vào nên "thiết bị đầu tiên đang hoạt động" cũng O(1).
+    - Điểm sức khỏe nằm trong một mảng NumPy và được giảm cho mọi thiết bị trong một
+      phép toán vector hóa, mức giảm theo loại thiết bị thay vì theo tên.
+    - Danh sách dict (và bản ghép với dữ liệu chi tiết) chỉ được dựng lại khi `version`
+      thay đổi, dùng chung cho mọi API đọc trong cùng một tick.
+    """
+    def __init__(self, devices=()):
+        self._devices = []           # thuộc tính tĩnh: id, name, type, status
+        self._rows = {}              # id -> chỉ số hàng
+        self._indexes = {}           # ("type", t) / ("status", s) / ("type_status", t, s) -> {hàng: None}
+        self.health = np.empty(0)
+        self._degradation = np.empty(0)
+        self._active = np.empty(0, dtype=bool)
+        self.version = 0
+        self._list_cache = (None, None)
+        self._merged_cache = (None, None, None, None)
+        for device in devices:
+            self.add(device)
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __contains__(self, device_id):
+        return device_id in self._rows
+
+    def add(self, device):
+        if device["id"] in self._rows:
+            raise ValueError(f"Thiết bị '{device['id']}' đã tồn tại.")
+        row = len(self._devices)
+        self._devices.append({key: value for key, value in device.items() if key != "health_score"})
+        self._rows[device["id"]] = row
+        self.health = np.append(self.health, float(device.get("health_score", 100.0)))
+        self._degradation = np.append(self._degradation, DEGRADATION_BY_TYPE.get(device["type"], DEFAULT_DEGRADATION))
+        self._active = np.append(self._active, device["status"] == ACTIVE_STATUS)
+        self._index(row)
+        self.version += 1
+
+    def get(self, device_id):
+        """Bản dict của một thiết bị (kèm điểm sức khỏe), hoặc None."""
+        row = self._rows.get(device_id)
+        return None if row is None else self._as_dict(row)
+
+    def set_health(self, device_id, health_score):
+        self.health[self._rows[device_id]] = health_score
+        self.version += 1
+
+    def ids(self, device_type=None, status=None):
+        """Id các thiết bị theo loại và/hoặc trạng thái, theo thứ tự thêm vào."""
+        return [self._devices[row]["id"] for row in self._select(device_type, status)]
+
+    def first(self, device_type, status=ACTIVE_STATUS):
+        """
+        Thiết bị đầu tiên thuộc loại và trạng thái cho trước; nếu không có thì thiết bị
+        đầu tiên của danh mục (giữ hành vi cũ khi không có máy nén nào hoạt động).
+        """
+        rows = self._select(device_type, status)
+        return self._as_dict(next(iter(rows), 0))
+
+    def count_below(self, health_score):
+        return int(np.count_nonzero(self.health < health_score))
+
+    def degrade(self):
+        """Giảm điểm sức khỏe của mọi thiết bị đang hoạt động và còn trên ngưỡng sàn."""
+        mask = self._active & (self.health > HEALTH_FLOOR)
+        self.health -= np.where(mask, self._degradation, 0.0)
+        self.version += 1
+
+    def to_list(self):
+        """Danh sách dict của mọi thiết bị (cache theo `version`)."""
+        version, devices = self._list_cache
+        if version != self.version:
+            health = self.health.tolist()
+            devices = [{**device, "health_score": health[row]} for row, device in enumerate(self._devices)]
+            self._list_cache = (self.version, devices)
+        return devices
+
+    def merged_view(self, details, predictions=None):
+        """
+        Danh sách thiết bị ghép với dữ liệu chi tiết (lịch sử, nhật ký bảo trì) và dự đoán bảo
+        trì nếu có (thay `ai_analysis` bằng nhận định của dự đoán), cache theo `version`.
+        """
+        version, cached_details, cached_predictions, merged = self._merged_cache
+        if version != self.version or cached_details is not details or cached_predictions is not predictions:
+            by_id = predictions or {}
+            merged = []
+            for device in self.to_list():
+                if device["id"] not in details:
+                    continue
+                entry = {**device, **details[device["id"]]}
+                prediction = by_id.get(device["id"])
+                if prediction is not None:
+                    entry["ai_analysis"] = prediction["analysis"]
+                    entry["prediction"] = prediction
+                merged.append(entry)
+            self._merged_cache = (self.version, details, predictions, merged)
+        return merged
+
+    def _as_dict(self, row):
+        return {**self._devices[row], "health_score": float(self.health[row])}
+
+    def _select(self, device_type, status):
+        if device_type is not None and status is not None:
+            return self._indexes.get(("type_status", device_type, status), {})
+        if device_type is not None:
+            return self._indexes.get(("type", device_type), {})
+        if status is not None:
+            return self._indexes.get(("status", status), {})
+        return range(len(self._devices))
+
+    def _index_keys(self, row):
+        device = self._devices[row]
+        return (("type", device["type"]), ("status", device["status"]),
+                ("type_status", device["type"], device["status"]))
+
+    def _index(self, row):
+        # `add` luôn thêm hàng lớn nhất nên chỉ mục giữ thứ tự thêm vào.
+        for key in self._index_keys(row):
+            self._indexes.setdefault(key, {})[row] = None
@@ -0,0 +1,115 @@
+import os
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+# --- Hằng số Cấu hình ---
+EVENT_RETENTION = int(os.environ.get("COLD_STORAGE_EVENT_RETENTION", 100_000))
+DEFAULT_PAGE_SIZE = 100
+
+
+class EventLog:
+    """
+    Nhật ký sự kiện hệ thống, lưu theo thứ tự thời gian.
+
+    - Thêm sự kiện O(1) (khấu hao), mỗi sự kiện nhận một `id` tăng dần.
+    - Chỉ mục phụ theo loại, mức độ và cặp (loại, mức độ) là danh sách id đã sắp xếp;
+      lọc theo thời gian bằng tìm kiếm nhị phân trên dãy timestamp.
+    - Phân trang mới nhất trước bằng cursor là id của sự kiện cuối trang trước.
+    - Chỉ giữ tối đa `max_events` sự kiện mới nhất trong bộ nhớ.
+
+    Sự kiện thường được thêm theo thứ tự thời gian. Sự kiện đến trễ (timestamp nhỏ hơn sự
+    kiện cuối) được chèn đúng vị trí, các sự kiện sau nó được đánh lại id và chỉ mục được
+    dựng lại: O(n) nhưng hiếm, đổi lại dãy timestamp luôn tăng dần cho tìm kiếm nhị phân.
+    """
+    def __init__(self, max_events=EVENT_RETENTION):
+        self.max_events = max_events
+        self._events = []
+        self._timestamps = []
+        self._offset = 0  # id của self._events[0]
+        self._indexes = defaultdict(list)
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self._events)
+
+    @property
+    def next_id(self):
+        return self._offset + len(self._events)
+
+    def append(self, event):
+        if self._timestamps and event["timestamp"] < self._timestamps[-1]:
+            return self._insert(event)
+        event_id = self.next_id
+        event["id"] = event_id
+        self._events.append(event)
+        self._timestamps.append(event["timestamp"])
+        for key in self._index_keys(event["type"], event["severity"]):
+            self._indexes[key].append(event_id)
+        self._maybe_trim()
+        return event
+
+    def query(self, event_type=None, severity=None, start_ms=None, end_ms=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        Trả về (danh sách sự kiện mới nhất trước, cursor trang tiếp theo hoặc None).
+        Chi phí tỉ lệ với số sự kiện trả về cộng O(log n), không phụ thuộc kích thước log.
+        """
+        lo_id = self._offset + (0 if start_ms is None else bisect_left(self._timestamps, start_ms))
+        hi_id = self._offset + (len(self._timestamps) if end_ms is None else bisect_right(self._timestamps, end_ms))
+        if cursor is not None:
+            hi_id = min(hi_id, cursor)
+
+        if event_type is not None and severity is not None:
+            ids = self._indexes.get(("type_severity", event_type, severity), [])
+        elif event_type is not None:
+            ids = self._indexes.get(("type", event_type), [])
+        elif severity is not None:
+            ids = self._indexes.get(("severity", severity), [])
+        else:
+            ids = range(self._offset, self.next_id)
+
+        first = bisect_left(ids, lo_id)
+        end = bisect_left(ids, hi_id)
+        start = max(first, end - limit)
+        page = [self._events[i - self._offset] for i in ids[start:end]][::-1]
+        next_cursor = page[-1]["id"] if page and start > first else None
+        return page, next_cursor
+
+    def facets(self):
+        """Số sự kiện theo từng loại và mức độ, dùng cho bộ lọc trên UI."""
+        return {
+            "types": {key[1]: len(ids) for key, ids in self._indexes.items() if key[0] == "type"},
+            "severities": {key[1]: len(ids) for key, ids in self._indexes.items() if key[0] == "severity"},
+        }
+
+    @staticmethod
+    def _index_keys(event_type, severity):
+        return (("type", event_type), ("severity", severity), ("type_severity", event_type, severity))
+
+    def _insert(self, event):
+        position = bisect_right(self._timestamps, event["timestamp"])
+        self._events.insert(position, event)
+        self._timestamps.insert(position, event["timestamp"])
+        self._indexes.clear()
+        for i, existing in enumerate(self._events):
+            existing["id"] = self._offset + i
+            for key in self._index_keys(existing["type"], existing["severity"]):
+                self._indexes[key].append(existing["id"])
+        self._maybe_trim()
+        return event
+
+    def _maybe_trim(self):
+        # Cắt theo lô để chi phí xóa đầu danh sách được khấu hao.
+        if len(self._events) > self.max_events + max(self.max_events // 10, 1):
+            self._trim(len(self._events) - self.max_events)
+
+    def _trim(self, count):
+        del self._events[:count]
+        del self._timestamps[:count]
+        self._offset += count
+        for key in list(self._indexes):
+            ids = self._indexes[key]
+            del ids[:bisect_left(ids, self._offset)]
+            if not ids:
+                del self._indexes[key]
@@ -0,0 +1,212 @@
+import csv
+import io
+
+import numpy as np
+
+from .sharedstate import ROLE
+from .tsstore import SegmentStore
+
+# --- Xuất dữ liệu cho báo cáo và kiểm toán ---
+# Dữ liệu được sinh lần lượt theo khối tối đa EXPORT_CHUNK_ROWS dòng, đọc từ một ảnh chụp
+# chỉ đọc của kho lưu trữ (chuỗi số là view trên mmap của từng segment), nên bộ nhớ dùng
+# không phụ thuộc độ dài khoảng thời gian. Không có kho lưu trữ thì xuất phần lịch sử đang
+# giữ trong bộ nhớ. Parquet cần `pyarrow` (tùy chọn, chỉ import khi xuất Parquet).
+EXPORT_CHUNK_ROWS = 50_000
+
+# Cột của từng bộ dữ liệu: (tên, kiểu). Cột `time` (ISO 8601, UTC) được suy ra từ `timestamp_ms`.
+DATASETS = {
+    "energy": (("timestamp_ms", "int64"), ("time", "string"), ("kwh", "float64"),
+               ("baseline_min_kwh", "float64"), ("baseline_max_kwh", "float64")),
+    "load": (("timestamp_ms", "int64"), ("time", "string"), ("power_kw", "float64")),
+    "equipment": (("timestamp_ms", "int64"), ("time", "string"), ("device_id", "string"),
+                  ("metric", "string"), ("value", "float64")),
+    "events": (("timestamp_ms", "int64"), ("time", "string"), ("type", "string"),
+               ("severity", "string"), ("message", "string")),
+}
+FORMATS = {"csv": "text/csv; charset=utf-8", "parquet": "application/vnd.apache.parquet"}
+
+
+class ExportUnavailableError(RuntimeError):
+    """Không có nguồn dữ liệu để xuất trong tiến trình này."""
+
+
+def _slices(length, size=EXPORT_CHUNK_ROWS):
+    return ((lo, min(lo + size, length)) for lo in range(0, length, size))
+
+
+def _record_chunks(records, to_row, names):
+    """Gom các bản ghi (timestamp, dict) thành khối dạng cột."""
+    rows = []
+    for ts, record in records:
+        rows.append(to_row(ts, record))
+        if len(rows) == EXPORT_CHUNK_ROWS:
+            yield dict(zip(names, map(list, zip(*rows))))
+            rows = []
+    if rows:
+        yield dict(zip(names, map(list, zip(*rows))))
+
+
+_ENERGY_COLUMNS = ("timestamp_ms", "kwh", "baseline_min_kwh", "baseline_max_kwh")
+_EVENT_COLUMNS = ("timestamp_ms", "type", "severity", "message")
+
+
+def _energy_row(ts, record):
+    return ts, record["kwh"], record["min"], record["max"]
+
+
+def _event_row(ts, record):
+    return ts, record["type"], record["severity"], record["message"]
+
+
+class StoreSource:
+    """Khối dữ liệu từ ảnh chụp chỉ đọc của kho lưu trữ tại thời điểm bắt đầu xuất."""
+    def __init__(self, directory):
+        self.store = SegmentStore(directory, readonly=True)
+
+    def chunks(self, dataset, start_ms=None, end_ms=None, device_id=None):
+        if dataset == "load":
+            for ts, values in self.store.series("load").iter_chunks(start_ms, end_ms):
+                for lo, hi in _slices(len(ts)):
+                    yield {"timestamp_ms": ts[lo:hi], "power_kw": values[lo:hi]}
+        elif dataset == "equipment":
+            prefix = "equipment/" if device_id is None else f"equipment/{device_id}/"
+            for name in self.store.series_names(prefix):
+                _, device, metric = name.split("/", 2)
+                for ts, values in self.store.series(name).iter_chunks(start_ms, end_ms):
+                    for lo, hi in _slices(len(ts)):
+                        yield {"timestamp_ms": ts[lo:hi], "device_id": [device] * (hi - lo),
+                               "metric": [metric] * (hi - lo), "value": values[lo:hi]}
+        elif dataset == "energy":
+            yield from _record_chunks(self.store.log("energy_daily").iter(start_ms, end_ms), _energy_row, _ENERGY_COLUMNS)
+        elif dataset == "events":
+            yield from _record_chunks(self.store.log("system_events").iter(start_ms, end_ms), _event_row, _EVENT_COLUMNS)
+
+    def has_device(self, device_id):
+        return bool(self.store.series_names(f"equipment/{device_id}/"))
+
+    def close(self):
+        self.store.close()
+
+
+class MemorySource:
+    """
+    Khi chạy không có kho lưu trữ: phần lịch sử trong bộ nhớ (vốn đã có giới hạn) được sao
+    chép lúc tạo nguồn, trên event loop, để luồng xuất không đọc dữ liệu đang bị mô phỏng sửa.
+    """
+    def __init__(self, storage):
+        self._load = (storage.load_history.timestamps.copy(), storage.load_history.values.copy())
+        self._energy = [(ts, {"kwh": kwh, "min": lo, "max": hi})
+                        for (ts, kwh), (lo, hi) in zip(storage.energy_daily_history, storage.energy_baseline_range)]
+        self._events = [(event["timestamp"], dict(event)) for event in storage.system_events]
+        self._equipment = {device_id: {metric: list(points) for metric, points in details["history"].items()}
+                           for device_id, details in storage.equipment_details.items()}
+
+    def chunks(self, dataset, start_ms=None, end_ms=None, device_id=None):
+        def in_range(ts):
+            return (start_ms is None or ts >= start_ms) and (end_ms is None or ts <= end_ms)
+
+        if dataset == "load":
+            ts, values = self._load
+            lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+            hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+            for a, b in _slices(hi - lo):
+                yield {"timestamp_ms": ts[lo + a:lo + b], "power_kw": values[lo + a:lo + b]}
+        elif dataset == "equipment":
+            for device, history in self._equipment.items():
+                if device_id is not None and device != device_id:
+                    continue
+                for metric, points in history.items():
+                    records = ((ts, value) for ts, value in points if in_range(ts))
+                    yield from _record_chunks(records, lambda ts, value: (ts, device, metric, value),
+                                              ("timestamp_ms", "device_id", "metric", "value"))
+        elif dataset == "energy":
+            yield from _record_chunks((r for r in self._energy if in_range(r[0])), _energy_row, _ENERGY_COLUMNS)
+        elif dataset == "events":
+            yield from _record_chunks((r for r in self._events if in_range(r[0])), _event_row, _EVENT_COLUMNS)
+
+    def has_device(self, device_id):
+        return device_id in self._equipment
+
+    def close(self):
+        pass
+
+
+def open_source(storage, data_dir=None):
+    """Kho lưu trữ của `storage` nếu có (hoặc `data_dir` ở worker chỉ đọc), ngược lại là bộ nhớ."""
+    store = getattr(storage, "store", None)
+    directory = store.directory if store is not None else data_dir
+    if directory:
+        return StoreSource(directory)
+    if ROLE == "reader":
+        raise ExportUnavailableError("Xuất dữ liệu từ worker chỉ đọc cần COLD_STORAGE_DATA_DIR.")
+    return MemorySource(storage)
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _columns(chunk, dataset):
+    ts = np.asarray(chunk["timestamp_ms"], dtype=np.int64)
+    chunk = {**chunk, "time": np.datetime_as_string(ts.astype("datetime64[ms]"), unit="s", timezone="UTC")}
+    return [chunk[name] for name, _ in DATASETS[dataset]]
+
+
+def iter_csv(chunks, dataset):
+    yield (",".join(name for name, _ in DATASETS[dataset]) + "\r\n").encode("utf-8")
+    for chunk in chunks:
+        out = io.StringIO()
+        columns = [c.tolist() if isinstance(c, np.ndarray) else c for c in _columns(chunk, dataset)]
+        csv.writer(out).writerows(zip(*columns))
+        yield out.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """File chỉ ghi giữ các byte Parquet vừa sinh cho tới khi được lấy ra gửi đi."""
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet(chunks, dataset):
+    """Mỗi khối thành một row group, gửi đi ngay khi ghi xong; footer gửi ở cuối."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.string() if kind == "string" else pa.from_numpy_dtype(np.dtype(kind)))
+                        for name, kind in DATASETS[dataset]])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_arrays(_columns(chunk, dataset), schema=schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def stream_export(source, dataset, fmt, start_ms=None, end_ms=None, device_id=None):
+    """Sinh các khối bytes của file xuất; đóng nguồn khi xong hoặc khi client ngắt kết nối."""
+    encode = iter_parquet if fmt == "parquet" else iter_csv
+    try:
+        yield from encode(source.chunks(dataset, start_ms, end_ms, device_id), dataset)
+    finally:
+        source.close()
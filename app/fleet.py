@@ -0,0 +1,209 @@
+import os
+from collections import deque
+
+import numpy as np
+
+from .anomaly import StreamingAnomalyDetector
+from .clock import SystemClock
+from .energy import EnergyAccountant
+from .simulation import (ANOMALY_SIGNALS, DASHBOARD_HISTORY_POINTS, HUMIDITY_BASE, HUMIDITY_NOISE, TICK_SECONDS,
+                         describe_alert, describe_energy_anomaly, humidity_step, zone_signal)
+from .rollups import lttb_indices
+from .timeseries import RingBuffer, to_pairs
+
+# --- Hằng số Cấu hình ---
+FLEET_SITES = int(os.environ.get("COLD_STORAGE_FLEET_SITES", 24))
+FLEET_ZONES = int(os.environ.get("COLD_STORAGE_FLEET_ZONES", 2))
+FLEET_HISTORY_CAPACITY = int(os.environ.get("COLD_STORAGE_FLEET_HISTORY_CAPACITY", 43200)) # 1 ngày với chu kỳ 2 giây
+FLEET_ANOMALY_HISTORY = 1000  # Số bất thường gần nhất giữ lại cho mỗi kho.
+# Kho chính (`ColdStorage`) xuất hiện trong đội kho với id này.
+PRIMARY_SITE_ID = "main"
+
+
+def fleet_signals(n_zones):
+    """Tín hiệu phát hiện bất thường của một kho M vùng: cùng luật với kho chính."""
+    zones = [zone_signal(chr(ord("A") + j)) for j in range(n_zones)]
+    return zones + [spec for spec in ANOMALY_SIGNALS if not spec["name"].startswith("zone_")]
+
+
+class FleetSimulation:
+    """
+    Mô phỏng đồng thời N kho lạnh, mỗi kho M vùng nhiệt độ.
+
+    Trạng thái của cả đội kho nằm trong các mảng NumPy (một phần tử cho mỗi kho,
+    hoặc một hàng cho mỗi kho với nhiệt độ vùng), và `update()` tiến toàn bộ đội
+    kho thêm một tick bằng các phép toán vector hóa, cùng quy luật với `ColdStorage`.
+    Bất thường được phát hiện bằng cùng `StreamingAnomalyDetector` (mỗi kho một hàng)
+    và năng lượng được tính bằng một `EnergyAccountant` cho mỗi kho.
+
+    Kho chính (`primary`, nếu có) được phục vụ qua cùng API với id PRIMARY_SITE_ID,
+    dữ liệu lấy thẳng từ `ColdStorage` (gồm dữ liệu cảm biến, bảo trì và lưu trữ bền vững).
+    """
+    def __init__(self, n_sites=FLEET_SITES, n_zones=FLEET_ZONES, seed=None, clock=None, primary=None):
+        self.primary = primary
+        self.clock = clock or (primary.clock if primary is not None else SystemClock())
+        self.rng = np.random.default_rng(seed)
+        self.site_ids = [f"site-{i + 1:04d}" for i in range(n_sites)]
+        self.site_index = {site_id: i for i, site_id in enumerate(self.site_ids)}
+
+        # --- Trạng thái Môi trường & Hoạt động ---
+        self.zone_temp = -20.0 + self.rng.uniform(-0.3, 0.3, (n_sites, n_zones))
+        self.humidity = HUMIDITY_BASE + self.rng.uniform(-1.0, 1.0, n_sites)
+        self.compressor_on = np.ones(n_sites, dtype=bool)
+        self.compressor_power_kw = np.full(n_sites, 45.5)
+        self.compressor_health = self.rng.uniform(70.0, 98.0, n_sites)
+        self.door_open = np.zeros(n_sites, dtype=bool)
+        self.door_open_duration_s = np.zeros(n_sites, dtype=np.int64)
+
+        # --- Phân tích ---
+        self.signals = fleet_signals(n_zones)
+        self.anomaly_detector = StreamingAnomalyDetector(self.signals, rows=n_sites)
+        self.anomaly_count = np.zeros(n_sites, dtype=np.int64)
+        self.anomalies = [deque(maxlen=FLEET_ANOMALY_HISTORY) for _ in self.site_ids]
+        self.energy = [EnergyAccountant() for _ in self.site_ids]
+        self.energy_daily_history = [[] for _ in self.site_ids]
+        self.energy_baseline_range = [[] for _ in self.site_ids]
+
+        # --- Dữ liệu Lịch sử ---
+        self.load_history = RingBuffer(FLEET_HISTORY_CAPACITY, width=n_sites)
+
+    @property
+    def n_sites(self):
+        return len(self.site_ids)
+
+    def update(self, dt=TICK_SECONDS):
+        """Tiến toàn bộ đội kho thêm một tick."""
+        n, m = self.zone_temp.shape
+        rng = self.rng
+        now_ms = int(self.clock.time() * 1000)
+
+        # Cửa kho: đóng -> mở với xác suất 1%, mở -> đóng với xác suất 5%.
+        toggle = rng.random(n) < np.where(self.door_open, 0.05, 0.01)
+        self.door_open ^= toggle
+        self.door_open_duration_s = np.where(self.door_open, self.door_open_duration_s + dt, 0)
+
+        # Sức khỏe máy nén giảm dần tới ngưỡng 40.
+        self.compressor_health -= np.where(self.compressor_health > 40, 0.005, 0.0)
+
+        # Nhiệt độ vùng.
+        self.zone_temp += rng.uniform(0.01, 0.03, (n, m))
+        self.zone_temp += self.door_open[:, None] * rng.uniform(0.1, 0.2, (n, m))
+        self.zone_temp -= self.compressor_on[:, None] * rng.uniform(0.1, 0.3, (n, m))
+
+        avg_temp = self.zone_temp.mean(axis=1)
+        self.compressor_on = np.where(self.compressor_on, avg_temp >= -20.5, avg_temp > -19.5)
+        self.humidity = humidity_step(self.humidity, self.door_open, self.compressor_on,
+                                      rng.uniform(-HUMIDITY_NOISE, HUMIDITY_NOISE, n))
+
+        # Công suất máy nén.
+        efficiency_factor = 1 + (100 - self.compressor_health) / 150
+        running_power = 45.0 * efficiency_factor + 10.0 * self.door_open + rng.uniform(-1.0, 1.0, n)
+        idle_power = 0.5 + rng.uniform(-0.2, 0.2, n)
+        self.compressor_power_kw = np.where(self.compressor_on, running_power, idle_power)
+        self.load_history.append(now_ms, self.compressor_power_kw)
+
+        self._account_energy(now_ms)
+        self._detect_anomalies(now_ms, dt)
+
+    def _account_energy(self, now_ms):
+        for i, power in enumerate(self.compressor_power_kw.tolist()):
+            for event in self.energy[i].add(now_ms, power):
+                if event["kind"] == "day":
+                    self.energy_daily_history[i].append([event["timestamp"], event["kwh"]])
+                    self.energy_baseline_range[i].append((event["min"], event["max"]))
+                elif event["kind"] == "anomaly":
+                    reason, _, _ = describe_energy_anomaly(event)
+                    self._add_anomaly(i, event["kwh"], reason, event["timestamp"])
+
+    def _detect_anomalies(self, now_ms, dt):
+        # Công suất chỉ có ý nghĩa khi máy nén chạy và cửa đóng, như ở kho chính.
+        power = np.where(self.compressor_on & ~self.door_open, self.compressor_power_kw, np.nan)
+        values = np.column_stack((self.zone_temp, self.humidity, power, self.door_open))
+        for alert in self.anomaly_detector.update(values, now_ms, dt):
+            value, reason, _, _ = describe_alert(alert, self.signals)
+            self._add_anomaly(alert["row"], value, reason, alert["timestamp"])
+
+    def _add_anomaly(self, i, value, reason, ts_ms):
+        self.anomalies[i].append({"timestamp": ts_ms, "value": value, "reason": reason})
+        self.anomaly_count[i] += 1
+
+    # --- CÁC HÀM CUNG CẤP DỮ LIỆU CHO API ---
+    def has_site(self, site_id):
+        return site_id in self.site_index or (site_id == PRIMARY_SITE_ID and self.primary is not None)
+
+    def list_sites(self):
+        """Tóm tắt nhanh mọi kho trong đội, kho chính đứng đầu."""
+        sites = []
+        if self.primary is not None:
+            p = self.primary
+            sites.append(self._summary(PRIMARY_SITE_ID, (p.zone_A_temp + p.zone_B_temp) / 2,
+                                       p.compressor_power_kw, p.door_status == "OPEN"))
+        avg_temp = self.zone_temp.mean(axis=1).tolist()
+        power = self.compressor_power_kw.tolist()
+        door_open = self.door_open.tolist()
+        sites += [self._summary(site_id, avg_temp[i], power[i], door_open[i]) for i, site_id in enumerate(self.site_ids)]
+        return sites
+
+    def site_state(self, site_id):
+        """Trạng thái hiện tại của một kho, cùng cấu trúc với `ColdStorage.get_full_state()`."""
+        if site_id == PRIMARY_SITE_ID:
+            p = self.primary
+            return self._state(site_id, [p.zone_A_temp, p.zone_B_temp], p.humidity, p.compressor_status == "ON",
+                               p.compressor_power_kw, p.equipment.first("Máy nén")["health_score"],
+                               p.door_status == "OPEN", p.door_open_duration_s, len(p.anomalies), p.energy.day_kwh)
+        i = self.site_index[site_id]
+        return self._state(site_id, self.zone_temp[i].tolist(), float(self.humidity[i]), bool(self.compressor_on[i]),
+                           float(self.compressor_power_kw[i]), float(self.compressor_health[i]), bool(self.door_open[i]),
+                           int(self.door_open_duration_s[i]), int(self.anomaly_count[i]), self.energy[i].day_kwh)
+
+    def site_load_history(self, site_id, start_ms=None, end_ms=None, max_points=None):
+        max_points = max_points or DASHBOARD_HISTORY_POINTS
+        if site_id == PRIMARY_SITE_ID:
+            return self.primary.get_load_history(start_ms, end_ms, max_points)["load_history"]
+        ts, values = self.load_history.range(start_ms, end_ms)
+        values = values[:, self.site_index[site_id]]
+        if len(ts) > max_points:
+            keep = lttb_indices(ts, values, max_points)
+            ts, values = ts[keep], values[keep]
+        return to_pairs(ts, values.round(3))
+
+    def site_energy_history(self, site_id):
+        """Lịch sử kWh theo ngày kèm dải nền của từng ngày, hôm nay và bất thường, như `ColdStorage.get_energy_history()`."""
+        if site_id == PRIMARY_SITE_ID:
+            return self.primary.get_energy_history()
+        i = self.site_index[site_id]
+        return {
+            "energy_daily_history": self.energy_daily_history[i],
+            "energy_baseline_range": self.energy_baseline_range[i],
+            "today": self.energy[i].today(),
+            "anomalies": list(self.anomalies[i]),
+        }
+
+    @staticmethod
+    def _summary(site_id, avg_temp, power, door_open):
+        return {"site_id": site_id, "avg_temp": round(avg_temp, 2), "compressor_power_kw": round(power, 2),
+                "door_status": "OPEN" if door_open else "CLOSED"}
+
+    @staticmethod
+    def _state(site_id, zone_temps, humidity, compressor_on, power, health, door_open, door_open_duration_s,
+               anomaly_count, energy_today_kwh):
+        return {
+            "site_id": site_id,
+            "environment": {
+                "zone_temps": [round(t, 2) for t in zone_temps],
+                "avg_temp": round(sum(zone_temps) / len(zone_temps), 2),
+                "humidity": round(humidity, 2),
+            },
+            "operation": {
+                "compressor_status": "ON" if compressor_on else "OFF",
+                "compressor_power_kw": round(power, 2),
+                "compressor_health": round(health, 2),
+                "door_status": "OPEN" if door_open else "CLOSED",
+                "door_open_duration_s": door_open_duration_s,
+            },
+            "kpis": {
+                "energy_efficiency": round(48.0 / power if power > 1 else 0, 2),
+                "total_anomalies": anomaly_count,
+                "energy_today_kwh": round(energy_today_kwh, 2),
+            },
+        }
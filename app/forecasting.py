@@ -0,0 +1,195 @@
+import numpy as np
+
+from .ai_worker import ForecastWorker, fit_prophet_forecast
+from .metrics import FORECAST_FIT_DURATION
+
+# --- Hằng số Cấu hình ---
+FORECAST_BUCKET_MS = 10 * 60_000      # Độ phân giải của mô hình và của đường dự báo
+SEASON_MS = 24 * 3_600_000            # Chu kỳ mùa vụ (một ngày)
+HW_ALPHA = 0.3
+HW_BETA = 0.02
+HW_GAMMA = 0.2
+HW_PHI = 0.95                         # Hệ số giảm chấn xu hướng
+PROPHET_REFIT_SECONDS = 900
+PROPHET_CONTEXT_HOURS = 24
+PROPHET_MIN_POINTS = 20
+
+
+class Forecaster:
+    """
+    Giao diện chung của các backend dự báo tải.
+
+    - `observe()`/`observe_many()`: nạp điểm tải mới (backend không học trực tuyến thì bỏ qua);
+    - `refresh()`: gọi mỗi tick, không bao giờ chặn, dùng cho backend huấn luyện định kỳ;
+      trả về True nếu vừa có đường dự báo mới;
+    - `forecast()`: đường dự báo [[ts, kW], ...] sau `now_ms`, hoặc [] nếu chưa sẵn sàng.
+    """
+    name = "base"
+    label = "Cơ sở"
+
+    def observe(self, ts_ms, value):
+        pass
+
+    def observe_many(self, timestamps, values):
+        for ts, value in zip(np.asarray(timestamps).tolist(), np.asarray(values).tolist()):
+            self.observe(ts, value)
+
+    def refresh(self, now_ts, load_history):
+        return False
+
+    def forecast(self, now_ms, horizon_minutes):
+        return []
+
+    def close(self):
+        pass
+
+
+class HoltWintersForecaster(Forecaster):
+    """
+    Holt-Winters cộng tính có giảm chấn xu hướng, cập nhật trực tuyến.
+
+    Mỗi điểm tải chỉ cộng dồn vào bucket đang mở (O(1)); khi bucket đóng, mức, xu hướng
+    và hệ số mùa vụ của ô tương ứng trong ngày được cập nhật một lần (O(1)).
+    Mùa vụ đầu tiên chỉ để khởi tạo: hệ số mùa vụ là độ lệch so với trung bình ngày đầu.
+    Đường dự báo chỉ đổi khi có bucket mới đóng nên được cache theo bucket.
+    """
+    name = "holt-winters"
+    label = "Holt-Winters"
+
+    def __init__(self, bucket_ms=FORECAST_BUCKET_MS, season_ms=SEASON_MS,
+                 alpha=HW_ALPHA, beta=HW_BETA, gamma=HW_GAMMA, phi=HW_PHI):
+        self.bucket_ms = bucket_ms
+        self.slots = season_ms // bucket_ms
+        self.alpha, self.beta, self.gamma, self.phi = alpha, beta, gamma, phi
+        self.level = None
+        self.trend = 0.0
+        self.season = np.zeros(self.slots)
+        self._warmup = []
+        self._last_bucket = None
+        self._open_bucket = None
+        self._open_sum = 0.0
+        self._open_count = 0
+        self.updates = 0
+        self._cache = (None, None)
+
+    @property
+    def ready(self):
+        return self.level is not None
+
+    def observe(self, ts_ms, value):
+        bucket = ts_ms // self.bucket_ms
+        if bucket != self._open_bucket:
+            self._close_bucket()
+            self._open_bucket = bucket
+        self._open_sum += value
+        self._open_count += 1
+
+    def observe_many(self, timestamps, values):
+        """Gom điểm theo bucket bằng reduceat; vòng lặp Python chỉ chạy theo số bucket."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(timestamps) == 0:
+            return
+        buckets = timestamps // self.bucket_ms
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        sums = np.add.reduceat(values, starts).tolist()
+        counts = np.diff(np.r_[starts, len(values)]).tolist()
+        for bucket, total, count in zip(buckets[starts].tolist(), sums, counts):
+            if bucket != self._open_bucket:
+                self._close_bucket()
+                self._open_bucket = bucket
+            self._open_sum += total
+            self._open_count += count
+
+    def _close_bucket(self):
+        if self._open_count:
+            self._update(self._open_bucket, self._open_sum / self._open_count)
+        self._open_sum, self._open_count = 0.0, 0
+
+    def _update(self, bucket, y):
+        slot = bucket % self.slots
+        if self.level is None:
+            self._warmup.append((bucket, y))
+            if bucket - self._warmup[0][0] + 1 >= self.slots:
+                self._initialize()
+            return
+        # Bucket trống (máy nén tắt) được bỏ qua nhưng xu hướng vẫn được chiếu tới.
+        gap = max(bucket - self._last_bucket, 1)
+        damping = self.phi ** np.arange(1, gap + 1)
+        projected_level = self.level + self.trend * damping.sum()
+        projected_trend = self.trend * damping[-1]
+        level = self.alpha * (y - self.season[slot]) + (1 - self.alpha) * projected_level
+        self.trend = self.beta * (level - self.level) / gap + (1 - self.beta) * projected_trend
+        self.level = level
+        self.season[slot] = self.gamma * (y - level) + (1 - self.gamma) * self.season[slot]
+        self._last_bucket = bucket
+        self.updates += 1
+
+    def _initialize(self):
+        buckets = np.array([b for b, _ in self._warmup])
+        values = np.array([v for _, v in self._warmup])
+        mean = values.mean()
+        self.season[buckets % self.slots] = values - mean
+        self.level = mean
+        self._last_bucket = int(buckets[-1])
+        self._warmup = []
+        self.updates += 1
+
+    def forecast(self, now_ms, horizon_minutes):
+        if self.level is None:
+            return []
+        key = (self.updates, now_ms // self.bucket_ms, horizon_minutes)
+        if self._cache[0] == key:
+            return self._cache[1]
+        first = now_ms // self.bucket_ms + 1
+        steps = np.arange(first, first + horizon_minutes * 60_000 // self.bucket_ms)
+        h = steps - self._last_bucket
+        # Tổng phi^1..phi^h của xu hướng giảm chấn.
+        damped = self.phi * (1 - self.phi ** h) / (1 - self.phi) if self.phi != 1 else h
+        values = self.level + self.trend * damped + self.season[steps % self.slots]
+        curve = [[t, v] for t, v in zip((steps * self.bucket_ms).tolist(), values.round(2).tolist())]
+        self._cache = (key, curve)
+        return curve
+
+
+class ProphetForecaster(Forecaster):
+    """
+    Prophet huấn luyện lại toàn bộ theo chu kỳ trong tiến trình riêng (`ForecastWorker`).
+    Đường dự báo của lần huấn luyện gần nhất được giữ lại cho tới lần sau.
+    """
+    name = "prophet"
+    label = "Prophet"
+
+    def __init__(self, refit_s=PROPHET_REFIT_SECONDS, context_hours=PROPHET_CONTEXT_HOURS, periods_minutes=240):
+        self.refit_s = refit_s
+        self.context_hours = context_hours
+        self.periods_minutes = periods_minutes
+        self.worker = ForecastWorker()
+        self.last_fit_time = 0
+        self.result = None
+
+    def refresh(self, now_ts, load_history):
+        result = self.worker.poll()
+        if result is not None:
+            self.result = result
+            FORECAST_FIT_DURATION.labels(backend=self.name).observe(result["fit_seconds"])
+
+        if now_ts - self.last_fit_time >= self.refit_s and not self.worker.busy:
+            self.last_fit_time = now_ts
+            history_ts, history_values = load_history.range(int((now_ts - self.context_hours * 3600) * 1000))
+            if len(history_ts) < PROPHET_MIN_POINTS:
+                print("Chưa đủ dữ liệu lịch sử để dự báo.")
+            else:
+                print("AI Agent bắt đầu chạy dự báo với Prophet...")
+                # Prophet chạy trong tiến trình riêng; kết quả được áp dụng ở các tick sau.
+                self.worker.submit(fit_prophet_forecast, history_ts.copy(), history_values.copy(), self.periods_minutes)
+        return result is not None
+
+    def forecast(self, now_ms, horizon_minutes):
+        if self.result is None:
+            return []
+        end_ms = now_ms + horizon_minutes * 60_000
+        return [point for point in self.result["curve"] if now_ms < point[0] <= end_ms]
+
+    def close(self):
+        self.worker.shutdown()
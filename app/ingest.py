@@ -0,0 +1,231 @@
+import asyncio
+import json
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from .metrics import Counter, Histogram, REGISTRY, SIZE_BUCKETS
+
+# --- Hằng số Cấu hình ---
+INGEST_QUEUE_BATCHES = 1024          # Số lô tối đa chờ được áp dụng
+MAX_READINGS_PER_TICK = 500_000      # Giới hạn số giá trị áp dụng trong một tick
+MAX_BATCH_READINGS = 200_000         # Giới hạn số giá trị trong một request/thông điệp
+MAX_CLOCK_SKEW_MS = 5_000            # Timestamp vượt quá hiện tại hơn mức này bị từ chối
+
+# Chỉ số cấp kho (không kèm device_id).
+SITE_METRICS = ("zone_a_temp", "zone_b_temp", "humidity", "door_open", "compressor_power_kw")
+# Chỉ số cấp thiết bị (bắt buộc device_id), ánh xạ sang tên chuỗi lịch sử chi tiết.
+DEVICE_METRICS = {
+    "current_a": "Dòng điện (A)",
+    "pressure_psi": "Áp suất (PSI)",
+    "vibration_mm_s": "Độ rung (mm/s)",
+}
+_RESERVED_FIELDS = ("timestamp", "timestamps", "device_id")
+
+INGEST_READINGS = REGISTRY.register(Counter(
+    "cold_storage_ingest_readings_total", "Số giá trị cảm biến đã nhận.", ("source",)))
+INGEST_REJECTED = REGISTRY.register(Counter(
+    "cold_storage_ingest_rejected_total", "Số giá trị cảm biến bị bỏ (hàng đợi đầy, sai thứ tự thời gian, thiết bị lạ).", ("reason",)))
+INGEST_BATCH_SIZE = REGISTRY.register(Histogram(
+    "cold_storage_ingest_batch_readings", "Số giá trị trong mỗi lô nhận được.", buckets=SIZE_BUCKETS))
+
+
+class ReadingBatch:
+    """
+    Một lô giá trị cảm biến dạng cột: mỗi chuỗi là cặp mảng (timestamps ms, giá trị).
+    Khóa của `series` là (device_id hoặc None, tên chỉ số).
+    """
+    def __init__(self, series=None):
+        self.series = series or {}
+
+    def __len__(self):
+        return sum(len(ts) for ts, _ in self.series.values())
+
+    @property
+    def device_ids(self):
+        return {device_id for device_id, _ in self.series if device_id is not None}
+
+    @classmethod
+    def merge(cls, batches):
+        parts = defaultdict(list)
+        for batch in batches:
+            for key, column in batch.series.items():
+                parts[key].append(column)
+        return cls({
+            key: (np.concatenate([ts for ts, _ in columns]), np.concatenate([v for _, v in columns]))
+            for key, columns in parts.items()
+        })
+
+
+def _to_float(metric, value):
+    if metric == "door_open" and isinstance(value, str):
+        if value.upper() not in ("OPEN", "CLOSED"):
+            raise ValueError(f"Trạng thái cửa không hợp lệ: {value!r}")
+        return 1.0 if value.upper() == "OPEN" else 0.0
+    if isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, (int, float)):
+        raise ValueError(f"Giá trị của '{metric}' phải là số.")
+    if not math.isfinite(value):
+        raise ValueError(f"Giá trị của '{metric}' phải là số hữu hạn.")
+    return float(value)
+
+
+def _numeric_array(name, values, kinds):
+    """Mảng 1 chiều từ list JSON; chuỗi, null hay mảng lồng nhau bị từ chối như ở dạng hàng."""
+    array = np.asarray(values)
+    if array.ndim != 1 or (len(array) and array.dtype.kind not in kinds):
+        raise ValueError(f"Mảng '{name}' chỉ được chứa số.")
+    return array
+
+
+def _to_timestamp(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError("Timestamp phải là số mili giây.")
+    return int(value)
+
+
+def _check_timestamps(ts, now_ms):
+    if len(ts) and int(ts.max()) > now_ms + MAX_CLOCK_SKEW_MS:
+        raise ValueError(f"Timestamp vượt quá thời điểm hiện tại ({now_ms} ms) hơn {MAX_CLOCK_SKEW_MS} ms.")
+
+
+def _check_metric(metric, device_id):
+    if device_id is None and metric not in SITE_METRICS:
+        raise ValueError(f"Chỉ số cấp kho không hợp lệ: '{metric}'.")
+    if device_id is not None and metric not in DEVICE_METRICS:
+        raise ValueError(f"Chỉ số thiết bị không hợp lệ: '{metric}'.")
+
+
+def parse_rows(rows, now_ms):
+    """
+    Các bản ghi dạng hàng, mỗi bản ghi:
+    {"timestamp": ms (tùy chọn), "device_id": (tùy chọn), "<chỉ số>": giá trị, ...}
+    """
+    columns = defaultdict(lambda: ([], []))
+    for row in rows:
+        if not isinstance(row, dict):
+            raise ValueError("Mỗi bản ghi phải là một object JSON.")
+        ts = _to_timestamp(row["timestamp"]) if "timestamp" in row else now_ms
+        device_id = row.get("device_id")
+        for metric, value in row.items():
+            if metric in _RESERVED_FIELDS:
+                continue
+            _check_metric(metric, device_id)
+            column = columns[(device_id, metric)]
+            column[0].append(ts)
+            column[1].append(_to_float(metric, value))
+    batch = ReadingBatch({
+        key: (np.array(ts, dtype=np.int64), np.array(values, dtype=np.float64))
+        for key, (ts, values) in columns.items()
+    })
+    for ts, _ in batch.series.values():
+        _check_timestamps(ts, now_ms)
+    return batch
+
+
+def parse_columnar(payload, now_ms):
+    """
+    Dạng cột: {"timestamps": [ms, ...], "device_id": (tùy chọn), "<chỉ số>": [giá trị, ...], ...}.
+    Mỗi mảng giá trị phải dài bằng mảng timestamps.
+    """
+    timestamps = payload.get("timestamps")
+    device_id = payload.get("device_id")
+    metrics = {metric: values for metric, values in payload.items() if metric not in _RESERVED_FIELDS}
+    if timestamps is None:
+        length = len(next(iter(metrics.values()), []))
+        timestamps = [now_ms] * length
+    ts = _numeric_array("timestamps", timestamps, "iuf")
+    if not np.isfinite(ts).all():
+        raise ValueError("Timestamp phải là số mili giây.")
+    ts = ts.astype(np.int64)
+    _check_timestamps(ts, now_ms)
+    series = {}
+    for metric, values in metrics.items():
+        _check_metric(metric, device_id)
+        if not isinstance(values, list) or len(values) != len(ts):
+            raise ValueError(f"Mảng '{metric}' phải dài bằng mảng timestamps.")
+        if metric == "door_open":
+            column = np.array([_to_float(metric, v) for v in values], dtype=np.float64)
+        else:
+            column = _numeric_array(metric, values, "biuf").astype(np.float64)
+            if not np.isfinite(column).all():
+                raise ValueError(f"Mảng '{metric}' chỉ được chứa số hữu hạn.")
+        series[(device_id, metric)] = (ts, column)
+    return ReadingBatch(series)
+
+
+def _parse_ndjson(body, now_ms):
+    lines = [line for line in body.splitlines() if line.strip()]
+    # Một lần json.loads cho cả lô nhanh hơn nhiều so với từng dòng.
+    return parse_rows(json.loads(b"[" + b",".join(lines) + b"]"), now_ms)
+
+
+def parse_payload(body, content_type, now_ms):
+    """
+    Phân tích thân request/thông điệp: NDJSON, mảng bản ghi JSON, object dạng cột hoặc
+    một bản ghi đơn. Không có content type NDJSON thì nhận dạng NDJSON khi body có nhiều dòng JSON.
+    """
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return _parse_ndjson(body, now_ms)
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError:
+        if b"\n" not in body.strip():
+            raise
+        return _parse_ndjson(body, now_ms)
+    if isinstance(payload, list):
+        return parse_rows(payload, now_ms)
+    if isinstance(payload, dict):
+        if any(isinstance(value, list) for value in payload.values()):
+            return parse_columnar(payload, now_ms)
+        return parse_rows([payload], now_ms)
+    raise ValueError("Payload phải là NDJSON, mảng bản ghi hoặc object dạng cột.")
+
+
+class IngestQueue:
+    """
+    Hàng đợi các lô đã phân tích, nằm giữa API nhận dữ liệu và vòng lặp mô phỏng.
+    Request HTTP bị từ chối ngay khi hàng đợi đầy; luồng WebSocket thì chờ (backpressure).
+    Vòng lặp mô phỏng gọi `drain()` mỗi tick để gộp mọi lô đang chờ thành một lô duy nhất.
+    """
+    def __init__(self, maxsize=INGEST_QUEUE_BATCHES):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    def offer(self, batch, source):
+        try:
+            self.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            INGEST_REJECTED.labels(reason="queue_full").inc(len(batch))
+            return False
+        self._record(batch, source)
+        return True
+
+    async def put(self, batch, source):
+        await self.queue.put(batch)
+        self._record(batch, source)
+
+    def drain(self, max_readings=MAX_READINGS_PER_TICK):
+        batches, total = [], 0
+        while total < max_readings:
+            try:
+                batch = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            batches.append(batch)
+            total += len(batch)
+        if not batches:
+            return None
+        return batches[0] if len(batches) == 1 else ReadingBatch.merge(batches)
+
+    @staticmethod
+    def _record(batch, source):
+        INGEST_READINGS.labels(source=source).inc(len(batch))
+        INGEST_BATCH_SIZE.observe(len(batch))
+
+
+ingest_queue = IngestQueue()
@@ -1,12 +1,22 @@
 # app/main.py (Phiên bản cuối cùng, đã thêm CORS)
 
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter() # Mốc đo thời gian khởi động của worker
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware # Thêm dòng import này
 import asyncio
 
-from .routers import dashboard, energy, health, reports, ai_agent, state
-from .simulation import run_simulation
+from .routers import dashboard, energy, health, reports, ai_agent, state, metrics, ingest, export
+from .runtime import run_fleet_simulation, run_simulation, storage
+from .metrics import RouteMetricsMiddleware, monitor_event_loop_lag
+from .commands import close_command_client
+from .sharedstate import ROLE, WriterUnavailableError
+
+# Mục tiêu thời gian từ lúc import app tới khi sẵn sàng phục vụ request.
+STARTUP_TARGET_SECONDS = 1.0
 
 app = FastAPI(title="Cold Storage AI Platform")
 
@@ -23,6 +33,8 @@ app.add_middleware(
     allow_methods=["*"], # Cho phép tất cả các method (GET, POST, etc.)
     allow_headers=["*"], # Cho phép tất cả các header
 )
+# Đo thời gian xử lý mỗi request theo route, xuất ra tại /metrics.
+app.add_middleware(RouteMetricsMiddleware)
 # ---------------------------------
 
 
@@ -34,8 +46,29 @@ app.include_router(health.router)
 app.include_router(reports.router)
 app.include_router(ai_agent.router)
 app.include_router(state.router)
+app.include_router(metrics.router)
+app.include_router(ingest.router)
+app.include_router(export.router)
+
+@app.exception_handler(WriterUnavailableError)
+async def writer_unavailable_handler(request: Request, exc: WriterUnavailableError):
+    # Chỉ xảy ra ở worker chỉ đọc khi tiến trình ghi chưa chạy hoặc đang khởi động lại.
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "2"})
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(run_simulation())
-    asyncio.create_task(dashboard.broadcast_dashboard_data())
\ No newline at end of file
+    # Worker chỉ đọc không chạy mô phỏng; tiến trình ghi (python -m app.writer) làm việc đó.
+    if ROLE != "reader":
+        asyncio.create_task(run_simulation())
+        asyncio.create_task(run_fleet_simulation())
+    asyncio.create_task(dashboard.broadcast_dashboard_data())
+    asyncio.create_task(monitor_event_loop_lag())
+    startup_seconds = time.perf_counter() - _import_started
+    print(f"Khởi động hoàn tất sau {startup_seconds * 1000:.0f} ms.")
+    if startup_seconds > STARTUP_TARGET_SECONDS:
+        print(f"Cảnh báo: thời gian khởi động vượt mục tiêu {STARTUP_TARGET_SECONDS:.1f} giây.")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_command_client()
+    storage.close()
@@ -0,0 +1,196 @@
+from itertools import chain
+
+import numpy as np
+
+# --- Bảo trì dự đoán ---
+# Mỗi chuỗi lịch sử chi tiết của thiết bị (dòng điện, áp suất, độ rung) được khớp đường xu
+# hướng tuyến tính trên FIT_WINDOW điểm gần nhất. Mọi chuỗi của các thiết bị có dữ liệu mới
+# được khớp cùng lúc trong một ma trận (mỗi hàng một chuỗi, đệm NaN), từ đó suy ra số ngày
+# còn lại tới ngưỡng hỏng (RUL) và xác suất vượt ngưỡng trong HORIZON_DAYS ngày tới.
+# Kết quả của thiết bị không có dữ liệu mới được giữ nguyên.
+FIT_WINDOW = 90
+MIN_POINTS = 5
+BASELINE_POINTS = 10    # Mức nền của ngưỡng tương đối: trung bình các điểm đầu cửa sổ.
+RECENT_POINTS = 10      # Số điểm gần nhất dùng cho đặc trưng dải độ rung.
+HORIZON_DAYS = 30
+TREND_T = 2.0           # Xu hướng yếu hơn TREND_T lần sai số chuẩn của độ dốc được xem là nhiễu.
+MIN_RESIDUAL_STD = 1e-3
+RISK_LEVELS = ((0.5, "Cao"), (0.2, "Trung bình"), (0.0, "Thấp"))
+
+# Vùng độ rung theo ISO 10816-1 cho máy nhỏ (mm/s): ranh giới A/B, B/C, C/D, và xác suất
+# sự cố tối thiểu khi giá trị RMS gần đây nằm trong từng vùng.
+VIBRATION_ZONES = (0.71, 1.8, 4.5)
+VIBRATION_ZONE_NAMES = ("A", "B", "C", "D")
+VIBRATION_ZONE_PROBABILITY = (0.0, 0.05, 0.5, 0.95)
+
+# Ngưỡng hỏng theo chỉ số: tuyệt đối, hoặc tương đối so với mức nền (`two_sided`: lệch về
+# phía nào cũng tính, theo chiều của xu hướng).
+METRIC_LIMITS = {
+    "Dòng điện (A)": {"relative": 0.25},
+    "Áp suất (PSI)": {"relative": 0.10, "two_sided": True},
+    "Độ rung (mm/s)": {"absolute": VIBRATION_ZONES[1], "vibration": True},
+}
+
+_DAY_MS = 86_400_000
+
+
+def _normal_sf(z):
+    """P(Z > z) của phân phối chuẩn, xấp xỉ erfc theo Abramowitz-Stegun 7.1.26 (sai số < 1.5e-7)."""
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    tail = 0.5 * poly * np.exp(-x * x)
+    return np.where(z >= 0, tail, 1.0 - tail)
+
+
+def fit_series(rows, limits, horizon_days=HORIZON_DAYS):
+    """
+    Khớp xu hướng cho nhiều chuỗi [[ts, giá trị], ...] cùng lúc. Trả về dict các mảng
+    (một phần tử mỗi chuỗi): level, slope (đơn vị/ngày), limit, rul_days (inf nếu không
+    suy giảm), probability, as_of, và rms/zone cho chuỗi độ rung (NaN/-1 với chuỗi khác).
+    """
+    count = np.array([len(points) for points in rows])
+    n, width, total = len(rows), int(count.max()), int(count.sum())
+    # Đọc mọi điểm trong một lần rồi rải vào ma trận đệm NaN.
+    flat = np.fromiter(chain.from_iterable(chain.from_iterable(rows)), dtype=np.float64, count=2 * total).reshape(-1, 2)
+    row = np.repeat(np.arange(n), count)
+    col = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+    ts = np.full((n, width), np.nan)
+    y = np.full((n, width), np.nan)
+    ts[row, col], y[row, col] = flat[:, 0], flat[:, 1]
+    mask = ~np.isnan(y)
+    as_of = ts[np.arange(n), count - 1]
+
+    # Bình phương tối thiểu theo hàng, x = số ngày tính tới điểm cuối (x <= 0).
+    x = np.where(mask, (ts - as_of[:, None]) / _DAY_MS, 0.0)
+    y0 = np.where(mask, y, 0.0)
+    mean_x, mean_y = x.sum(axis=1) / count, y0.sum(axis=1) / count
+    dx = np.where(mask, x - mean_x[:, None], 0.0)
+    sxx = (dx * dx).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where(sxx > 0, (dx * (y0 - mean_y[:, None])).sum(axis=1) / sxx, 0.0)
+        level = mean_y - slope * mean_x
+        resid = np.where(mask, y0 - (level[:, None] + slope[:, None] * x), 0.0)
+        resid_std = np.maximum(np.sqrt((resid * resid).sum(axis=1) / np.maximum(count - 2, 1)), MIN_RESIDUAL_STD)
+        slope_se = np.where(sxx > 0, resid_std / np.sqrt(sxx), 0.0)
+
+    # Ngưỡng hỏng và chiều suy giảm (+1: vượt lên trên, -1: xuống dưới ngưỡng).
+    baseline = np.nanmean(y[:, :BASELINE_POINTS], axis=1)
+    absolute = np.array([spec.get("absolute", np.nan) for spec in limits])
+    relative = np.array([spec.get("relative", 0.0) for spec in limits])
+    two_sided = np.array([spec.get("two_sided", False) for spec in limits])
+    direction = np.where(two_sided & (slope < 0), -1.0, 1.0)
+    limit = np.where(np.isnan(absolute), baseline * (1 + direction * relative), absolute)
+
+    margin = (limit - level) * direction
+    rate = slope * direction
+    with np.errstate(divide="ignore"):
+        rul = np.where(margin <= 0, 0.0, np.where(rate > TREND_T * slope_se, margin / rate, np.inf))
+    projected_std = np.sqrt(resid_std ** 2 + (slope_se * horizon_days) ** 2)
+    probability = _normal_sf((limit - (level + slope * horizon_days)) * direction / projected_std)
+
+    # Đặc trưng dải độ rung: RMS các điểm gần nhất và vùng ISO tương ứng.
+    vibration = np.array([spec.get("vibration", False) for spec in limits])
+    recent = np.where(np.arange(width) >= (count - RECENT_POINTS)[:, None], y, np.nan)
+    rms = np.where(vibration, np.sqrt(np.nanmean(recent * recent, axis=1)), np.nan)
+    zone = np.where(vibration, np.searchsorted(VIBRATION_ZONES, np.nan_to_num(rms), side="right"), -1)
+    probability = np.where(vibration, np.maximum(probability, np.take(VIBRATION_ZONE_PROBABILITY, np.maximum(zone, 0))), probability)
+
+    return {"level": level, "slope": slope, "limit": limit, "rul_days": rul, "probability": probability,
+            "as_of": as_of, "rms": rms, "zone": zone}
+
+
+class MaintenanceEngine:
+    """
+    Dự đoán RUL và xác suất sự cố cho mọi thiết bị. `mark()` đánh dấu thiết bị có dữ liệu
+    mới; `refresh()` khớp lại đúng các thiết bị đó trong một lượt vector hóa. `predictions`
+    (id -> dict) là một dict mới sau mỗi lần thay đổi nên có thể dùng làm khóa cache.
+    """
+    def __init__(self, horizon_days=HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self.predictions = {}
+        self.version = 0
+        self._dirty = set()
+
+    def mark(self, device_id):
+        self._dirty.add(device_id)
+
+    def mark_all(self, device_ids):
+        self._dirty.update(device_ids)
+
+    def refresh(self, details):
+        """Khớp lại các thiết bị đã đánh dấu (`details`: id -> {"history": {...}}). Trả về True nếu có thay đổi."""
+        dirty = [device_id for device_id in self._dirty if device_id in details]
+        self._dirty.clear()
+        if not dirty:
+            return False
+        keys, rows = [], []
+        for device_id in dirty:
+            for metric, points in details[device_id]["history"].items():
+                if metric in METRIC_LIMITS and len(points) >= MIN_POINTS:
+                    keys.append((device_id, metric))
+                    rows.append(points[-FIT_WINDOW:])
+        drivers = {device_id: [] for device_id in dirty}
+        if rows:
+            fit = fit_series(rows, [METRIC_LIMITS[metric] for _, metric in keys], self.horizon_days)
+            columns = {name: values.tolist() for name, values in fit.items()}
+            for i, (device_id, metric) in enumerate(keys):
+                drivers[device_id].append(self._driver(metric, {name: values[i] for name, values in columns.items()}))
+        predictions = dict(self.predictions)
+        for device_id, device_drivers in drivers.items():
+            predictions[device_id] = self._predict(device_drivers)
+        self.predictions = predictions
+        self.version += 1
+        return True
+
+    def _driver(self, metric, fit):
+        driver = {
+            "metric": metric,
+            "level": round(fit["level"], 3),
+            "slope_per_day": round(fit["slope"], 5),
+            "limit": round(fit["limit"], 3),
+            "rul_days": None if fit["rul_days"] == float("inf") else round(fit["rul_days"], 1),
+            "failure_probability": round(fit["probability"], 3),
+            "as_of": int(fit["as_of"]),
+        }
+        if fit["zone"] >= 0:
+            driver["rms"] = round(fit["rms"], 3)
+            driver["vibration_zone"] = VIBRATION_ZONE_NAMES[fit["zone"]]
+        return driver
+
+    def _predict(self, drivers):
+        if not drivers:
+            return {"rul_days": None, "failure_probability": None, "horizon_days": self.horizon_days,
+                    "risk": None, "drivers": [], "analysis": "Chưa đủ dữ liệu lịch sử để dự đoán bảo trì."}
+        drivers.sort(key=lambda d: d["failure_probability"], reverse=True)
+        probability = 1.0 - float(np.prod([1.0 - d["failure_probability"] for d in drivers]))
+        ruls = [d for d in drivers if d["rul_days"] is not None]
+        nearest = min(ruls, key=lambda d: d["rul_days"]) if ruls else None
+        risk = next(label for threshold, label in RISK_LEVELS if probability >= threshold)
+        return {
+            "rul_days": nearest["rul_days"] if nearest else None,
+            "failure_probability": round(probability, 3),
+            "horizon_days": self.horizon_days,
+            "risk": risk,
+            "drivers": drivers,
+            "analysis": self._analysis(drivers, nearest, probability, risk),
+        }
+
+    def _analysis(self, drivers, nearest, probability, risk):
+        parts = []
+        if nearest is None:
+            parts.append("Không phát hiện xu hướng suy giảm ở các chỉ số theo dõi.")
+        elif nearest["rul_days"] == 0:
+            parts.append(f"{nearest['metric']} đã vượt ngưỡng {nearest['limit']:g}.")
+        else:
+            parts.append(f"{nearest['metric']} có xu hướng tiến tới ngưỡng {nearest['limit']:g}, "
+                         f"dự kiến còn khoảng {nearest['rul_days']:.0f} ngày.")
+        for driver in drivers:
+            if "vibration_zone" in driver and driver["vibration_zone"] != "A":
+                parts.append(f"Độ rung RMS {driver['rms']:.2f} mm/s, vùng {driver['vibration_zone']} theo ISO 10816.")
+        parts.append(f"Dự báo {probability:.0%} khả năng sự cố trong {self.horizon_days} ngày tới.")
+        if risk == "Cao":
+            parts.append("Khuyến nghị: Lên lịch kiểm tra trong tuần này.")
+        elif risk == "Trung bình":
+            parts.append("Khuyến nghị: Theo dõi và kiểm tra ở lần bảo trì định kỳ tới.")
+        return " ".join(parts)
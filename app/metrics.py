@@ -0,0 +1,232 @@
+import asyncio
+import time
+from bisect import bisect_left
+
+# --- Chỉ số vận hành, xuất ra dạng văn bản Prometheus tại /metrics ---
+# Mỗi lần ghi chỉ là vài phép cộng và một lần tìm kiếm nhị phân trên danh sách bucket
+# nên có thể gọi trên các đường nóng (tick, phát WebSocket, mỗi request).
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FIT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+LOOP_LAG_INTERVAL_SECONDS = 0.5
+
+
+def _escape_label_value(value):
+    """Thoát `\\`, `"` và xuống dòng trong giá trị nhãn theo định dạng văn bản Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        return self._children[()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(self._render_child(tuple(zip(self.labelnames, key)), child))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, labels, child):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Gauge(_Metric):
+    """Gauge; có thể truyền `function` để giá trị được tính lúc scrape thay vì trên đường nóng."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def render(self):
+        if self.function is not None:
+            self._default().set(self.function())
+        return super().render()
+
+    def _render_child(self, labels, child):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def _render_child(self, labels, child):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+            lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Chỉ số '{metric.name}' đã được đăng ký.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Các chỉ số của ứng dụng ---
+TICK_DURATION = REGISTRY.register(Histogram(
+    "cold_storage_tick_duration_seconds", "Thời gian chạy một tick ColdStorage.update()."))
+FORECAST_FIT_DURATION = REGISTRY.register(Histogram(
+    "cold_storage_forecast_fit_seconds", "Thời gian huấn luyện một mô hình dự báo.", ("backend",), buckets=FIT_BUCKETS))
+BROADCAST_DURATION = REGISTRY.register(Histogram(
+    "cold_storage_broadcast_seconds", "Thời gian tính delta và đưa vào hàng đợi của mọi client WebSocket."))
+WEBSOCKET_SEND_DURATION = REGISTRY.register(Histogram(
+    "cold_storage_websocket_send_seconds", "Thời gian gửi một thông điệp tới một client WebSocket."))
+WEBSOCKET_PAYLOAD_BYTES = REGISTRY.register(Histogram(
+    "cold_storage_websocket_payload_bytes", "Kích thước thông điệp WebSocket.", ("type",), buckets=SIZE_BUCKETS))
+WEBSOCKET_DROPPED = REGISTRY.register(Counter(
+    "cold_storage_websocket_coalesced_total", "Số lần hàng đợi client đầy và bị gộp thành snapshot."))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "cold_storage_http_request_seconds", "Thời gian xử lý request HTTP theo route.", ("method", "route", "status")))
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    "cold_storage_event_loop_lag_seconds", "Độ trễ của event loop so với lịch ngủ dự kiến."))
+
+
+def register_gauge(name, documentation, function):
+    """Đăng ký gauge tính lúc scrape (số kết nối, kích thước bộ đệm...)."""
+    return REGISTRY.register(Gauge(name, documentation, function=function))
+
+
+class RouteMetricsMiddleware:
+    """
+    Middleware ASGI đo thời gian mỗi request HTTP. Nhãn là mẫu đường dẫn của route
+    (ví dụ /api/state) để số chuỗi thời gian không phụ thuộc vào tham số.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"], route=getattr(route, "path", "unmatched"), status=status,
+            ).observe(time.perf_counter() - started)
+
+
+async def monitor_event_loop_lag(interval=LOOP_LAG_INTERVAL_SECONDS):
+    """Ngủ đều đặn và ghi lại phần thời gian bị trễ so với dự kiến."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - expected, 0.0))
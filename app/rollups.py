@@ -0,0 +1,184 @@
+import numpy as np
+
+from .timeseries import RingBuffer, to_pairs
+
+# --- Hằng số Cấu hình ---
+# Độ phân giải (ms) và số bucket giữ lại của từng mức tổng hợp.
+ROLLUP_LEVELS = (
+    ("minute", 60_000, 7 * 24 * 60),
+    ("hour", 3_600_000, 400 * 24),
+    ("day", 86_400_000, 10 * 365),
+)
+# Dữ liệu thô được giảm mẫu bằng LTTB nếu không vượt quá số lần này so với max_points.
+LTTB_MAX_INPUT_FACTOR = 8
+
+# Thứ tự cột trong mỗi bucket.
+MIN, MAX, SUM, COUNT, KWH = range(5)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Chỉ số các điểm được chọn bởi Largest-Triangle-Three-Buckets.
+    Mỗi bucket đầu ra được xử lý bằng phép toán vector hóa nên chi phí Python
+    tỉ lệ với số điểm đầu ra, không phải số điểm đầu vào.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+class RollupLevel:
+    """
+    Các bucket cùng độ phân giải (min/max/tổng/số điểm/kWh). Bucket đã đóng nằm
+    trong ring buffer, bucket đang mở được giữ riêng và cập nhật O(1) mỗi điểm.
+    """
+    def __init__(self, name, bucket_ms, capacity):
+        self.name = name
+        self.bucket_ms = bucket_ms
+        self.buckets = RingBuffer(capacity, width=5)
+        self._open_ts = None
+        self._open = None
+
+    def add(self, ts_ms, value, kwh):
+        bucket_ts = ts_ms - ts_ms % self.bucket_ms
+        if bucket_ts != self._open_ts:
+            self._close()
+            self._open_ts = bucket_ts
+            self._open = [value, value, 0.0, 0, 0.0]
+        row = self._open
+        row[MIN] = min(row[MIN], value)
+        row[MAX] = max(row[MAX], value)
+        row[SUM] += value
+        row[COUNT] += 1
+        row[KWH] += kwh
+
+    def add_many(self, timestamps, values, kwh):
+        """Thêm nhiều điểm theo thứ tự thời gian, gom bucket bằng reduceat."""
+        if len(timestamps) == 0:
+            return
+        bucket_ts = timestamps - timestamps % self.bucket_ms
+        starts = np.flatnonzero(np.r_[True, bucket_ts[1:] != bucket_ts[:-1]])
+        rows = np.column_stack((
+            np.minimum.reduceat(values, starts),
+            np.maximum.reduceat(values, starts),
+            np.add.reduceat(values, starts),
+            np.diff(np.r_[starts, len(values)]),
+            np.add.reduceat(kwh, starts),
+        ))
+        keys = bucket_ts[starts]
+        if keys[0] == self._open_ts:
+            first = rows[0]
+            self._open = [min(self._open[MIN], first[MIN]), max(self._open[MAX], first[MAX]),
+                          self._open[SUM] + first[SUM], self._open[COUNT] + int(first[COUNT]), self._open[KWH] + first[KWH]]
+            keys, rows = keys[1:], rows[1:]
+        if len(keys) == 0:
+            return
+        self._close()
+        self.buckets.extend(keys[:-1], rows[:-1])
+        self._open_ts, self._open = int(keys[-1]), rows[-1].tolist()
+
+    def _close(self):
+        if self._open_ts is not None:
+            self.buckets.append(self._open_ts, self._open)
+        self._open_ts = self._open = None
+
+    def oldest(self):
+        if len(self.buckets):
+            return int(self.buckets.timestamps[0])
+        return self._open_ts
+
+    def count(self, start_ms, end_ms):
+        ts, _ = self.buckets.range(start_ms, end_ms)
+        return len(ts) + (self._open_ts is not None and (end_ms is None or self._open_ts <= end_ms))
+
+    def range(self, start_ms, end_ms):
+        """Các bucket (kể cả bucket đang mở) có timestamp trong khoảng."""
+        ts, rows = self.buckets.range(start_ms, end_ms)
+        if self._open_ts is not None and (start_ms is None or self._open_ts >= start_ms) and (end_ms is None or self._open_ts <= end_ms):
+            ts = np.append(ts, self._open_ts)
+            rows = np.vstack((rows, self._open))
+        return ts, rows
+
+
+class Rollups:
+    """
+    Tổng hợp nhiều độ phân giải (phút/giờ/ngày) cho một chuỗi tải, cập nhật tăng
+    dần khi có điểm mới, cùng chuỗi thô để trả dữ liệu biểu đồ theo khoảng thời gian
+    với chi phí tỉ lệ số điểm hiển thị.
+
+    Tải chỉ được ghi khi máy nén chạy, mỗi điểm đại diện cho một tick: kWh của một điểm
+    là công suất nhân khoảng cách tới điểm trước nhưng không quá `tick_ms`, phần còn lại
+    của khoảng trống là lúc máy nén nghỉ (như `EnergyAccountant`).
+    """
+    def __init__(self, raw, tick_ms):
+        self.raw = raw
+        self.tick_ms = tick_ms
+        self.levels = [RollupLevel(name, bucket_ms, capacity) for name, bucket_ms, capacity in ROLLUP_LEVELS]
+        self._last_ts = None
+
+    def add(self, ts_ms, value):
+        gap = 0 if self._last_ts is None else min(ts_ms - self._last_ts, self.tick_ms)
+        self._last_ts = ts_ms
+        kwh = value * gap / 3_600_000
+        for level in self.levels:
+            level.add(ts_ms, value, kwh)
+
+    def add_many(self, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(timestamps) == 0:
+            return
+        previous = np.r_[timestamps[0] if self._last_ts is None else self._last_ts, timestamps[:-1]]
+        kwh = values * np.minimum(timestamps - previous, self.tick_ms) / 3_600_000
+        self._last_ts = int(timestamps[-1])
+        for level in self.levels:
+            level.add_many(timestamps, values, kwh)
+
+    def query(self, start_ms, end_ms, max_points):
+        """
+        Chọn nguồn rẻ nhất đủ chi tiết cho khoảng [start_ms, end_ms]:
+        dữ liệu thô nếu đủ ít điểm, LTTB trên dữ liệu thô nếu khoảng nằm trong bộ
+        đệm thô, ngược lại là mức tổng hợp mịn nhất có không quá `max_points` lần
+        LTTB_MAX_INPUT_FACTOR bucket, giảm mẫu bằng LTTB. Mỗi điểm được chọn gộp các
+        bucket tới điểm kế tiếp nên min/max và kWh vẫn phủ toàn bộ khoảng.
+        """
+        oldest = [t for t in [self.levels[-1].oldest(), *(self.raw.timestamps[:1].tolist())] if t is not None]
+        effective_start = max(start_ms or 0, min(oldest)) if oldest else start_ms
+
+        raw_ts, raw_values = self.raw.range(start_ms, end_ms)
+        raw_covers = len(self.raw) > 0 and self.raw.timestamps[0] <= effective_start
+        if raw_covers and len(raw_ts) <= max_points:
+            return {"resolution": "raw", "load_history": to_pairs(raw_ts, raw_values)}
+        if raw_covers and len(raw_ts) <= max_points * LTTB_MAX_INPUT_FACTOR:
+            keep = lttb_indices(raw_ts, raw_values, max_points)
+            return {"resolution": "raw-lttb", "load_history": to_pairs(raw_ts[keep], raw_values[keep])}
+
+        level = next((l for l in self.levels if l.oldest() is not None and l.oldest() <= effective_start
+                      and l.count(start_ms, end_ms) <= max_points * LTTB_MAX_INPUT_FACTOR), self.levels[-1])
+        ts, rows = level.range(start_ms, end_ms)
+        avg = rows[:, SUM] / np.maximum(rows[:, COUNT], 1)
+        lo, hi, kwh = rows[:, MIN], rows[:, MAX], rows[:, KWH]
+        if len(ts) > max_points:
+            keep = lttb_indices(ts, avg, max_points)
+            lo, hi, kwh = np.minimum.reduceat(lo, keep), np.maximum.reduceat(hi, keep), np.add.reduceat(kwh, keep)
+            ts, avg = ts[keep], avg[keep]
+        return {
+            "resolution": level.name,
+            "load_history": to_pairs(ts, avg.round(3)),
+            "load_range": [[t, l, h] for t, l, h in zip(ts.tolist(), lo.round(3).tolist(), hi.round(3).tolist())],
+            "energy_kwh": to_pairs(ts, kwh.round(3)),
+        }
@@ -1,29 +1,99 @@
-from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.templating import Jinja2Templates
 import json
 import asyncio
-from app.simulation import storage # Sử dụng import tuyệt đối
+import time
+from app.runtime import storage
+from app.simulation import DASHBOARD_HISTORY_POINTS # Sử dụng import tuyệt đối
+from app.commands import command
+from app.timeseries import to_pairs
+from app.ws_protocol import DashboardStream
+from app.metrics import BROADCAST_DURATION, WEBSOCKET_DROPPED, WEBSOCKET_PAYLOAD_BYTES, WEBSOCKET_SEND_DURATION
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
+# --- Cấu hình phát dữ liệu WebSocket ---
+SEND_QUEUE_SIZE = 8
+SEND_TIMEOUT_SECONDS = 5.0
+
+# Đánh dấu trong hàng đợi: gửi snapshot mới nhất thay vì một thông điệp cụ thể.
+_SNAPSHOT = object()
+
+class ClientConnection:
+    """Một client WebSocket với hàng đợi gửi riêng và task gửi riêng."""
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.task: asyncio.Task | None = None
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+    """
+    Phát dữ liệu tới các client mà không để client chậm ảnh hưởng tới client khác.
+    Payload chỉ serialize một lần mỗi tick rồi đưa vào hàng đợi có giới hạn của
+    từng client; khi hàng đợi đầy, các delta cũ bị bỏ và thay bằng một snapshot.
+    Client không gửi được trong SEND_TIMEOUT_SECONDS sẽ bị ngắt kết nối.
+    """
+    def __init__(self, snapshot_factory):
+        self.snapshot_factory = snapshot_factory
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket)
+        self.active_connections[websocket] = client
+        client.task = asyncio.create_task(self._sender(client))
+        self.send_snapshot(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client is not None and client.task is not None:
+            client.task.cancel()
+
+    def send_snapshot(self, websocket: WebSocket):
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            self._enqueue(client, _SNAPSHOT)
 
     async def broadcast_data(self, data: dict):
         message = json.dumps(data)
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        WEBSOCKET_PAYLOAD_BYTES.labels(type=data.get("type", "message")).observe(len(message))
+        for client in list(self.active_connections.values()):
+            self._enqueue(client, message)
+
+    def _enqueue(self, client: ClientConnection, message):
+        try:
+            client.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Client không theo kịp: gộp mọi thứ đang chờ thành một snapshot duy nhất.
+            WEBSOCKET_DROPPED.inc()
+            while not client.queue.empty():
+                client.queue.get_nowait()
+            client.queue.put_nowait(_SNAPSHOT)
+
+    async def _sender(self, client: ClientConnection):
+        websocket = client.websocket
+        try:
+            while True:
+                message = await client.queue.get()
+                if message is _SNAPSHOT:
+                    message = self.snapshot_factory()
+                    WEBSOCKET_PAYLOAD_BYTES.labels(type="snapshot").observe(len(message))
+                started = time.perf_counter()
+                await asyncio.wait_for(websocket.send_text(message), SEND_TIMEOUT_SECONDS)
+                WEBSOCKET_SEND_DURATION.observe(time.perf_counter() - started)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ngắt kết nối WebSocket không phản hồi: {e!r}")
+            self.active_connections.pop(websocket, None)
+            try:
+                await websocket.close()
+            except Exception:
+                pass
 
-manager = ConnectionManager()
+stream = DashboardStream(storage)
+manager = ConnectionManager(stream.snapshot_message)
 
 @router.get("/", tags=["Pages"])
 async def get_dashboard(request: Request):
@@ -34,23 +104,53 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            await websocket.receive_text()
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            # Client phát hiện mất delta (seq nhảy cóc) sẽ yêu cầu gửi lại snapshot.
+            if isinstance(message, dict) and message.get("type") == "resync":
+                manager.send_snapshot(websocket)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 async def broadcast_dashboard_data():
     while True:
-        # Sửa tên hàm ở đây để khớp với file simulation.py mới
-        await manager.broadcast_data(storage.to_dict_for_websocket())
+        try:
+            started = time.perf_counter()
+            await manager.broadcast_data(stream.next_delta())
+            BROADCAST_DURATION.observe(time.perf_counter() - started)
+        except Exception as e:
+            # Không để một lỗi bất ngờ làm dừng hẳn luồng phát dữ liệu.
+            print(f"Lỗi khi phát dữ liệu dashboard: {e!r}")
         await asyncio.sleep(2)
 
 @router.get("/api/heat-load-chart", tags=["Charts"])
-async def get_heat_load_data():
+async def get_heat_load_data(
+    site_id: str | None = None,
+    from_ms: int | None = Query(None, alias="from", description="Timestamp bắt đầu (ms)"),
+    to_ms: int | None = Query(None, alias="to", description="Timestamp kết thúc (ms)"),
+    max_points: int | None = Query(None, ge=3, le=10000),
+):
     """
     Endpoint này chỉ cung cấp dữ liệu lịch sử và dự báo tải nhiệt
     để phục vụ riêng cho biểu đồ Heat Load Prediction.
+    Khi có `from`/`to`/`max_points`, dữ liệu được lấy từ các mức tổng hợp
+    hoặc giảm mẫu LTTB, số điểm trả về không vượt quá `max_points`.
     """
+    if site_id is not None:
+        load_history = await command("site_load_history", site_id, from_ms, to_ms, max_points)
+        if load_history is None:
+            raise HTTPException(status_code=404, detail="Site not found")
+        return {"load_history": load_history, "load_forecast": []}
+    if from_ms is None and to_ms is None and max_points is None:
+        return {
+            "load_history": to_pairs(*storage.load_history.last(DASHBOARD_HISTORY_POINTS)),
+            "load_forecast": storage.load_forecast # Đường dự báo đã cache mỗi tick
+        }
     return {
-        "load_history": storage.load_history,
-        "load_forecast": storage._get_simple_forecast() # Gọi hàm nội bộ để lấy dự báo
+        **await command("load_history", from_ms, to_ms, max_points or DASHBOARD_HISTORY_POINTS),
+        "load_forecast": storage.load_forecast
     }
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.templating import Jinja2Templates
-from app.simulation import storage # Sử dụng import tuyệt đối
+from app.commands import command
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -10,9 +10,15 @@ async def get_energy_analysis(request: Request):
     return templates.TemplateResponse("energy.html", {"request": request, "active_page": "energy"})
 
 @router.get("/api/energy-history", tags=["API"])
-async def get_energy_history_data():
-    return {
-        "energy_daily_history": storage.energy_daily_history,
-        "energy_baseline_range": storage.energy_baseline_range,
-        "anomalies": storage.anomalies,
-    }
\ No newline at end of file
+async def get_energy_history_data(
+    site_id: str | None = None,
+    from_ms: int | None = Query(None, alias="from", description="Timestamp bắt đầu (ms)"),
+    to_ms: int | None = Query(None, alias="to", description="Timestamp kết thúc (ms)"),
+    max_points: int | None = Query(None, ge=3, le=10000),
+):
+    if site_id is not None:
+        history = await command("site_energy_history", site_id)
+        if history is None:
+            raise HTTPException(status_code=404, detail="Site not found")
+        return history
+    return await command("energy_history", from_ms, to_ms, max_points)
\ No newline at end of file
@@ -0,0 +1,49 @@
+import re
+from urllib.parse import quote
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.export import DATASETS, FORMATS, ExportUnavailableError, open_source, parquet_available, stream_export
+from app.runtime import storage
+from app.simulation import DATA_DIR
+
+router = APIRouter(tags=["Export"])
+
+
+@router.get("/api/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    from_ms: int | None = Query(None, alias="from", description="Timestamp bắt đầu (ms)"),
+    to_ms: int | None = Query(None, alias="to", description="Timestamp kết thúc (ms)"),
+    device_id: str | None = Query(None, description="Chỉ xuất chuỗi của một thiết bị (bộ dữ liệu equipment)"),
+):
+    """
+    Xuất `energy`, `load`, `equipment` hoặc `events` trong khoảng thời gian dạng CSV hoặc Parquet.
+    File được gửi theo từng khối trong khi đọc kho lưu trữ, không dựng toàn bộ trong bộ nhớ.
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Không có bộ dữ liệu '{dataset}'. Hỗ trợ: {', '.join(DATASETS)}.")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Xuất Parquet cần cài đặt pyarrow.")
+    try:
+        source = open_source(storage, DATA_DIR)
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if device_id is not None and not source.has_device(device_id):
+        source.close()
+        raise HTTPException(status_code=404, detail=f"Không có thiết bị '{device_id}'.")
+    span = f"_{from_ms or 'start'}-{to_ms or 'now'}" if from_ms or to_ms else ""
+    filename = f"{dataset}{f'_{device_id}' if device_id else ''}{span}.{format}"
+    return StreamingResponse(
+        stream_export(source, dataset, format, from_ms, to_ms, device_id),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": _content_disposition(filename)},
+    )
+
+
+def _content_disposition(filename):
+    """Tên file ASCII an toàn cho `filename`, tên gốc (UTF-8) theo RFC 5987 cho `filename*`."""
+    fallback = re.sub(r"[^A-Za-z0-9._-]", "_", filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
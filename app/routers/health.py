@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Request
 from fastapi.templating import Jinja2Templates
-from app.simulation import storage 
+from app.snapshots import snapshot_response
+from app.commands import snapshot
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -11,15 +12,6 @@ async def get_health_page(request: Request):
     return templates.TemplateResponse("health.html", {"request": request, "active_page": "health"})
 
 @router.get("/api/equipment-health", tags=["API"])
-async def get_equipment_health_data():
-    """Cung cấp dữ liệu sức khỏe của tất cả thiết bị."""
-    # Kết hợp dữ liệu chi tiết vào danh sách thiết bị chính
-    detailed_equipment = []
-    for device in storage.equipment:
-        device_id = device.get("id")
-        if device_id in storage.equipment_details:
-            device_with_details = device.copy()
-            device_with_details.update(storage.equipment_details[device_id])
-            detailed_equipment.append(device_with_details)
-    
-    return detailed_equipment
\ No newline at end of file
+async def get_equipment_health_data(request: Request):
+    """Cung cấp dữ liệu sức khỏe của tất cả thiết bị (snapshot theo tick, hỗ trợ ETag)."""
+    return snapshot_response(request, await snapshot("equipment_health"))
\ No newline at end of file
@@ -0,0 +1,59 @@
+import json
+import time
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+
+from app.ingest import MAX_BATCH_READINGS, parse_payload
+from app.commands import command
+
+router = APIRouter(tags=["Ingest"])
+
+
+def _parse(body, content_type):
+    """Phân tích và kiểm tra một lô; lỗi dữ liệu được báo bằng ValueError."""
+    try:
+        batch = parse_payload(body, content_type, int(time.time() * 1000))
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Dữ liệu không hợp lệ: {e}") from e
+    if len(batch) > MAX_BATCH_READINGS:
+        raise ValueError(f"Mỗi lô tối đa {MAX_BATCH_READINGS} giá trị.")
+    return batch
+
+
+@router.post("/api/ingest", status_code=202)
+async def ingest_readings(request: Request):
+    """
+    Nhận một lô giá trị cảm biến: NDJSON (`application/x-ndjson`), mảng bản ghi JSON,
+    hoặc object dạng cột {"timestamps": [...], "<chỉ số>": [...]}. Lô được đưa vào hàng đợi
+    và áp dụng ở tick kế tiếp; trả 503 khi hàng đợi đầy để bên gửi thử lại sau.
+    """
+    try:
+        batch = _parse(await request.body(), request.headers.get("content-type", ""))
+        result = await command("ingest", batch, "http")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result["queued"]:
+        raise HTTPException(status_code=503, detail="Hàng đợi dữ liệu đang đầy.", headers={"Retry-After": "2"})
+    return {"accepted": len(batch), "queued_batches": result["queued_batches"]}
+
+
+@router.websocket("/ws/ingest")
+async def ingest_stream(websocket: WebSocket):
+    """
+    Luồng nhận dữ liệu liên tục: mỗi thông điệp là một lô (NDJSON hoặc JSON như POST).
+    Khi hàng đợi đầy, server ngừng đọc thông điệp tiếp theo cho tới khi có chỗ.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                batch = _parse(message.encode(), "")
+                # Chờ tới khi hàng đợi có chỗ (backpressure), không giới hạn thời gian.
+                await command("ingest", batch, "websocket", timeout=None)
+            except ValueError as e:
+                await websocket.send_text(json.dumps({"error": str(e)}, ensure_ascii=False))
+                continue
+            await websocket.send_text(json.dumps({"accepted": len(batch)}))
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import REGISTRY, register_gauge
+from app.commands import state_stats
+from app.routers.dashboard import manager
+
+router = APIRouter(tags=["Metrics"])
+
+# Các gauge này chỉ được tính khi Prometheus scrape, không tốn gì trên đường nóng.
+register_gauge("cold_storage_websocket_connections", "Số client WebSocket dashboard đang kết nối.",
+               lambda: len(manager.active_connections))
+register_gauge("cold_storage_load_history_points", "Số điểm tải trong bộ đệm vòng.", lambda: state_stats()["load_history_points"])
+register_gauge("cold_storage_system_events", "Số sự kiện hệ thống trong bộ nhớ.", lambda: state_stats()["system_events"])
+register_gauge("cold_storage_anomalies", "Số bất thường trong bộ nhớ.", lambda: state_stats()["anomalies"])
+register_gauge("cold_storage_fleet_history_points", "Số tick trong bộ đệm lịch sử của đội kho.", lambda: state_stats()["fleet_history_points"])
+register_gauge("cold_storage_snapshot_version", "Phiên bản snapshot hiện tại của các API đọc.", lambda: state_stats()["snapshot_version"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Chỉ số vận hành ở định dạng văn bản Prometheus."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
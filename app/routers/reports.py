@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
 from fastapi.templating import Jinja2Templates
-from app.simulation import storage
+from app.eventlog import DEFAULT_PAGE_SIZE
+from app.snapshots import snapshot_response
+from app.commands import command, snapshot
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -11,11 +13,18 @@ async def get_reports_page(request: Request):
     return templates.TemplateResponse("reports.html", {"request": request, "active_page": "reports"})
 
 @router.get("/api/historical-data", tags=["API"])
-async def get_historical_data():
-    """Cung cấp toàn bộ dữ liệu lịch sử cho trang báo cáo."""
-    return {
-        "energy_history": storage.energy_daily_history,
-        "equipment_list": storage.equipment,
-        "equipment_details": storage.equipment_details,
-        "system_events": sorted(storage.system_events, key=lambda x: x['timestamp'], reverse=True) # Sắp xếp mới nhất lên đầu
-    }
\ No newline at end of file
+async def get_historical_data(request: Request):
+    """Cung cấp dữ liệu lịch sử cho trang báo cáo (snapshot theo tick, hỗ trợ ETag)."""
+    return snapshot_response(request, await snapshot("historical_data"))
+
+@router.get("/api/events", tags=["API"])
+async def get_system_events(
+    type: str | None = None,
+    severity: str | None = None,
+    from_ms: int | None = Query(None, alias="from", description="Timestamp bắt đầu (ms)"),
+    to_ms: int | None = Query(None, alias="to", description="Timestamp kết thúc (ms)"),
+    cursor: int | None = Query(None, description="`next_cursor` của trang trước"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=1000),
+):
+    """Nhật ký sự kiện hệ thống có lọc và phân trang, mới nhất lên đầu."""
+    return await command("events", type, severity, from_ms, to_ms, cursor, limit)
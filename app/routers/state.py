@@ -1,7 +1,8 @@
 # app/routers/state.py (Tạo file mới)
 
-from fastapi import APIRouter
-from app.simulation import storage
+from fastapi import APIRouter, HTTPException, Request
+from app.snapshots import snapshot_response
+from app.commands import command, snapshot
 
 router = APIRouter(
     prefix="/api",
@@ -9,9 +10,21 @@ router = APIRouter(
 )
 
 @router.get("/state")
-async def get_current_state():
+async def get_current_state(request: Request, site_id: str | None = None):
     """
     Đây là endpoint chính, cung cấp một snapshot chứa toàn bộ trạng thái
     hiện tại của kho lạnh. UI trên coreIoT sẽ gọi endpoint này đầu tiên.
+    Truyền `site_id` để lấy trạng thái một kho trong đội kho mô phỏng.
+    Kho chính được phục vụ từ snapshot đã serialize sẵn mỗi tick, hỗ trợ ETag/304.
     """
-    return storage.get_full_state()
\ No newline at end of file
+    if site_id is None:
+        return snapshot_response(request, await snapshot("state"))
+    site_state = await command("site_state", site_id)
+    if site_state is None:
+        raise HTTPException(status_code=404, detail="Site not found")
+    return site_state
+
+@router.get("/sites")
+async def get_sites():
+    """Danh sách các kho trong đội kho cùng vài chỉ số tóm tắt."""
+    return await command("sites")
@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+from .fleet import FleetSimulation
+from .ingest import ingest_queue
+from .metrics import TICK_DURATION
+from .sharedstate import ROLE, SharedStorageView
+from .simulation import ColdStorage, DASHBOARD_HISTORY_POINTS, TICK_SECONDS
+
+# Kho lạnh dùng chung của server và tiến trình ghi. Nằm riêng khỏi `simulation` để chạy lô,
+# sinh snapshot và benchmark import `ColdStorage` mà không tạo thêm một kho (và không mở
+# COLD_STORAGE_DATA_DIR) chỉ vì import module.
+# Worker chỉ đọc (COLD_STORAGE_ROLE=reader) không chạy mô phỏng mà đọc trạng thái từ tiến trình ghi.
+storage = SharedStorageView(DASHBOARD_HISTORY_POINTS) if ROLE == "reader" else ColdStorage()
+_fleet = None
+
+
+def get_fleet():
+    """Đội kho mô phỏng (kèm kho chính), tạo ở lần dùng đầu tiên và chỉ trong tiến trình sở hữu trạng thái."""
+    global _fleet
+    if ROLE == "reader":
+        raise RuntimeError("Đội kho chỉ chạy trong tiến trình ghi.")
+    if _fleet is None:
+        _fleet = FleetSimulation(primary=storage)
+    return _fleet
+
+
+async def run_simulation():
+    """Chạy vòng lặp vô tận để cập nhật trạng thái kho."""
+    while True:
+        started = time.perf_counter()
+        batch = ingest_queue.drain()
+        if batch is not None:
+            storage.apply_readings(batch)
+        storage.update()
+        TICK_DURATION.observe(time.perf_counter() - started)
+        await asyncio.sleep(TICK_SECONDS)
+
+
+async def run_fleet_simulation():
+    """Vòng lặp cập nhật đội kho, cùng chu kỳ với kho chính."""
+    fleet = get_fleet()
+    while True:
+        fleet.update()
+        await asyncio.sleep(TICK_SECONDS)
@@ -0,0 +1,17 @@
+import sys
+import time
+
+from .simulation import ColdStorage
+
+# Tạo snapshot dữ liệu lịch sử khởi tạo:
+#   python -m app.seed seed.json
+# rồi đặt COLD_STORAGE_SEED_SNAPSHOT=seed.json để các worker nạp lại thay vì sinh mới.
+
+def main(path):
+    ColdStorage(seed_snapshot=None).save_seed_snapshot(path)
+    started = time.perf_counter()
+    ColdStorage(seed_snapshot=path)
+    print(f"Đã ghi snapshot vào {path} (nạp lại mất {(time.perf_counter() - started) * 1000:.1f} ms).")
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "seed_snapshot.json")
@@ -0,0 +1,313 @@
+import json
+import os
+import secrets
+import struct
+import tempfile
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .timeseries import to_pairs
+
+# --- Triển khai nhiều worker ---
+# Một tiến trình ghi (`python -m app.writer`) sở hữu mô phỏng, nhận dữ liệu cảm biến và
+# publish trạng thái vào bộ nhớ chia sẻ mỗi tick. Các worker HTTP/WebSocket chạy với
+# COLD_STORAGE_ROLE=reader chỉ đọc từ đó và gửi thao tác ghi/truy vấn qua unix socket:
+#   python -m app.writer &
+#   COLD_STORAGE_ROLE=reader uvicorn app.main:app --workers 8
+# Mặc định (standalone) mỗi tiến trình tự chạy mô phỏng như trước.
+ROLE = os.environ.get("COLD_STORAGE_ROLE", "standalone")
+SHM_NAME = os.environ.get("COLD_STORAGE_SHM_NAME", "cold_storage_state")
+SHM_BYTES = int(os.environ.get("COLD_STORAGE_SHM_BYTES", 64 * 1024 * 1024))
+SOCKET_PATH = os.environ.get("COLD_STORAGE_SOCKET", os.path.join(tempfile.gettempdir(), "cold_storage.sock"))
+STALE_SECONDS = 10          # Không có frame mới lâu hơn mức này thì thử gắn lại (tiến trình ghi đã khởi động lại?)
+READ_RETRIES = 5
+
+# Bố cục vùng nhớ: header 64 byte rồi hai slot bằng nhau. Tiến trình ghi luôn ghi vào slot
+# không hoạt động rồi mới đổi `active`, nên người đọc gần như không bao giờ phải đọc lại.
+# Mỗi slot: seq (lẻ = đang ghi) | độ dài meta | meta JSON | dữ liệu (blob và mảng, căn 8 byte).
+_MAGIC = b"CSSHM001"
+_HEADER = struct.Struct("<8s8sQQQQ")    # magic, boot id, kích thước slot, active, generation, closed
+_HEADER_BYTES = 64
+_SLOT_HEADER = struct.Struct("<QQ")     # seq, meta_len
+
+
+class WriterUnavailableError(RuntimeError):
+    """Không kết nối được tới tiến trình ghi (chưa chạy hoặc đã dừng)."""
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+class SharedStateWriter:
+    """Phía tiến trình ghi: tạo vùng nhớ chia sẻ và publish từng frame (blob bytes, mảng NumPy, meta)."""
+    def __init__(self, name=SHM_NAME, size=SHM_BYTES):
+        try:
+            # Vùng nhớ còn sót lại từ lần chạy trước bị dừng đột ngột.
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.slot_bytes = (size - _HEADER_BYTES) // 2
+        self.generation = 0
+        self._active = 0
+        self._boot_id = secrets.token_bytes(8)
+        _HEADER.pack_into(self.shm.buf, 0, _MAGIC, self._boot_id, self.slot_bytes, 0, 0, 0)
+
+    def publish(self, blobs, arrays, meta):
+        layout, offset = {"blobs": {}, "arrays": {}}, 0
+        for name, blob in blobs.items():
+            layout["blobs"][name] = (offset, len(blob))
+            offset = _align(offset + len(blob))
+        arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+        for name, array in arrays.items():
+            layout["arrays"][name] = (offset, array.dtype.str, array.shape)
+            offset = _align(offset + array.nbytes)
+        meta_bytes = json.dumps({**layout, "payload_bytes": offset, "meta": meta}, ensure_ascii=False).encode("utf-8")
+        meta_end = _align(_SLOT_HEADER.size + len(meta_bytes))
+        if meta_end + offset > self.slot_bytes:
+            raise ValueError(f"Frame {meta_end + offset} byte vượt quá slot {self.slot_bytes} byte (tăng COLD_STORAGE_SHM_BYTES).")
+
+        slot = 1 - self._active
+        base = _HEADER_BYTES + slot * self.slot_bytes
+        buf = self.shm.buf
+        seq = _SLOT_HEADER.unpack_from(buf, base)[0]
+        struct.pack_into("<Q", buf, base, seq + 1)
+        buf[base + _SLOT_HEADER.size:base + _SLOT_HEADER.size + len(meta_bytes)] = meta_bytes
+        payload = base + meta_end
+        for name, blob in blobs.items():
+            start, length = layout["blobs"][name]
+            buf[payload + start:payload + start + length] = blob
+        for name, array in arrays.items():
+            start = layout["arrays"][name][0]
+            np.frombuffer(buf, dtype=array.dtype, count=array.size, offset=payload + start).reshape(array.shape)[...] = array
+        _SLOT_HEADER.pack_into(buf, base, seq + 2, len(meta_bytes))
+
+        self._active = slot
+        self.generation += 1
+        _HEADER.pack_into(buf, 0, _MAGIC, self._boot_id, self.slot_bytes, slot, self.generation, 0)
+
+    def close(self):
+        _HEADER.pack_into(self.shm.buf, 0, _MAGIC, self._boot_id, self.slot_bytes, self._active, self.generation, 1)
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedFrame:
+    """
+    Một frame đã sao chép ra bộ nhớ của tiến trình đọc (một lần cho mỗi frame mới).
+    Mọi request trong cùng tick dùng chung các lát bytes và view NumPy của frame này.
+    """
+    def __init__(self, generation, layout, data):
+        self.generation = generation
+        self.meta = layout["meta"]
+        self._layout = layout
+        self._data = data
+        self._cache = {}
+
+    def blob(self, name):
+        if name not in self._cache:
+            start, length = self._layout["blobs"][name]
+            self._cache[name] = self._data[start:start + length]
+        return self._cache[name]
+
+    def json(self, name):
+        key = ("json", name)
+        if key not in self._cache:
+            self._cache[key] = json.loads(self.blob(name))
+        return self._cache[key]
+
+    def array(self, name):
+        start, dtype, shape = self._layout["arrays"][name]
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        return np.frombuffer(self._data, dtype=dtype, count=count, offset=start).reshape(shape)
+
+
+class SharedStateReader:
+    """Phía worker: gắn vào vùng nhớ chia sẻ và đọc frame mới nhất theo giao thức seqlock."""
+    def __init__(self, name=SHM_NAME):
+        self.name = name
+        self.shm = None
+        self._boot_id = None
+        self._frame = None
+        self._seen_at = 0.0
+
+    def read(self):
+        if self.shm is None:
+            self._attach()
+        _, _, _, active, generation, closed = _HEADER.unpack_from(self.shm.buf, 0)
+        now = time.monotonic()
+        if closed or (self._frame is not None and generation == self._frame.generation and now - self._seen_at > STALE_SECONDS):
+            self._reattach(required=bool(closed))
+            _, _, _, active, generation, closed = _HEADER.unpack_from(self.shm.buf, 0)
+        if self._frame is not None and generation == self._frame.generation:
+            return self._frame
+        self._seen_at = now
+        frame = self._read_slot(active, generation)
+        if frame is not None:
+            self._frame = frame
+        if self._frame is None:
+            raise WriterUnavailableError("Tiến trình ghi chưa publish trạng thái.")
+        return self._frame
+
+    def _read_slot(self, active, generation):
+        buf = self.shm.buf
+        slot_bytes = _HEADER.unpack_from(buf, 0)[2]
+        for _ in range(READ_RETRIES):
+            base = _HEADER_BYTES + active * slot_bytes
+            seq, meta_len = _SLOT_HEADER.unpack_from(buf, base)
+            if seq % 2 == 0 and seq > 0:
+                meta_start = base + _SLOT_HEADER.size
+                try:
+                    layout = json.loads(bytes(buf[meta_start:meta_start + meta_len]))
+                    payload = base + _align(_SLOT_HEADER.size + meta_len)
+                    data = bytes(buf[payload:payload + layout["payload_bytes"]])
+                except (ValueError, KeyError):
+                    layout = None  # Slot bị ghi đè giữa chừng; seq bên dưới sẽ khác.
+                if _SLOT_HEADER.unpack_from(buf, base)[0] == seq and layout is not None:
+                    return SharedFrame(generation, layout, data)
+            # Tiến trình ghi vừa quay vòng sang đúng slot này: đọc lại header.
+            time.sleep(0)
+            _, _, _, active, generation, _ = _HEADER.unpack_from(buf, 0)
+        return None
+
+    def _attach(self):
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            raise WriterUnavailableError(f"Chưa có vùng nhớ chia sẻ '{self.name}' (tiến trình ghi chưa chạy?).") from None
+        # Python < 3.13 đăng ký cả vùng nhớ chỉ gắn vào với resource tracker, vốn sẽ xóa nó khi worker thoát.
+        resource_tracker.unregister(shm._name, "shared_memory")
+        magic, boot_id, *_ = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _MAGIC:
+            shm.close()
+            raise WriterUnavailableError(f"Vùng nhớ '{self.name}' không đúng định dạng.")
+        if self.shm is not None:
+            self.shm.close()
+        self.shm, self._boot_id = shm, boot_id
+        self._seen_at = time.monotonic()
+
+    def _reattach(self, required):
+        """Gắn lại khi tiến trình ghi đã khởi động lại; nếu không có vùng nhớ mới thì tiếp tục dùng frame cũ."""
+        self._seen_at = time.monotonic()
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            if required:
+                raise WriterUnavailableError("Tiến trình ghi đã dừng.") from None
+            return
+        resource_tracker.unregister(shm._name, "shared_memory")
+        boot_id = _HEADER.unpack_from(shm.buf, 0)[1]
+        shm.close()
+        if boot_id != self._boot_id:
+            self._frame = None
+            self._attach()
+
+    def close(self):
+        if self.shm is not None:
+            self._frame = None
+            self.shm.close()
+            self.shm = None
+
+
+# --- Trạng thái ColdStorage trong bộ nhớ chia sẻ ---
+def publish_storage(writer, storage, stats):
+    """
+    Đẩy snapshot dựng sẵn (`eager`) của các API đọc, trường dashboard và bộ đệm lịch sử tải
+    của `storage` sang `writer`. Snapshot còn lại vẫn chỉ được dựng khi có request, worker
+    lấy qua lệnh `snapshot` (xem `app.commands.snapshot`).
+    """
+    blobs, etags = {}, {}
+    for name in storage.snapshots.eager:
+        blobs[f"snapshot:{name}"], etags[name] = storage.snapshots.get(name)
+    blobs["dashboard_fields"] = json.dumps(storage.dashboard_fields()).encode("utf-8")
+    arrays = {"load_ts": storage.load_history.timestamps, "load_values": storage.load_history.values}
+    meta = {"version": storage.snapshots.version, "etags": etags, "load_total": storage.load_history.total, "stats": stats}
+    writer.publish(blobs, arrays, meta)
+
+
+class SeriesView:
+    """Giao diện đọc của `RingBuffer` trên các mảng cố định của một frame."""
+    def __init__(self, timestamps, values, total):
+        self.timestamps = timestamps
+        self.values = values
+        self.total = total
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def latest(self):
+        if not len(self.timestamps):
+            return None
+        return int(self.timestamps[-1]), float(self.values[-1])
+
+    def last(self, n):
+        n = min(n, len(self.timestamps))
+        return self.timestamps[len(self.timestamps) - n:], self.values[len(self.values) - n:]
+
+    def range(self, start_ms=None, end_ms=None):
+        ts = self.timestamps
+        lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+        return ts[lo:hi], self.values[lo:hi]
+
+
+class _SharedSnapshots:
+    """Thay cho `SnapshotPublisher` ở worker: bytes và ETag do tiến trình ghi dựng sẵn."""
+    def __init__(self, reader):
+        self._reader = reader
+
+    @property
+    def version(self):
+        return self._reader.read().meta["version"]
+
+    def published(self, name):
+        return name in self._reader.read().meta["etags"]
+
+    def get(self, name):
+        frame = self._reader.read()
+        return frame.blob(f"snapshot:{name}"), frame.meta["etags"][name]
+
+
+class SharedStorageView:
+    """
+    Phần chỉ đọc của `ColdStorage` mà các router và `DashboardStream` dùng, lấy từ frame
+    mới nhất trong bộ nhớ chia sẻ. Thao tác ghi và truy vấn khác đi qua `app.commands`.
+    """
+    def __init__(self, dashboard_points, reader=None):
+        self.dashboard_points = dashboard_points
+        self.reader = reader or SharedStateReader()
+        self.snapshots = _SharedSnapshots(self.reader)
+        self._series = (None, None)
+
+    @property
+    def load_history(self):
+        frame = self.reader.read()
+        generation, series = self._series
+        if generation != frame.generation:
+            series = SeriesView(frame.array("load_ts"), frame.array("load_values"), frame.meta["load_total"])
+            self._series = (frame.generation, series)
+        return series
+
+    @property
+    def load_forecast(self):
+        return self.dashboard_fields()["load_forecast"]
+
+    def dashboard_fields(self):
+        return dict(self.reader.read().json("dashboard_fields"))
+
+    def to_dict_for_websocket(self):
+        data = self.dashboard_fields()
+        data["load_history"] = to_pairs(*self.load_history.last(self.dashboard_points))
+        return data
+
+    def stats(self):
+        return self.reader.read().meta["stats"]
+
+    def close(self):
+        self.reader.close()
@@ -1,19 +1,63 @@
+import os
+import json
 import random
-import asyncio
-import time
 from datetime import datetime, timedelta
 import uuid
-import pandas as pd
-from prophet import Prophet
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .forecasting import HoltWintersForecaster, ProphetForecaster
+from .clock import SystemClock
+from .timeseries import RingBuffer, to_pairs
+from .rollups import Rollups, lttb_indices
+from .equipment import EquipmentRegistry
+from .energy import HOURLY_HISTORY_HOURS, EnergyAccountant
+from .maintenance import MaintenanceEngine
+from .eventlog import EventLog
+from .anomaly import StreamingAnomalyDetector
+from .snapshots import SnapshotPublisher
+from .ingest import DEVICE_METRICS, INGEST_REJECTED
+from .thermal import ThermalField
+from .tsstore import SegmentStore
 
 # --- Hằng số Cấu hình ---
 PREDICTION_PERIOD_MINUTES = 240
 CONTEXT_HOURS = 24
 SPIKE_THRESHOLD = 1.25
 DOOR_OPEN_ANOMALY_SECONDS = 300 # 5 phút
+LOAD_HISTORY_CAPACITY = int(os.environ.get("COLD_STORAGE_LOAD_HISTORY_CAPACITY", 43200)) # 1 ngày với chu kỳ 2 giây
+DASHBOARD_HISTORY_POINTS = 1500
+SEED_LOAD_POINTS = 1500
+SEED_ENERGY_DAYS = 90
+# Snapshot dữ liệu lịch sử khởi tạo (tạo bằng `python -m app.seed`); không có thì sinh ngẫu nhiên.
+SEED_SNAPSHOT_PATH = os.environ.get("COLD_STORAGE_SEED_SNAPSHOT")
+# Thư mục lưu lịch sử bền vững; không đặt thì mọi lịch sử chỉ nằm trong bộ nhớ.
+DATA_DIR = os.environ.get("COLD_STORAGE_DATA_DIR")
+RETENTION_DAYS = int(os.environ.get("COLD_STORAGE_RETENTION_DAYS", 365))
+COMPACTION_INTERVAL_SECONDS = 3600
+TICK_SECONDS = 2
+# Chỉ số nhận từ cảm biến thật trong khoảng này thì không được mô phỏng ngẫu nhiên nữa.
+LIVE_SOURCE_TIMEOUT_SECONDS = 30
+# Lịch sử chi tiết thiết bị từ cảm biến được gộp tối đa một điểm mỗi khoảng này.
+DEVICE_HISTORY_INTERVAL_MS = 60_000
+DEVICE_HISTORY_MAX_POINTS = 5000
+# Độ ẩm tiến dần về mức cân bằng: cửa mở kéo lên, máy nén chạy làm khô đi.
+HUMIDITY_BASE = 88.0
+HUMIDITY_DOOR_OPEN = 94.0
+HUMIDITY_DRYING = 1.5
+HUMIDITY_RATE = 0.05
+HUMIDITY_NOISE = 0.2
+# Prophet chỉ là backend định kỳ tùy chọn; Holt-Winters trực tuyến luôn chạy mỗi tick.
+PROPHET_ENABLED = os.environ.get("COLD_STORAGE_PROPHET", "1") != "0"
 
 class ColdStorage:
-    def __init__(self):
+    def __init__(self, seed_snapshot=SEED_SNAPSHOT_PATH, data_dir=DATA_DIR, clock=None, seed=None, prophet=PROPHET_ENABLED):
+        # --- Đồng hồ & nguồn ngẫu nhiên (có thể thay bằng đồng hồ ảo và seed cố định) ---
+        self.clock = clock or SystemClock()
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+
         # --- Trạng thái Môi trường & Hoạt động ---
         self.zone_A_temp = -20.0
         self.zone_B_temp = -20.2
@@ -23,29 +67,31 @@ class ColdStorage:
         self.defrost_status = "OFF"
         self.door_status = "CLOSED"
         self.door_open_duration_s = 0
+        self.live_sources = {} # chỉ số -> thời điểm nhận giá trị cảm biến gần nhất
+        self.thermal_field = ThermalField(initial_temps=(self.zone_A_temp, self.zone_B_temp))
 
         # --- Dữ liệu Lịch sử & Phân tích ---
-        self.load_history = []
+        self.load_history = RingBuffer(LOAD_HISTORY_CAPACITY)
+        self.load_rollups = Rollups(self.load_history, TICK_SECONDS * 1000)
         self.energy_daily_history = []
         self.energy_baseline_range = []
+        self.energy = EnergyAccountant()
         self.anomalies = []
-        self.system_events = []
+        self.system_events = EventLog()
+        self.anomaly_detector = StreamingAnomalyDetector(ANOMALY_SIGNALS)
 
         # --- Trạng thái Thiết bị ---
-        self.equipment = [
+        self.equipment = EquipmentRegistry([
             {"id": "comp-01", "name": "Máy nén #1 (Hitachi)", "type": "Máy nén", "status": "Hoạt động", "health_score": 95.0},
             {"id": "comp-02", "name": "Máy nén #2 (Bitzer)", "type": "Máy nén", "status": "Hoạt động", "health_score": 78.0},
             {"id": "fan-01", "name": "Quạt dàn lạnh A1", "type": "Quạt", "status": "Hoạt động", "health_score": 62.0},
             {"id": "fan-02", "name": "Quạt dàn lạnh B1", "type": "Quạt", "status": "Tạm dừng", "health_score": 98.0}
-        ]
+        ])
 
         self.equipment_details = {
             "comp-01": {
                 "ai_analysis": "Dòng điện và áp suất ổn định. Không phát hiện dấu hiệu bất thường.",
-                "history": {
-                    "Dòng điện (A)": self._generate_detail_history(8, 9),
-                    "Áp suất (PSI)": self._generate_detail_history(150, 155)
-                },
+                "history": {},
                 "maintenance_log": [
                     "15/07/2025: Kỹ sư A - Kiểm tra định kỳ, mọi thứ ổn.",
                     "02/06/2025: Kỹ sư B - Thay dầu máy nén."
@@ -53,49 +99,223 @@ class ColdStorage:
             },
             "comp-02": {
                 "ai_analysis": "Hiệu suất giảm nhẹ 5% trong 2 tuần qua. Dòng khởi động có xu hướng tăng.",
-                "history": {
-                    "Dòng điện (A)": self._generate_detail_history(9, 11, True),
-                    "Áp suất (PSI)": self._generate_detail_history(145, 140)
-                },
+                "history": {},
                 "maintenance_log": ["18/07/2025: Kỹ sư B - Kiểm tra định kỳ."]
             },
             "fan-01": {
                 "ai_analysis": "AI phát hiện mẫu rung động bất thường ở tần số cao. Dự báo 85% khả năng vòng bi sẽ gặp sự cố trong 30 ngày tới. Khuyến nghị: Lên lịch kiểm tra trong tuần này.",
-                "history": {
-                    "Độ rung (mm/s)": self._generate_detail_history(0.2, 0.8, True),
-                    "Dòng điện (A)": self._generate_detail_history(1.5, 1.8, True)
-                },
+                "history": {},
                 "maintenance_log": ["01/08/2025: Kỹ sư A - Vệ sinh cánh quạt."]
             },
             "fan-02": {
                 "ai_analysis": "Thiết bị đang trong trạng thái dự phòng, các chỉ số đều trong ngưỡng an toàn.",
-                "history": {
-                    "Độ rung (mm/s)": self._generate_detail_history(0.1, 0.1),
-                    "Dòng điện (A)": self._generate_detail_history(1.2, 1.2)
-                },
+                "history": {},
                 "maintenance_log": ["Chưa có ghi nhận bảo trì."]
             }
         }
         
+        # Dự đoán bảo trì từ lịch sử chi tiết, chỉ khớp lại thiết bị có dữ liệu mới.
+        self.maintenance = MaintenanceEngine()
+
         # --- AI Agent & Dự báo ---
-        print("Khởi tạo AI Agent với mô hình Prophet...")
-        self.prophet_model = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=True)
+        # Holt-Winters học trực tuyến từng điểm tải và phục vụ đường dự báo mỗi tick.
+        # Prophet chỉ được import và khởi tạo trong tiến trình dự báo, ở lần dự báo đầu tiên.
         self.ai_recommendations = []
         self.last_prediction_time = 0
-        print("AI Agent đã sẵn sàng.")
-        
-        self._generate_fake_past_energy_data(days=90)
+        self.forecaster = HoltWintersForecaster()
+        self.prophet = ProphetForecaster(context_hours=CONTEXT_HOURS, periods_minutes=PREDICTION_PERIOD_MINUTES) if prophet else None
+        self.load_forecast = []
+
+        # --- Snapshot cho các API đọc ---
+        self._compressor_schedule = (None, None)
+        self.snapshots = SnapshotPublisher({
+            "state": self.get_full_state,
+            "equipment_health": self.get_equipment_health,
+            "historical_data": self.get_historical_data,
+        }, eager=("state",))
+
+        # --- Lưu trữ bền vững ---
+        self.store = SegmentStore(data_dir) if data_dir else None
+        self.last_compaction_time = self.clock.time()
+
+        replay = self.store is not None and not self.store.is_empty()
+        if replay:
+            self._replay_store()
+        elif seed_snapshot and os.path.exists(seed_snapshot):
+            self.load_seed_snapshot(seed_snapshot)
+        else:
+            self._generate_seed_history()
+        self._resume_energy()
+        self.maintenance.mark_all(self.equipment_details)
+        self.maintenance.refresh(self.equipment_details)
+        if self.store is not None and not replay:
+            self._persist_seed_history()
 
     def _generate_detail_history(self, base_val, trend_val, has_noise=False):
         """Hàm trợ giúp để tạo dữ liệu lịch sử đa chỉ số cho một thiết bị."""
-        now_ts = int(time.time() * 1000)
+        now_ts = int(self.clock.time() * 1000)
         noise_factor = 0.5 if has_noise else 0.1
-        return [[now_ts - (90-i)*24*60*60*1000, round(base_val + (i/90.0) * (trend_val - base_val) + random.uniform(-noise_factor, noise_factor), 2)] for i in range(90)]
+        return [[now_ts - (90-i)*24*60*60*1000, round(base_val + (i/90.0) * (trend_val - base_val) + self.rng.uniform(-noise_factor, noise_factor), 2)] for i in range(90)]
+
+    # --- DỮ LIỆU LỊCH SỬ KHỞI TẠO ---
+    def _generate_seed_history(self):
+        """Sinh ngẫu nhiên toàn bộ dữ liệu lịch sử ban đầu."""
+        for device_id, series in DETAIL_HISTORY_SPECS.items():
+            self.equipment_details[device_id]["history"] = {
+                name: self._generate_detail_history(*spec) for name, spec in series.items()
+            }
+        self._generate_fake_past_energy_data(days=SEED_ENERGY_DAYS)
+        self._generate_initial_load_history(SEED_LOAD_POINTS)
+
+    def _generate_initial_load_history(self, points):
+        """Tạo lịch sử tải mỗi 10 phút theo mẫu tải trong ngày để Prophet có thể học được."""
+        now_s = self.clock.time()
+        past_s = now_s - np.arange(points, 0, -1) * 600
+        utc_offset_s = datetime.fromtimestamp(now_s).astimezone().utcoffset().total_seconds()
+        hours = (past_s + utc_offset_s) // 3600 % 24
+        pattern = np.select([(hours >= 6) & (hours < 12), (hours >= 12) & (hours < 18), (hours >= 18) & (hours < 22)], [0.5, 1.5, 1.0], 0.2)
+        values = 40 + self.np_rng.uniform(-3, 3, points) + 5 * (1 + pattern)
+        self._extend_load_history((past_s * 1000).astype(np.int64), values)
+
+    def _extend_load_history(self, timestamps, values):
+        self.load_history.extend(timestamps, values)
+        self.load_rollups.add_many(timestamps, values)
+        self.forecaster.observe_many(timestamps, values)
+
+    def save_seed_snapshot(self, path):
+        """Ghi dữ liệu lịch sử hiện tại ra file để các lần khởi động sau nạp lại."""
+        snapshot = {
+            "created_at": int(self.clock.time() * 1000),
+            "load_history": to_pairs(self.load_history.timestamps, self.load_history.values),
+            "energy_daily_history": self.energy_daily_history,
+            "energy_baseline_range": self.energy_baseline_range,
+            "anomalies": self.anomalies,
+            "system_events": [{k: v for k, v in e.items() if k != "id"} for e in self.system_events],
+            "equipment_history": {device_id: details["history"] for device_id, details in self.equipment_details.items()},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+
+    def load_seed_snapshot(self, path):
+        """
+        Nạp dữ liệu lịch sử từ snapshot. Timestamp được dời tới hiện tại theo bội số
+        của giờ (lịch sử tải) và của ngày (dữ liệu theo ngày) để giữ nguyên mẫu tải.
+        """
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        elapsed_ms = int(self.clock.time() * 1000) - snapshot["created_at"]
+        hour_shift = elapsed_ms // 3_600_000 * 3_600_000
+        day_shift = elapsed_ms // 86_400_000 * 86_400_000
+
+        load_history = np.array(snapshot["load_history"], dtype=np.float64).reshape(-1, 2)
+        self._extend_load_history(load_history[:, 0].astype(np.int64) + hour_shift, load_history[:, 1])
+        self.energy_daily_history = [[ts + day_shift, kwh] for ts, kwh in snapshot["energy_daily_history"]]
+        self.energy_baseline_range = [tuple(band) for band in snapshot["energy_baseline_range"]]
+        self.anomalies = [{**a, "timestamp": a["timestamp"] + day_shift} for a in snapshot["anomalies"]]
+        for event in sorted(snapshot["system_events"], key=lambda e: e["timestamp"]):
+            self.system_events.append({**event, "timestamp": event["timestamp"] + day_shift})
+        for device_id, history in snapshot["equipment_history"].items():
+            if device_id in self.equipment_details:
+                self.equipment_details[device_id]["history"] = {
+                    name: [[ts + day_shift, v] for ts, v in points] for name, points in history.items()
+                }
+
+    # --- LƯU TRỮ BỀN VỮNG ---
+    def _persist_seed_history(self):
+        """Ghi dữ liệu khởi tạo vào kho lưu trữ để các lần khởi động sau phát lại thay vì sinh mới."""
+        self.store.series("load").extend(self.load_history.timestamps, self.load_history.values)
+        energy_log = self.store.log("energy_daily")
+        for (ts, kwh), (min_kwh, max_kwh) in zip(self.energy_daily_history, self.energy_baseline_range):
+            energy_log.append(ts, {"kwh": kwh, "min": min_kwh, "max": max_kwh})
+        for anomaly in sorted(self.anomalies, key=lambda a: a["timestamp"]):
+            self.store.log("anomalies").append(anomaly["timestamp"], anomaly)
+        for event in self.system_events:
+            self.store.log("system_events").append(event["timestamp"], event)
+        for device_id, details in self.equipment_details.items():
+            for name, points in details["history"].items():
+                series = self.store.series(f"equipment/{device_id}/{name}")
+                series.extend([p[0] for p in points], [p[1] for p in points])
+        self.store.flush()
+
+    def _replay_store(self):
+        """Khôi phục lịch sử trong bộ nhớ từ kho lưu trữ; chỉ giữ lại phần mới nhất có giới hạn."""
+        print(f"Đang phát lại lịch sử từ {self.store.directory}...")
+        load_series = self.store.series("load")
+        self.load_history.extend(*load_series.tail(LOAD_HISTORY_CAPACITY))
+        # Các mức tổng hợp được dựng lại theo từng segment, không nạp toàn bộ lịch sử vào RAM.
+        for ts, values in load_series.iter_chunks():
+            self.load_rollups.add_many(ts, values)
+            self.forecaster.observe_many(ts, values)
+        for ts, record in self.store.log("energy_daily").iter():
+            # Một ngày có thể được ghi lại sau khi khởi động giữa ngày; bản ghi sau thay bản trước.
+            if self.energy_daily_history and self.energy_daily_history[-1][0] == ts:
+                self.energy_daily_history.pop()
+                self.energy_baseline_range.pop()
+            self.energy_daily_history.append([ts, record["kwh"]])
+            self.energy_baseline_range.append((record["min"], record["max"]))
+        self.anomalies = [record for _, record in self.store.log("anomalies").iter()]
+        # EventLog tự giới hạn số sự kiện giữ trong bộ nhớ; id được đánh lại theo thứ tự phát lại.
+        for _, record in self.store.log("system_events").iter():
+            self.system_events.append(record)
+        for device_id, details in self.equipment_details.items():
+            prefix = f"equipment/{device_id}/"
+            # Giữ thứ tự chỉ số như khi khởi tạo để UI hiển thị ổn định.
+            known = list(DETAIL_HISTORY_SPECS.get(device_id, {}))
+            metrics = [name[len(prefix):] for name in self.store.series_names(prefix)]
+            for metric in [m for m in known if m in metrics] + [m for m in metrics if m not in known]:
+                ts, values = self.store.series(prefix + metric).read()
+                details["history"][metric] = to_pairs(ts, values)
+        print(f"Đã phát lại {len(self.load_history)} điểm tải và {len(self.system_events)} sự kiện.")
+
+    def _resume_energy(self):
+        """
+        Nối kế toán năng lượng vào lịch sử đã có: dải nền từ các ngày trước, phần hôm nay
+        tích phân lại từ lịch sử tải. Mục theo ngày của hôm nay (chưa trọn ngày) bị bỏ đi,
+        ngày hôm nay sẽ được ghi khi kết thúc.
+        """
+        hourly = self.store.series("energy_hourly").tail(HOURLY_HISTORY_HOURS) if self.store is not None else None
+        partial = self.energy.resume(int(self.clock.time() * 1000), self.energy_daily_history,
+                                     self.load_history.timestamps, self.load_history.values, hourly)
+        if partial:
+            del self.energy_daily_history[-partial:]
+            del self.energy_baseline_range[-partial:]
+
+    def add_system_event(self, event_type, severity, message, timestamp=None):
+        event = {
+            "timestamp": timestamp if timestamp is not None else int(self.clock.time() * 1000),
+            "type": event_type, "severity": severity, "message": message
+        }
+        self.system_events.append(event)
+        if self.store is not None:
+            self.store.log("system_events").append(event["timestamp"], event)
+        return event
+
+    def add_anomaly(self, value, reason, timestamp=None):
+        anomaly = {
+            "timestamp": timestamp if timestamp is not None else int(self.clock.time() * 1000),
+            "value": value, "reason": reason
+        }
+        self.anomalies.append(anomaly)
+        if self.store is not None:
+            self.store.log("anomalies").append(anomaly["timestamp"], anomaly)
+        return anomaly
+
+    def _sync_store(self, now_ts):
+        self.store.flush()
+        if now_ts - self.last_compaction_time >= COMPACTION_INTERVAL_SECONDS:
+            self.last_compaction_time = now_ts
+            self.store.compact(retention_s=RETENTION_DAYS * 86400, now=now_ts)
+
+    def close(self):
+        if self.prophet is not None:
+            self.prophet.close()
+        if self.store is not None:
+            self.store.close()
 
     # --- CÁC HÀM CUNG CẤP DỮ LIỆU CHO API ---
     def get_full_state(self):
         """Trả về toàn bộ trạng thái hiện tại của kho, dùng cho API chính."""
-        active_compressor = next((e for e in self.equipment if e["type"] == "Máy nén" and e["status"] == "Hoạt động"), self.equipment[0])
+        active_compressor = self.equipment.first("Máy nén")
         return {
             "environment": {
                 "zone_a_temp": round(self.zone_A_temp, 2),
@@ -115,16 +335,60 @@ class ColdStorage:
             "kpis": {
                 "energy_efficiency": round(48.0 / self.compressor_power_kw if self.compressor_power_kw > 1 else 0, 2),
                 "total_anomalies": len(self.anomalies),
-                "devices_at_risk": sum(1 for e in self.equipment if e["health_score"] < 80),
+                "devices_at_risk": self.equipment.count_below(80),
             },
-            "equipment_summary": self.equipment,
+            "equipment_summary": self.equipment.to_list(),
             "ai_agent": {
                 "recommendations": self.ai_recommendations
             }
         }
 
+    def get_equipment_health(self):
+        """Danh sách thiết bị kèm dữ liệu chi tiết, dùng cho trang Sức khỏe Thiết bị."""
+        return self.equipment.merged_view(self.equipment_details, self.maintenance.predictions)
+
+    def get_historical_data(self):
+        """Dữ liệu lịch sử cho trang báo cáo; sự kiện chỉ gồm trang mới nhất."""
+        events, next_cursor = self.system_events.query()
+        return {
+            "energy_history": self.energy_daily_history,
+            "equipment_list": self.equipment.to_list(),
+            "equipment_details": self.equipment_details,
+            "system_events": events, # Mới nhất lên đầu
+            "system_events_next_cursor": next_cursor,
+        }
+
+    def get_load_history(self, start_ms=None, end_ms=None, max_points=DASHBOARD_HISTORY_POINTS):
+        """Lịch sử tải trong khoảng thời gian, tối đa `max_points` điểm (thô, LTTB hoặc tổng hợp)."""
+        return self.load_rollups.query(start_ms, end_ms, max_points)
+
+    def get_energy_history(self, start_ms=None, end_ms=None, max_points=None):
+        """
+        Lịch sử năng lượng theo ngày trong khoảng thời gian, giảm mẫu bằng LTTB nếu vượt `max_points`,
+        kèm năng lượng hôm nay tới hiện tại (theo giờ và theo khung giá).
+        """
+        history = self.energy_daily_history
+        lo = 0 if start_ms is None else bisect_left(history, start_ms, key=lambda p: p[0])
+        hi = len(history) if end_ms is None else bisect_right(history, end_ms, key=lambda p: p[0])
+        history, baseline = history[lo:hi], self.energy_baseline_range[lo:hi]
+        if max_points is not None and len(history) > max_points:
+            keep = lttb_indices([p[0] for p in history], [p[1] for p in history], max_points).tolist()
+            history, baseline = [history[i] for i in keep], [baseline[i] for i in keep]
+        return {
+            "energy_daily_history": history,
+            "energy_baseline_range": baseline,
+            "today": self.energy.today(),
+            "anomalies": [a for a in self.anomalies if (start_ms is None or a["timestamp"] >= start_ms) and (end_ms is None or a["timestamp"] <= end_ms)],
+        }
+
     def to_dict_for_websocket(self):
         """Trả về dữ liệu rút gọn để cập nhật real-time qua WebSocket."""
+        data = self.dashboard_fields()
+        data["load_history"] = to_pairs(*self.load_history.last(DASHBOARD_HISTORY_POINTS))
+        return data
+
+    def dashboard_fields(self):
+        """Các trường của dashboard ngoài lịch sử tải, dùng để tính delta mỗi tick."""
         return {
             "avg_temp": round((self.zone_A_temp + self.zone_B_temp) / 2, 2),
             "humidity": round(self.humidity, 2),
@@ -132,69 +396,199 @@ class ColdStorage:
             "compressor_power_kw": round(self.compressor_power_kw, 2),
             "door_status": self.door_status,
             "heatmap_data": self._get_heatmap_data(),
-            "load_history": self.load_history,
-            "load_forecast": self._get_simple_forecast(),
+            "load_forecast": self.load_forecast,
             "compressor_schedule": self._get_compressor_schedule()
         }
 
     # --- CÁC HÀM TƯƠNG TÁC ---
     def fix_equipment(self, device_id: str):
         """Mô phỏng việc sửa chữa thiết bị, phục hồi điểm sức khỏe."""
-        for device in self.equipment:
-            if device["id"] == device_id:
-                device["health_score"] = 98.0
-                self.system_events.insert(0, {
-                    "timestamp": int(time.time() * 1000), "type": "Bảo trì", "severity": "Thấp",
-                    "message": f"Thiết bị '{device['name']}' đã được bảo trì, phục hồi điểm sức khỏe."
-                })
-                return True
-        return False
+        device = self.equipment.get(device_id)
+        if device is None:
+            return False
+        self.equipment.set_health(device_id, 98.0)
+        self.add_system_event("Bảo trì", "Thấp", f"Thiết bị '{device['name']}' đã được bảo trì, phục hồi điểm sức khỏe.")
+        self.snapshots.publish()
+        return True
+
+    def act_on_recommendation(self, rec_id):
+        """Người dùng chấp nhận một khuyến nghị: ghi sự kiện và xóa khỏi danh sách. Trả về khuyến nghị, hoặc None."""
+        rec = next((r for r in self.ai_recommendations if r["id"] == rec_id), None)
+        if rec is None:
+            return None
+        self.ai_recommendations.remove(rec)
+        self.add_system_event("AI Agent", "Thấp", f"Người dùng đã chấp nhận khuyến nghị: '{rec['action_suggestion']}'")
+        self.snapshots.publish()
+        return rec
+
+    def dismiss_recommendation(self, rec_id):
+        """Người dùng bỏ qua một khuyến nghị. Trả về False nếu không có khuyến nghị này."""
+        initial_len = len(self.ai_recommendations)
+        self.ai_recommendations = [rec for rec in self.ai_recommendations if rec["id"] != rec_id]
+        if len(self.ai_recommendations) == initial_len:
+            return False
+        self.snapshots.publish()
+        return True
     
     # --- CÁC HÀM LOGIC CỦA SIMULATION ---
     def update(self):
         """Hàm cập nhật chính, chạy mỗi 2 giây."""
+        self._tick()
+        self.snapshots.publish()
+
+    def run_batch(self, ticks, heatmap=False, forecast=False):
+        """
+        Chạy liên tiếp `ticks` tick không nghỉ, dùng với `VirtualClock` để sinh lịch sử
+        nhanh hơn thời gian thực. Trường nhiệt và dự báo Prophet mặc định được bỏ qua
+        vì chỉ phục vụ hiển thị/khuyến nghị; snapshot chỉ được phát hành một lần ở cuối.
+        """
+        advance = getattr(self.clock, "advance", None)
+        if advance is None:
+            raise ValueError("Chế độ chạy lô cần đồng hồ ảo (VirtualClock).")
+        for _ in range(ticks):
+            advance(TICK_SECONDS)
+            self._tick(heatmap=heatmap, forecast=forecast)
+        self.snapshots.publish()
+
+    # --- DỮ LIỆU CẢM BIẾN ---
+    def apply_readings(self, batch):
+        """
+        Áp dụng một lô giá trị cảm biến (đã gộp trong tick). Chỉ số cấp kho cập nhật trạng
+        thái theo giá trị mới nhất và tạm dừng phần mô phỏng tương ứng; công suất máy nén
+        được nạp cả lô vào lịch sử tải. Chỉ số thiết bị được gộp vào lịch sử chi tiết.
+        """
+        now_ts = self.clock.time()
+        for (device_id, metric), (ts, values) in batch.series.items():
+            order = np.argsort(ts, kind="stable")
+            ts, values = ts[order], values[order]
+            if device_id is None:
+                self.live_sources[metric] = now_ts
+                self._apply_site_readings(metric, ts, values)
+            elif device_id in self.equipment_details:
+                self._apply_device_readings(device_id, DEVICE_METRICS[metric], ts, values)
+            else:
+                INGEST_REJECTED.labels(reason="unknown_device").inc(len(ts))
+
+    def _apply_site_readings(self, metric, ts, values):
+        latest = float(values[-1])
+        if metric == "compressor_power_kw":
+            last = self.load_history.latest()
+            if last is not None:
+                keep = ts > last[0]
+                INGEST_REJECTED.labels(reason="out_of_order").inc(int(len(ts) - keep.sum()))
+                ts, values = ts[keep], values[keep]
+            if len(ts) == 0:
+                return
+            self._extend_load_history(ts, values)
+            if self.store is not None:
+                self.store.series("load").extend(ts, values)
+            self.compressor_power_kw = float(values[-1])
+            self.compressor_status = "ON" if self.compressor_power_kw > 1 else "OFF"
+        elif metric == "zone_a_temp":
+            self.zone_A_temp = latest
+        elif metric == "zone_b_temp":
+            self.zone_B_temp = latest
+        elif metric == "humidity":
+            self.humidity = latest
+        elif metric == "door_open":
+            self.door_status = "OPEN" if latest >= 0.5 else "CLOSED"
+
+    def _apply_device_readings(self, device_id, name, ts, values):
+        """
+        Gộp các giá trị (đã sắp theo thời gian) thành một điểm mỗi DEVICE_HISTORY_INTERVAL_MS:
+        timestamp cuối và trung bình của khoảng. Khoảng không mới hơn điểm đã lưu bị bỏ.
+        """
+        history = self.equipment_details[device_id]["history"].setdefault(name, [])
+        buckets, first, counts = np.unique(ts // DEVICE_HISTORY_INTERVAL_MS, return_index=True, return_counts=True)
+        if history:
+            keep = buckets > history[-1][0] // DEVICE_HISTORY_INTERVAL_MS
+            INGEST_REJECTED.labels(reason="out_of_order").inc(int(counts[~keep].sum()))
+            first, counts = first[keep], counts[keep]
+        if len(first) == 0:
+            return
+        point_ts = ts[first + counts - 1]
+        # Các khoảng được giữ luôn là phần đuôi của lô nên reduceat cộng đúng từng khoảng.
+        means = np.add.reduceat(values, first) / counts
+        points = [[t, round(v, 3)] for t, v in zip(point_ts.tolist(), means.tolist())]
+        history.extend(points)
+        if len(history) > DEVICE_HISTORY_MAX_POINTS:
+            del history[:len(history) - DEVICE_HISTORY_MAX_POINTS]
+        self.maintenance.mark(device_id)
+        if self.store is not None:
+            self.store.series(f"equipment/{device_id}/{name}").extend(point_ts, [p[1] for p in points])
+
+    def _is_live(self, metric):
+        seen = self.live_sources.get(metric)
+        return seen is not None and self.clock.time() - seen < LIVE_SOURCE_TIMEOUT_SECONDS
+
+    def _tick(self, heatmap=True, forecast=True):
         self._update_environmental_factors()
         self._degrade_equipment_health()
         self._update_temperature()
+        self._update_humidity()
         self._update_compressor_power()
-        self._run_ai_agent_logic()
+        self._account_energy()
+        self._update_forecast()
+        if heatmap:
+            self._update_thermal_field()
+        self._detect_anomalies()
+        self.maintenance.refresh(self.equipment_details)
+        if forecast:
+            self._run_ai_agent_logic()
+        if self.store is not None:
+            self._sync_store(self.clock.time())
 
     def _update_environmental_factors(self):
-        if random.random() < 0.01 and self.door_status == "CLOSED":
-            self.door_status = "OPEN"
-        elif random.random() < 0.05 and self.door_status == "OPEN":
-            self.door_status = "CLOSED"
+        # Cửa có cảm biến thật thì giữ trạng thái đo được.
+        if not self._is_live("door_open"):
+            if self.rng.random() < 0.01 and self.door_status == "CLOSED":
+                self.door_status = "OPEN"
+            elif self.rng.random() < 0.05 and self.door_status == "OPEN":
+                self.door_status = "CLOSED"
         
         if self.door_status == "OPEN":
-            self.door_open_duration_s += 2
-            if self.door_open_duration_s == DOOR_OPEN_ANOMALY_SECONDS:
-                if not any(a['reason'].startswith('Cửa kho mở') for a in self.anomalies):
-                    self.anomalies.append({
-                        "timestamp": int(time.time() * 1000), "value": None,
-                        "reason": f"Cửa kho mở liên tục trong {DOOR_OPEN_ANOMALY_SECONDS // 60} phút."
-                    })
-                    self.system_events.insert(0, {"timestamp": int(time.time() * 1000), "type": "Vận hành", "severity": "Cao", "message": "Cảnh báo: Cửa kho mở quá lâu!"})
+            self.door_open_duration_s += TICK_SECONDS
         else:
             self.door_open_duration_s = 0
 
+    def _update_thermal_field(self):
+        fans_running = set(self.equipment.ids("Quạt", "Hoạt động"))
+        self.thermal_field.step(self.door_status == "OPEN", self.compressor_power_kw, fans_running,
+                                (self.zone_A_temp, self.zone_B_temp))
+
+    def _detect_anomalies(self):
+        """Đưa các tín hiệu của tick hiện tại qua bộ phát hiện bất thường dạng luồng."""
+        door_open = self.door_status == "OPEN"
+        # Công suất chỉ có ý nghĩa khi máy nén chạy và cửa đóng; các trường hợp khác đã có luật riêng.
+        power = self.compressor_power_kw if self.compressor_status == "ON" and not door_open else np.nan
+        values = (self.zone_A_temp, self.zone_B_temp, self.humidity, power, float(door_open))
+        for alert in self.anomaly_detector.update(values, int(self.clock.time() * 1000), TICK_SECONDS):
+            value, reason, severity, message = describe_alert(alert, ANOMALY_SIGNALS)
+            self.add_anomaly(value, reason, alert["timestamp"])
+            self.add_system_event("Vận hành", severity, message, alert["timestamp"])
+
     def _degrade_equipment_health(self):
-        for device in self.equipment:
-            if device["status"] == "Hoạt động":
-                degradation = 0.005 if "Máy nén" in device["name"] else 0.01
-                if device["health_score"] > 40:
-                    device["health_score"] -= degradation
+        self.equipment.degrade()
 
     def _update_temperature(self):
-        self.zone_A_temp += random.uniform(0.01, 0.03)
-        self.zone_B_temp += random.uniform(0.01, 0.03)
+        delta_A = self.rng.uniform(0.01, 0.03)
+        delta_B = self.rng.uniform(0.01, 0.03)
         
         if self.door_status == "OPEN":
-            self.zone_A_temp += random.uniform(0.1, 0.2)
-            self.zone_B_temp += random.uniform(0.1, 0.2)
+            delta_A += self.rng.uniform(0.1, 0.2)
+            delta_B += self.rng.uniform(0.1, 0.2)
             
         if self.compressor_status == "ON":
-            self.zone_A_temp -= random.uniform(0.1, 0.3)
-            self.zone_B_temp -= random.uniform(0.1, 0.3)
+            delta_A -= self.rng.uniform(0.1, 0.3)
+            delta_B -= self.rng.uniform(0.1, 0.3)
+
+        # Vùng có cảm biến thật giữ giá trị đo được.
+        if not self._is_live("zone_a_temp"):
+            self.zone_A_temp += delta_A
+        if not self._is_live("zone_b_temp"):
+            self.zone_B_temp += delta_B
+        if self._is_live("compressor_power_kw"):
+            return
             
         avg_temp = (self.zone_A_temp + self.zone_B_temp) / 2
         if avg_temp > -19.5 and self.compressor_status == "OFF":
@@ -202,79 +596,107 @@ class ColdStorage:
         elif avg_temp < -20.5 and self.compressor_status == "ON":
             self.compressor_status = "OFF"
 
+    def _update_humidity(self):
+        if not self._is_live("humidity"):
+            self.humidity = humidity_step(self.humidity, self.door_status == "OPEN", self.compressor_status == "ON",
+                                          self.rng.uniform(-HUMIDITY_NOISE, HUMIDITY_NOISE))
+
     def _update_compressor_power(self):
+        if self._is_live("compressor_power_kw"):
+            return
         if self.compressor_status == "OFF":
-            self.compressor_power_kw = 0.5 + random.uniform(-0.2, 0.2)
+            self.compressor_power_kw = 0.5 + self.rng.uniform(-0.2, 0.2)
             return
 
         base_power = 45.0
         
-        active_compressor = next((e for e in self.equipment if e["type"] == "Máy nén" and e["status"] == "Hoạt động"), self.equipment[0])
+        active_compressor = self.equipment.first("Máy nén")
         health_score = active_compressor['health_score']
         efficiency_factor = 1 + (100 - health_score) / 150
         
         door_penalty = 10.0 if self.door_status == "OPEN" else 0.0
         
-        self.compressor_power_kw = (base_power * efficiency_factor) + door_penalty + random.uniform(-1.0, 1.0)
+        self.compressor_power_kw = (base_power * efficiency_factor) + door_penalty + self.rng.uniform(-1.0, 1.0)
         
-        self.load_history.append([int(time.time() * 1000), self.compressor_power_kw])
-        if len(self.load_history) > 1500:
-            self.load_history.pop(0)
+        now_ms = int(self.clock.time() * 1000)
+        last = self.load_history.latest()
+        if last is not None and now_ms <= last[0]:
+            # Điểm cảm biến (trong giới hạn lệch đồng hồ) có thể đã mới hơn tick hiện tại.
+            return
+        self.load_history.append(now_ms, self.compressor_power_kw)
+        self.load_rollups.add(now_ms, self.compressor_power_kw)
+        self.forecaster.observe(now_ms, self.compressor_power_kw)
+        if self.store is not None:
+            self.store.series("load").append(now_ms, self.compressor_power_kw)
     
+    def _account_energy(self):
+        """Tích phân công suất của tick vào kWh; ghi nhận giờ/ngày vừa kết thúc và bất thường năng lượng."""
+        for event in self.energy.add(int(self.clock.time() * 1000), self.compressor_power_kw):
+            if event["kind"] == "hour":
+                if self.store is not None:
+                    self.store.series("energy_hourly").append(event["timestamp"], event["kwh"])
+            elif event["kind"] == "day":
+                self.energy_daily_history.append([event["timestamp"], event["kwh"]])
+                self.energy_baseline_range.append((event["min"], event["max"]))
+                if self.store is not None:
+                    self.store.log("energy_daily").append(event["timestamp"], {k: event[k] for k in ("kwh", "min", "max", "tariff", "complete")})
+            else:
+                reason, severity, message = describe_energy_anomaly(event)
+                self.add_anomaly(event["kwh"], reason, event["timestamp"])
+                self.add_system_event("Năng lượng", severity, message, event["timestamp"])
+
+    def _update_forecast(self):
+        """Đường dự báo dùng chung cho dashboard, biểu đồ và AI Agent (cache theo bucket)."""
+        self.load_forecast = self.forecaster.forecast(int(self.clock.time() * 1000), PREDICTION_PERIOD_MINUTES)
+
     def _run_ai_agent_logic(self):
-        now_ts = time.time()
-        if now_ts - self.last_prediction_time < 900:
+        now_ts = self.clock.time()
+        prophet_updated = self.prophet is not None and self.prophet.refresh(now_ts, self.load_history)
+        if not prophet_updated and now_ts - self.last_prediction_time < 900:
             return
-
-        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] AI Agent bắt đầu chạy dự báo với Prophet...")
         self.last_prediction_time = now_ts
 
-        history_points = [p for p in self.load_history if datetime.fromtimestamp(p[0]/1000) > datetime.now() - timedelta(hours=CONTEXT_HOURS)]
-        
-        if len(history_points) < 20:
-            print("Chưa đủ dữ liệu lịch sử để dự báo.")
+        # Ưu tiên đường dự báo Prophet gần nhất nếu có, ngược lại dùng Holt-Winters.
+        backend, curve = self.forecaster, self.load_forecast
+        if self.prophet is not None:
+            prophet_curve = self.prophet.forecast(int(now_ts * 1000), PREDICTION_PERIOD_MINUTES)
+            if prophet_curve:
+                backend, curve = self.prophet, prophet_curve
+        latest = self.load_history.latest()
+        if not curve or latest is None:
             return
+        self._apply_forecast_result(latest[1], max(value for _, value in curve), backend.label, now_ts)
 
-        df = pd.DataFrame(history_points, columns=['ds', 'y'])
-        df['ds'] = pd.to_datetime(df['ds'], unit='ms')
-
-        m = Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=True).fit(df)
-        future_df = m.make_future_dataframe(periods=PREDICTION_PERIOD_MINUTES, freq='min')
-        forecast = m.predict(future_df)
-        
-        current_load = df['y'].iloc[-1]
-        future_forecast = forecast[forecast['ds'] > df['ds'].iloc[-1]]
-        max_predicted_load = future_forecast['yhat'].max()
-
-        print(f"Tải hiện tại: {current_load:.1f} kW. Tải dự báo cao nhất trong {PREDICTION_PERIOD_MINUTES//60} giờ tới: {max_predicted_load:.1f} kW")
+    def _apply_forecast_result(self, current_load, max_predicted_load, model_label, now_ts):
+        print(f"[{self.clock.now().strftime('%H:%M:%S')}] Tải hiện tại: {current_load:.1f} kW. Tải dự báo cao nhất trong {PREDICTION_PERIOD_MINUTES//60} giờ tới: {max_predicted_load:.1f} kW ({model_label})")
 
-        if max_predicted_load > current_load * SPIKE_THRESHOLD and not any(rec['type'] == 'PREDICTIVE_COOLING' for rec in self.ai_recommendations):
-            self.ai_recommendations.append({
+        # Dựng danh sách mới rồi gán một lần để API không bao giờ thấy trạng thái dở dang.
+        recommendations = [rec for rec in self.ai_recommendations if now_ts - rec['created_at'] < 3600]
+        if max_predicted_load > current_load * SPIKE_THRESHOLD and not any(rec['type'] == 'PREDICTIVE_COOLING' for rec in recommendations):
+            recommendations.append({
                 "id": str(uuid.uuid4()), "type": "PREDICTIVE_COOLING",
                 "title": "AI Dự báo Tải nhiệt Tăng cao",
-                "reason": f"Mô hình Prophet dự báo tải nhiệt có thể tăng lên tới {max_predicted_load:.1f} kW trong vài giờ tới.",
+                "reason": f"Mô hình {model_label} dự báo tải nhiệt có thể tăng lên tới {max_predicted_load:.1f} kW trong vài giờ tới.",
                 "action_suggestion": "Kích hoạt chế độ 'Làm lạnh trước' (Pre-cooling) để ổn định nhiệt độ.",
-                "created_at": time.time()
+                "created_at": self.clock.time()
             })
-        
-        self.ai_recommendations = [rec for rec in self.ai_recommendations if now_ts - rec['created_at'] < 3600]
+        self.ai_recommendations = recommendations
 
     def _get_heatmap_data(self):
-        hot_spot_row, hot_spot_col = (2, 1) if self.door_status == "OPEN" else (4, 8)
-        base_temp = (self.zone_A_temp + self.zone_B_temp) / 2
-        heatmap = [[0.0 for _ in range(10)] for _ in range(5)]
-        for r in range(5):
-            for c in range(10):
-                distance = abs(r - hot_spot_row) + abs(c - hot_spot_col)
-                heatmap[r][c] = base_temp + distance * 0.15 + random.uniform(-0.1, 0.1)
-        return heatmap
-
-    def _get_simple_forecast(self):
-        now_ts = int(time.time() * 1000)
-        return [[now_ts + (i+1)*30*60*1000, self.compressor_power_kw + random.uniform(-5, 5)] for i in range(6)]
-    
+        """Khung heatmap đã giảm mẫu và lượng tử hóa (uint8, base64) của tick hiện tại."""
+        return self.thermal_field.frame
+
     def _get_compressor_schedule(self):
-        now = datetime.now()
+        """Lịch máy nén chỉ phụ thuộc vào ngày hiện tại nên được tính một lần mỗi ngày."""
+        today = self.clock.now().date()
+        cached_day, schedule = self._compressor_schedule
+        if cached_day != today:
+            schedule = self._build_compressor_schedule()
+            self._compressor_schedule = (today, schedule)
+        return schedule
+
+    def _build_compressor_schedule(self):
+        now = self.clock.now()
         start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
         def to_ts(hour): return int((start_of_day + timedelta(hours=hour)).timestamp() * 1000)
         
@@ -292,17 +714,17 @@ class ColdStorage:
     def _generate_fake_past_energy_data(self, days=90):
         """Hàm này tạo dữ liệu quá khứ cho một số ngày nhất định."""
         print(f"Bắt đầu tạo dữ liệu giả lập cho {days} ngày qua...")
-        today = datetime.now()
+        today = self.clock.now()
         history_data, baseline_min_data, baseline_max_data, anomalies_data = [], [], [], []
         for i in range(days):
             current_date = today - timedelta(days=(days-1)-i)
             timestamp = int(datetime(current_date.year, current_date.month, current_date.day).timestamp() * 1000)
-            base_kwh = 450 + (i % 7) * 10 + random.uniform(-10, 10)
+            base_kwh = 350 + (i % 7) * 10 + self.rng.uniform(-10, 10)
             min_kwh, max_kwh = base_kwh - 25, base_kwh + 25
-            actual_kwh = base_kwh + random.uniform(-15, 15)
-            if random.random() < 0.1 and i > 5:
-                actual_kwh = max_kwh + random.uniform(30, 50)
-                reason = random.choice(["Cửa kho mở quá lâu.", "Hiệu suất máy nén #2 giảm."])
+            actual_kwh = base_kwh + self.rng.uniform(-15, 15)
+            if self.rng.random() < 0.1 and i > 5:
+                actual_kwh = max_kwh + self.rng.uniform(30, 50)
+                reason = self.rng.choice(["Cửa kho mở quá lâu.", "Hiệu suất máy nén #2 giảm."])
                 anomalies_data.append({"timestamp": timestamp, "value": round(actual_kwh, 2), "reason": reason})
                 self.system_events.append({"timestamp": timestamp, "type": "Năng lượng", "severity": "Cao", "message": f"Bất thường năng lượng: {actual_kwh:.1f} kWh. Lý do: {reason}"})
             history_data.append([timestamp, round(actual_kwh, 2)])
@@ -313,6 +735,63 @@ class ColdStorage:
         self.anomalies = anomalies_data
         print(f"Đã tạo xong dữ liệu năng lượng lịch sử {days} ngày.")
 
+def zone_signal(zone):
+    """Tín hiệu nhiệt độ của một vùng (A, B, ...) cho bộ phát hiện bất thường."""
+    return {"name": f"zone_{zone.lower()}_temp", "label": f"Nhiệt độ vùng {zone}", "high": -18.0, "duration_s": 60,
+            "clear_margin": 0.5, "duration_reason": f"Nhiệt độ vùng {zone} cao hơn -18°C liên tục hơn 1 phút.",
+            "zscore_on": 6.0, "min_std": 0.2}
+
+# Tín hiệu đưa vào bộ phát hiện bất thường mỗi tick, theo đúng thứ tự trong `_detect_anomalies`.
+ANOMALY_SIGNALS = [
+    zone_signal("A"),
+    zone_signal("B"),
+    {"name": "humidity", "label": "Độ ẩm", "high": 95.0, "low": 70.0, "duration_s": 120, "clear_margin": 2.0,
+     "duration_reason": "Độ ẩm nằm ngoài khoảng 70-95% liên tục hơn 2 phút.", "min_std": 0.5},
+    {"name": "compressor_power_kw", "label": "Công suất máy nén", "zscore_on": 5.0, "cusum": True, "min_std": 0.5,
+     "alpha": 0.01},
+    {"name": "door_open", "label": "Cửa kho", "high": 0.5, "duration_s": DOOR_OPEN_ANOMALY_SECONDS, "zscore": False,
+     "duration_reason": f"Cửa kho mở liên tục trong {DOOR_OPEN_ANOMALY_SECONDS // 60} phút.",
+     "duration_event": "Cảnh báo: Cửa kho mở quá lâu!"},
+]
+
+# --- Quy luật dùng chung với đội kho (`app.fleet`) ---
+def humidity_step(humidity, door_open, compressor_on, noise):
+    """Độ ẩm sau một tick; nhận số thực hoặc mảng (mỗi phần tử một kho)."""
+    target = HUMIDITY_BASE + (HUMIDITY_DOOR_OPEN - HUMIDITY_BASE) * door_open - HUMIDITY_DRYING * compressor_on
+    return humidity + HUMIDITY_RATE * (target - humidity) + noise
+
+
+def describe_alert(alert, signals):
+    """(giá trị, lý do, mức độ, thông điệp sự kiện) của một báo động từ `StreamingAnomalyDetector`."""
+    spec = next(spec for spec in signals if spec["name"] == alert["signal"])
+    if alert["rule"] == "duration":
+        reason = spec["duration_reason"]
+        value = None if alert["signal"] == "door_open" else round(alert["value"], 2)
+        return value, reason, "Cao", spec.get("duration_event", f"Cảnh báo: {reason}")
+    kind = "lệch đột ngột" if alert["rule"] == "zscore" else "trôi dần khỏi mức nền"
+    reason = f"{spec['label']} {kind}: {alert['value']:.2f} (điểm {alert['score']})."
+    return round(alert["value"], 2), reason, "Trung bình", f"Cảnh báo: {reason}"
+
+
+def describe_energy_anomaly(event):
+    """(lý do, mức độ, thông điệp sự kiện) của một bất thường năng lượng từ `EnergyAccountant`."""
+    if event["direction"] == "high":
+        reason = f"Vượt dải nền {event['min']:.0f}-{event['max']:.0f} kWh của ngày."
+        severity = "Cao"
+    else:
+        day = datetime.fromtimestamp(event["day"] / 1000)
+        reason = f"Thấp hơn dải nền {event['min']:.0f}-{event['max']:.0f} kWh của ngày {day:%d/%m/%Y}."
+        severity = "Trung bình"
+    return reason, severity, f"Bất thường năng lượng: {event['kwh']:.1f} kWh. Lý do: {reason}"
+
+# Tham số (giá trị đầu, giá trị cuối, có nhiễu) của chuỗi lịch sử chi tiết từng thiết bị.
+DETAIL_HISTORY_SPECS = {
+    "comp-01": {"Dòng điện (A)": (8, 9), "Áp suất (PSI)": (150, 155)},
+    "comp-02": {"Dòng điện (A)": (9, 11, True), "Áp suất (PSI)": (145, 140)},
+    "fan-01": {"Độ rung (mm/s)": (0.2, 0.8, True), "Dòng điện (A)": (1.5, 1.8, True)},
+    "fan-02": {"Độ rung (mm/s)": (0.1, 0.1), "Dòng điện (A)": (1.2, 1.2)},
+}
+
 def _get_hourly_load_pattern():
     """Tạo ra một mẫu tải thay đổi theo giờ trong ngày để Prophet có thể học được."""
     hour = datetime.now().hour
@@ -320,25 +799,3 @@ def _get_hourly_load_pattern():
     elif 12 <= hour < 18: return 1.5 
     elif 18 <= hour < 22: return 1.0
     else: return 0.2
-
-storage = ColdStorage()
-
-async def run_simulation():
-    """Chạy vòng lặp vô tận để cập nhật trạng thái kho."""
-    print("Đang tạo dữ liệu lịch sử ban đầu cho Prophet...")
-    initial_now_s = time.time()
-    for i in range(1500):
-        past_time_s = initial_now_s - (1500 - i) * 600
-        past_dt = datetime.fromtimestamp(past_time_s)
-        hour = past_dt.hour
-        pattern = 0
-        if 6 <= hour < 12: pattern = 0.5
-        elif 12 <= hour < 18: pattern = 1.5 
-        elif 18 <= hour < 22: pattern = 1.0
-        else: pattern = 0.2
-        storage.load_history.append([int(past_time_s * 1000), 40 + random.uniform(-3, 3) + 5 * (1 + pattern)])
-    print("Hoàn tất tạo dữ liệu lịch sử ban đầu.")
-
-    while True:
-        storage.update()
-        await asyncio.sleep(2)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import json
+import uuid
+
+from fastapi import Request, Response
+
+
+class SnapshotPublisher:
+    """
+    Snapshot bất biến, đã serialize sẵn của các API đọc.
+
+    Mỗi lần `publish()` (cuối mỗi tick hoặc sau một thao tác làm thay đổi trạng thái)
+    tăng `version`. Snapshot trong `eager` được dựng ngay; các snapshot khác được dựng
+    ở request đầu tiên của phiên bản mới rồi dùng lại cho mọi request sau đó (kể cả
+    request từ worker chỉ đọc, gửi qua lệnh `snapshot`).
+    ETag gồm mã phiên chạy của tiến trình nên không trùng giữa các lần khởi động lại.
+    Hàm đăng ký bằng `subscribe()` được gọi sau mỗi lần publish (ví dụ để đẩy sang bộ nhớ chia sẻ).
+    """
+    def __init__(self, builders, eager=()):
+        self.version = 0
+        self.names = tuple(builders)
+        self._builders = builders
+        self.eager = tuple(eager)
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._cache = {}
+        self._listeners = []
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def publish(self):
+        self.version += 1
+        for name in self.eager:
+            self._build(name)
+        for listener in self._listeners:
+            listener()
+
+    def get(self, name):
+        """Trả về (bytes JSON, ETag) của snapshot ứng với phiên bản hiện tại."""
+        cached = self._cache.get(name)
+        if cached is None or cached[0] != self.version:
+            cached = self._build(name)
+        return cached[1], cached[2]
+
+    def _build(self, name):
+        body = json.dumps(self._builders[name](), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = (self.version, body, f'"{self._boot_id}-{name}-{self.version}"')
+        self._cache[name] = entry
+        return entry
+
+
+def snapshot_response(request: Request, snapshot):
+    """Trả bytes của snapshot (bytes, ETag), hoặc 304 nếu client đã có đúng phiên bản (If-None-Match)."""
+    body, etag = snapshot
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,110 @@
+import base64
+import os
+
+import numpy as np
+
+# --- Hằng số Cấu hình ---
+HEATMAP_GRID_ROWS = int(os.environ.get("COLD_STORAGE_HEATMAP_ROWS", 200))
+HEATMAP_GRID_COLS = int(os.environ.get("COLD_STORAGE_HEATMAP_COLS", 400))
+HEATMAP_FRAME_ROWS = int(os.environ.get("COLD_STORAGE_HEATMAP_FRAME_ROWS", 20))
+HEATMAP_FRAME_COLS = int(os.environ.get("COLD_STORAGE_HEATMAP_FRAME_COLS", 40))
+# Khoảng nhiệt độ được lượng tử hóa thành 0..255 trong khung gửi cho client.
+HEATMAP_TEMP_RANGE = (-25.0, -10.0)
+
+DIFFUSION_RATE = 0.2      # Hệ số khuếch tán không thứ nguyên cho mỗi bước (ổn định khi <= 0.25)
+DIFFUSION_SUBSTEPS = 4    # Số bước khuếch tán trong một tick
+AMBIENT_TEMP = 25.0       # Nhiệt độ không khí ngoài cửa kho
+DOOR_COUPLING = 0.08      # Mức trao đổi nhiệt tại cửa khi cửa mở
+EVAPORATOR_TEMP = -32.0   # Nhiệt độ dàn lạnh khi máy nén chạy hết công suất
+EVAPORATOR_COUPLING = 0.05
+FAN_MIXING = 0.5          # Tỉ lệ khuếch tán tăng thêm quanh dàn lạnh khi quạt hoạt động
+RATED_COMPRESSOR_KW = 45.0
+
+
+class ThermalField:
+    """
+    Trường nhiệt 2D của kho (vùng A bên trái, vùng B bên phải), bước bằng stencil
+    khuếch tán vector hóa NumPy với biên cách nhiệt.
+
+    Nguồn nhiệt: cửa kho (cạnh trái vùng A) trao đổi nhiệt với bên ngoài khi mở;
+    dàn lạnh mỗi vùng kéo nhiệt độ về phía `EVAPORATOR_TEMP` theo công suất máy nén,
+    quạt dàn lạnh đang hoạt động tăng khuếch tán quanh dàn. Sau mỗi tick, mỗi nửa kho
+    được dịch đều để nhiệt độ trung bình khớp với nhiệt độ vùng của mô hình chính,
+    nên trường nhiệt chỉ quyết định phân bố không gian chứ không làm lệch các KPI.
+    """
+    def __init__(self, rows=HEATMAP_GRID_ROWS, cols=HEATMAP_GRID_COLS,
+                 frame_rows=HEATMAP_FRAME_ROWS, frame_cols=HEATMAP_FRAME_COLS, initial_temps=(-20.0, -20.2)):
+        self.rows, self.cols = rows, cols
+        self.split = cols // 2
+        self.field = np.empty((rows, cols))
+        self.field[:, :self.split] = initial_temps[0]
+        self.field[:, self.split:] = initial_temps[1]
+        self._laplacian = np.zeros_like(self.field)
+
+        # Mặt nạ vị trí cửa và dàn lạnh (cố định theo kích thước lưới).
+        r, c = np.ogrid[:rows, :cols]
+        self.door_mask = (c < max(cols // 80, 1)) & (abs(r - rows * 0.45) < rows * 0.12)
+        self.evaporator_masks = {
+            "fan-01": (abs(r - rows * 0.1) < rows * 0.05) & (abs(c - cols * 0.3) < cols * 0.08),
+            "fan-02": (abs(r - rows * 0.9) < rows * 0.05) & (abs(c - cols * 0.8) < cols * 0.08),
+        }
+        self.mixing_masks = {
+            fan_id: (abs(r - rows * (0.1 if fan_id == "fan-01" else 0.9)) < rows * 0.25)
+                    & (abs(c - cols * (0.3 if fan_id == "fan-01" else 0.8)) < cols * 0.2)
+            for fan_id in self.evaporator_masks
+        }
+
+        # Biên các khối dùng để giảm mẫu bằng reduceat.
+        self._row_edges = np.linspace(0, rows, frame_rows + 1).astype(np.int64)[:-1]
+        self._col_edges = np.linspace(0, cols, frame_cols + 1).astype(np.int64)[:-1]
+        self._block_sizes = np.outer(np.diff(np.r_[self._row_edges, rows]), np.diff(np.r_[self._col_edges, cols]))
+        self.frame = self._encode_frame()
+
+    def step(self, door_open, compressor_power_kw, fans_running, zone_temps):
+        """
+        Tiến trường nhiệt một tick.
+        `fans_running` là tập id quạt dàn lạnh đang hoạt động; `zone_temps` là (vùng A, vùng B).
+        """
+        field = self.field
+        diffusion = np.full(field.shape, DIFFUSION_RATE)
+        for fan_id, mask in self.mixing_masks.items():
+            if fan_id in fans_running:
+                diffusion[mask] *= 1 + FAN_MIXING
+        diffusion = np.minimum(diffusion, 0.25)
+        cooling = EVAPORATOR_COUPLING * min(max(compressor_power_kw / RATED_COMPRESSOR_KW, 0.0), 1.0)
+
+        for _ in range(DIFFUSION_SUBSTEPS):
+            self._diffuse(diffusion)
+            if door_open:
+                field[self.door_mask] += DOOR_COUPLING * (AMBIENT_TEMP - field[self.door_mask])
+            for fan_id, mask in self.evaporator_masks.items():
+                coupling = cooling * (1.0 if fan_id in fans_running else 0.3)
+                field[mask] += coupling * (EVAPORATOR_TEMP - field[mask])
+
+        field[:, :self.split] += zone_temps[0] - field[:, :self.split].mean()
+        field[:, self.split:] += zone_temps[1] - field[:, self.split:].mean()
+        self.frame = self._encode_frame()
+
+    def _diffuse(self, rate):
+        """Một bước khuếch tán tường minh; biên Neumann (không có dòng nhiệt qua tường)."""
+        field, lap = self.field, self._laplacian
+        lap.fill(0.0)
+        lap[1:, :] += field[:-1, :] - field[1:, :]
+        lap[:-1, :] += field[1:, :] - field[:-1, :]
+        lap[:, 1:] += field[:, :-1] - field[:, 1:]
+        lap[:, :-1] += field[:, 1:] - field[:, :-1]
+        field += rate * lap
+
+    def downsample(self):
+        """Trung bình theo khối về kích thước khung gửi cho client."""
+        sums = np.add.reduceat(np.add.reduceat(self.field, self._row_edges, axis=0), self._col_edges, axis=1)
+        return sums / self._block_sizes
+
+    def _encode_frame(self):
+        lo, hi = HEATMAP_TEMP_RANGE
+        frame = self.downsample()
+        quantized = np.clip(np.rint((frame - lo) * (255 / (hi - lo))), 0, 255).astype(np.uint8)
+        return {
+            "rows": frame.shape[0], "cols": frame.shape[1], "min": lo, "max": hi,
+            "data": base64.b64encode(quantized.tobytes()).decode("ascii"),
+        }
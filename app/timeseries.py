@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Bộ đệm vòng dung lượng cố định cho chuỗi thời gian (timestamp ms, giá trị).
+
+    Dữ liệu lưu thành hai mảng song song int64/float64, mỗi điểm được ghi hai lần
+    (vị trí i và i + capacity) nên cửa sổ theo thứ tự thời gian luôn là một lát
+    cắt liên tục: thêm điểm O(1), truy vấn khoảng thời gian bằng tìm kiếm nhị phân
+    và trả về view không sao chép. Timestamp phải được thêm theo thứ tự tăng dần.
+
+    Với `width`, mỗi timestamp mang một hàng `width` giá trị (ví dụ tải của
+    nhiều kho cùng một tick); cột `i` được lấy bằng `values[:, i]`.
+    """
+    def __init__(self, capacity, width=None):
+        if capacity <= 0:
+            raise ValueError("capacity phải lớn hơn 0")
+        self.capacity = capacity
+        self.width = width
+        value_shape = (2 * capacity,) if width is None else (2 * capacity, width)
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros(value_shape, dtype=np.float64)
+        self._head = 0
+        self._count = 0
+        self.total = 0  # Tổng số điểm đã từng được thêm, kể cả điểm đã bị ghi đè.
+
+    def __len__(self):
+        return self._count
+
+    def append(self, ts_ms, value):
+        i = self._head
+        self._ts[i] = self._ts[i + self.capacity] = ts_ms
+        self._values[i] = self._values[i + self.capacity] = value
+        self._head = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self.total += 1
+
+    def extend(self, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=np.int64)[-self.capacity:]
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        n = len(timestamps)
+        positions = (self._head + np.arange(n)) % self.capacity
+        for offset in (0, self.capacity):
+            self._ts[positions + offset] = timestamps
+            self._values[positions + offset] = values
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+        self.total += n
+
+    @property
+    def timestamps(self):
+        start = self._start()
+        return self._ts[start:start + self._count]
+
+    @property
+    def values(self):
+        start = self._start()
+        return self._values[start:start + self._count]
+
+    def latest(self):
+        """Trả về điểm mới nhất (ts, giá trị) hoặc None nếu bộ đệm rỗng."""
+        if self._count == 0:
+            return None
+        i = self._head - 1 + self.capacity
+        if self.width is not None:
+            return int(self._ts[i]), self._values[i]
+        return int(self._ts[i]), float(self._values[i])
+
+    def last(self, n):
+        """View của n điểm mới nhất."""
+        n = min(n, self._count)
+        start = self._start() + self._count - n
+        return self._ts[start:start + n], self._values[start:start + n]
+
+    def range(self, start_ms=None, end_ms=None):
+        """View của các điểm có start_ms <= ts <= end_ms (None = không giới hạn)."""
+        ts, values = self.timestamps, self.values
+        lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+        return ts[lo:hi], values[lo:hi]
+
+    def _start(self):
+        return (self._head - self._count) % self.capacity
+
+
+def to_pairs(timestamps, values):
+    """Chuyển hai mảng song song thành danh sách [[ts, giá trị], ...] để trả về JSON."""
+    return [[t, v] for t, v in zip(timestamps.tolist(), values.tolist())]
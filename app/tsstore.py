@@ -0,0 +1,365 @@
+import io
+import json
+import mmap
+import os
+import struct
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+# --- Hằng số Cấu hình ---
+SEGMENT_BYTES = 8 * 1024 * 1024
+FSYNC_INTERVAL_SECONDS = 5.0
+
+# Bản ghi của chuỗi số: (timestamp ms, giá trị), 16 byte cố định.
+RECORD_DTYPE = np.dtype([("ts", "<i8"), ("value", "<f8")])
+# Tiêu đề bản ghi của log JSON: độ dài payload, timestamp ms.
+LOG_HEADER = struct.Struct("<Iq")
+
+
+class _Segment:
+    __slots__ = ("path", "seq", "size", "first_ts", "last_ts")
+
+    def __init__(self, path, seq, size=0, first_ts=None, last_ts=None):
+        self.path = path
+        self.seq = seq
+        self.size = size
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+
+    def overlaps(self, start_ms, end_ms):
+        if self.first_ts is None:
+            return False
+        return (start_ms is None or self.last_ts >= start_ms) and (end_ms is None or self.first_ts <= end_ms)
+
+
+class _Stream(ABC):
+    """
+    Một luồng dữ liệu append-only: thư mục gồm các file segment đánh số tăng dần.
+    Segment cuối cùng là segment đang ghi; các segment trước đó chỉ đọc qua mmap.
+    Ở chế độ `readonly`, độ dài mỗi segment được chốt lúc mở (tới bản ghi trọn vẹn cuối cùng)
+    nên có thể đọc song song với tiến trình đang ghi mà không sửa file nào.
+    """
+    def __init__(self, directory, segment_bytes, readonly=False):
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.readonly = readonly
+        self.segments = []
+        self._file = None
+        self._maps = {}  # đường dẫn segment -> (độ dài đã map, mmap)
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(".seg"):
+                segment = _Segment(os.path.join(directory, filename), int(filename[:-4]))
+                self._scan(segment, recover=False)
+                self.segments.append(segment)
+        if self.segments and not readonly:
+            # Sau khi bị dừng đột ngột, bản ghi cuối của segment đang ghi có thể bị cắt dở.
+            self._scan(self.segments[-1], recover=True)
+
+    def __len__(self):
+        return sum(segment.size for segment in self.segments)
+
+    @abstractmethod
+    def _scan(self, segment, recover):
+        """Chốt độ dài và timestamp đầu/cuối của `segment`; `recover` cắt bỏ bản ghi ghi dở."""
+
+    def _write(self, ts_ms, data):
+        self._append(self._writable(len(data)), ts_ms, ts_ms, data)
+
+    def _writable(self, size):
+        """Segment đang ghi còn chỗ cho `size` byte (segment rỗng nhận mọi kích thước), xoay segment nếu cần."""
+        if self.readonly:
+            raise io.UnsupportedOperation(f"{self.directory} được mở chỉ đọc.")
+        active = self.segments[-1] if self.segments else None
+        if active is None or (active.size > 0 and active.size + size > self.segment_bytes):
+            active = self._rotate()
+        elif self._file is None:
+            self._file = open(active.path, "ab")
+        return active
+
+    def _append(self, segment, first_ts, last_ts, data):
+        self._file.write(data)
+        segment.size += len(data)
+        if segment.first_ts is None:
+            segment.first_ts = first_ts
+        segment.last_ts = last_ts
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        seq = self.segments[-1].seq + 1 if self.segments else 0
+        segment = _Segment(os.path.join(self.directory, f"{seq:010d}.seg"), seq)
+        self.segments.append(segment)
+        self._file = open(segment.path, "ab")
+        return segment
+
+    def flush(self, fsync=False):
+        if self._file is not None:
+            self._file.flush()
+            if fsync:
+                os.fsync(self._file.fileno())
+
+    def _map(self, segment):
+        """
+        mmap chỉ đọc một segment, dùng lại cho tới khi segment dài thêm (segment đã đóng
+        được map đúng một lần). Dữ liệu đang ghi được flush trước để đọc được ngay.
+        """
+        if self.segments and segment is self.segments[-1]:
+            self.flush()
+        if segment.size == 0:
+            return b""
+        cached = self._maps.get(segment.path)
+        if cached is not None and cached[0] == segment.size:
+            return cached[1]
+        with open(segment.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), segment.size, access=mmap.ACCESS_READ)
+        self._unmap(segment.path)
+        self._maps[segment.path] = (segment.size, data)
+        return data
+
+    def _unmap(self, path):
+        cached = self._maps.pop(path, None)
+        if cached is not None:
+            try:
+                cached[1].close()
+            except BufferError:
+                # Còn mảng NumPy trỏ vào mapping; mapping được giải phóng cùng mảng cuối cùng.
+                pass
+
+    def compact(self, min_ts=None):
+        """
+        Xóa các segment đã đóng cũ hơn `min_ts` và gộp các segment đã đóng liền kề
+        còn nhỏ thành segment lớn hơn. Segment đang ghi không bị động tới.
+        """
+        if self.readonly or len(self.segments) < 2:
+            return
+        sealed, active = self.segments[:-1], self.segments[-1]
+        kept = []
+        for segment in sealed:
+            if min_ts is not None and segment.last_ts is not None and segment.last_ts < min_ts:
+                self._unmap(segment.path)
+                os.remove(segment.path)
+            else:
+                kept.append(segment)
+
+        merged, run = [], []
+        for segment in kept + [None]:
+            if segment is not None and sum(s.size for s in run) + segment.size <= self.segment_bytes:
+                run.append(segment)
+                continue
+            if len(run) > 1:
+                run = [self._merge(run)]
+            merged.extend(run)
+            run = [segment] if segment is not None else []
+        self.segments = merged + [active]
+
+    def _merge(self, run):
+        # Hai định dạng bản ghi đều tự mô tả nên nối thẳng nội dung file là hợp lệ.
+        target = run[0]
+        for segment in run:
+            self._unmap(segment.path)
+        tmp_path = target.path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            for segment in run:
+                with open(segment.path, "rb") as f:
+                    out.write(f.read())
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, target.path)
+        for segment in run[1:]:
+            os.remove(segment.path)
+        first = [s.first_ts for s in run if s.first_ts is not None]
+        last = [s.last_ts for s in run if s.last_ts is not None]
+        return _Segment(target.path, target.seq, sum(s.size for s in run),
+                        min(first) if first else None, max(last) if last else None)
+
+    def close(self):
+        if self._file is not None:
+            self.flush(fsync=True)
+            self._file.close()
+            self._file = None
+        for path in list(self._maps):
+            self._unmap(path)
+
+
+class NumericSeries(_Stream):
+    """Chuỗi số (timestamp ms, float64) với bản ghi 16 byte cố định."""
+    def _scan(self, segment, recover):
+        size = os.path.getsize(segment.path)
+        if recover and size % RECORD_DTYPE.itemsize:
+            size -= size % RECORD_DTYPE.itemsize
+            with open(segment.path, "r+b") as f:
+                f.truncate(size)
+        segment.size = size - size % RECORD_DTYPE.itemsize
+        if segment.size:
+            records = self._records(segment)
+            segment.first_ts, segment.last_ts = int(records["ts"][0]), int(records["ts"][-1])
+
+    def _records(self, segment):
+        return np.frombuffer(self._map(segment), dtype=RECORD_DTYPE, count=segment.size // RECORD_DTYPE.itemsize)
+
+    def append(self, ts_ms, value):
+        self._write(ts_ms, struct.pack("<qd", ts_ms, value))
+
+    def extend(self, timestamps, values):
+        """Ghi nhiều điểm: mỗi segment nhận một lát liên tục, ghi bằng một lần sao chép buffer."""
+        records = np.empty(len(timestamps), dtype=RECORD_DTYPE)
+        records["ts"], records["value"] = timestamps, values
+        start = 0
+        while start < len(records):
+            segment = self._writable(RECORD_DTYPE.itemsize)
+            count = max((self.segment_bytes - segment.size) // RECORD_DTYPE.itemsize, 1)
+            chunk = records[start:start + count]
+            self._append(segment, int(chunk["ts"][0]), int(chunk["ts"][-1]), chunk.tobytes())
+            start += len(chunk)
+
+    def iter_chunks(self, start_ms=None, end_ms=None):
+        """Sinh lần lượt (timestamps, values) của từng segment trong khoảng, là view trên mmap."""
+        for segment in list(self.segments):
+            if not segment.overlaps(start_ms, end_ms):
+                continue
+            records = self._records(segment)
+            ts = records["ts"]
+            lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+            hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="right"))
+            if hi > lo:
+                yield ts[lo:hi], records["value"][lo:hi]
+
+    def read(self, start_ms=None, end_ms=None):
+        chunks = list(self.iter_chunks(start_ms, end_ms))
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+    def tail(self, n):
+        """n điểm mới nhất, chỉ đọc các segment cần thiết từ cuối lên."""
+        chunks, remaining = [], n
+        for segment in reversed(self.segments):
+            if remaining <= 0:
+                break
+            records = self._records(segment)[-remaining:]
+            chunks.append(records)
+            remaining -= len(records)
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        records = np.concatenate(chunks[::-1])
+        return records["ts"].copy(), records["value"].copy()
+
+
+class RecordLog(_Stream):
+    """Log bản ghi JSON độ dài thay đổi, mỗi bản ghi gắn một timestamp ms."""
+    def _scan(self, segment, recover):
+        size = os.path.getsize(segment.path)
+        segment.size = size
+        offset, first_ts, last_ts = 0, None, None
+        data = self._map(segment) if size else b""
+        while offset + LOG_HEADER.size <= size:
+            length, ts_ms = LOG_HEADER.unpack_from(data, offset)
+            if offset + LOG_HEADER.size + length > size:
+                break
+            first_ts = ts_ms if first_ts is None else first_ts
+            last_ts = ts_ms
+            offset += LOG_HEADER.size + length
+        segment.size, segment.first_ts, segment.last_ts = offset, first_ts, last_ts
+        if recover and offset != size:
+            with open(segment.path, "r+b") as f:
+                f.truncate(offset)
+
+    def append(self, ts_ms, record):
+        payload = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        self._write(ts_ms, LOG_HEADER.pack(len(payload), ts_ms) + payload)
+
+    def iter(self, start_ms=None, end_ms=None):
+        """Sinh lần lượt (timestamp, bản ghi) theo thứ tự ghi, trong khoảng thời gian cho trước."""
+        for segment in list(self.segments):
+            if not segment.overlaps(start_ms, end_ms):
+                continue
+            data, offset = self._map(segment), 0
+            while offset < segment.size:
+                length, ts_ms = LOG_HEADER.unpack_from(data, offset)
+                start = offset + LOG_HEADER.size
+                offset = start + length
+                if (start_ms is None or ts_ms >= start_ms) and (end_ms is None or ts_ms <= end_ms):
+                    yield ts_ms, json.loads(bytes(data[start:offset]))
+
+
+class _EmptyStream:
+    """Chuỗi/log chưa từng được ghi, trả về khi mở kho chỉ đọc."""
+    segments = ()
+
+    def __len__(self):
+        return 0
+
+    def iter_chunks(self, start_ms=None, end_ms=None):
+        return iter(())
+
+    def iter(self, start_ms=None, end_ms=None):
+        return iter(())
+
+
+_EMPTY_STREAM = _EmptyStream()
+
+
+class SegmentStore:
+    """
+    Kho chuỗi thời gian cục bộ: mỗi chuỗi số hoặc log là một thư mục segment
+    append-only. Ghi được đệm trong bộ nhớ, `flush()` mỗi tick và fsync định kỳ
+    sau mỗi `fsync_interval_s` giây. Với `readonly=True` kho là một ảnh chụp chỉ đọc
+    tại thời điểm mở (dùng cho xuất dữ liệu, kể cả từ tiến trình khác tiến trình ghi).
+    """
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, fsync_interval_s=FSYNC_INTERVAL_SECONDS, readonly=False):
+        self.directory = directory
+        self.readonly = readonly
+        self.segment_bytes = segment_bytes
+        self.fsync_interval_s = fsync_interval_s
+        self._streams = {}
+        self._last_fsync = time.monotonic()
+        for kind, cls in (("series", NumericSeries), ("logs", RecordLog)):
+            root = os.path.join(directory, kind)
+            if os.path.isdir(root):
+                for dirname in os.listdir(root):
+                    self._open(cls, kind, unquote(dirname))
+
+    def _open(self, cls, kind, name):
+        key = (kind, name)
+        if key not in self._streams:
+            path = os.path.join(self.directory, kind, quote(name, safe=""))
+            if self.readonly and not os.path.isdir(path):
+                return _EMPTY_STREAM
+            self._streams[key] = cls(path, self.segment_bytes, readonly=self.readonly)
+        return self._streams[key]
+
+    def series(self, name):
+        return self._open(NumericSeries, "series", name)
+
+    def log(self, name):
+        return self._open(RecordLog, "logs", name)
+
+    def series_names(self, prefix=""):
+        return sorted(name for kind, name in self._streams if kind == "series" and name.startswith(prefix))
+
+    def is_empty(self):
+        return all(len(stream) == 0 for stream in self._streams.values())
+
+    def flush(self):
+        fsync = time.monotonic() - self._last_fsync >= self.fsync_interval_s
+        for stream in self._streams.values():
+            stream.flush(fsync)
+        if fsync:
+            self._last_fsync = time.monotonic()
+
+    def compact(self, retention_s=None, now=None):
+        now = time.time() if now is None else now
+        min_ts = None if retention_s is None else int((now - retention_s) * 1000)
+        for stream in self._streams.values():
+            stream.compact(min_ts)
+
+    def close(self):
+        for stream in self._streams.values():
+            stream.close()
@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import os
+import signal
+
+from .commands import CommandServer, local_handlers, state_stats
+from .metrics import REGISTRY, monitor_event_loop_lag
+from .sharedstate import ROLE, SHM_NAME, SOCKET_PATH, SharedStateWriter, publish_storage
+from .runtime import run_fleet_simulation, run_simulation, storage
+
+# Tiến trình ghi duy nhất khi phục vụ bằng nhiều worker:
+#   python -m app.writer
+#   COLD_STORAGE_ROLE=reader uvicorn app.main:app --workers 8
+# Tiến trình này chạy mô phỏng, đội kho và hàng đợi nhận dữ liệu; sau mỗi lần publish
+# snapshot, trạng thái được đẩy sang bộ nhớ chia sẻ cho các worker đọc. Chỉ số của mô
+# phỏng (tick, nhận dữ liệu, dự báo) được xuất tại http://127.0.0.1:<--metrics-port>/metrics.
+
+METRICS_PORT = int(os.environ.get("COLD_STORAGE_WRITER_METRICS_PORT", 9101))
+
+
+async def _serve_metrics(reader, writer):
+    """HTTP tối giản cho Prometheus: mọi request đều nhận văn bản chỉ số."""
+    try:
+        await reader.readuntil(b"\r\n\r\n")
+        body = REGISTRY.render().encode("utf-8")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                     b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(metrics_port=METRICS_PORT):
+    if ROLE == "reader":
+        raise SystemExit("Tiến trình ghi không chạy được với COLD_STORAGE_ROLE=reader.")
+    shared = SharedStateWriter()
+
+    def publish():
+        try:
+            publish_storage(shared, storage, state_stats())
+        except ValueError as e:
+            print(f"Không publish được trạng thái sang bộ nhớ chia sẻ: {e}")
+
+    storage.snapshots.subscribe(publish)
+    publish()
+    commands = CommandServer(local_handlers())
+    await commands.start()
+    metrics_server = await asyncio.start_server(_serve_metrics, "127.0.0.1", metrics_port) if metrics_port else None
+    print(f"Tiến trình ghi sẵn sàng: bộ nhớ chia sẻ '{SHM_NAME}', lệnh tại {SOCKET_PATH}.")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    tasks = [asyncio.create_task(run_simulation()), asyncio.create_task(run_fleet_simulation()),
+             asyncio.create_task(monitor_event_loop_lag())]
+    try:
+        await stop.wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await commands.close()
+        if metrics_server is not None:
+            metrics_server.close()
+        storage.close()
+        shared.close()
+        print("Tiến trình ghi đã dừng.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiến trình ghi duy nhất cho các worker HTTP/WebSocket chỉ đọc.")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Cổng /metrics của tiến trình ghi (0 = tắt)")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.metrics_port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import json
+
+from .simulation import DASHBOARD_HISTORY_POINTS
+from .timeseries import to_pairs
+
+# --- Giao thức WebSocket của Dashboard ---
+# Client nhận một "snapshot" đầy đủ khi kết nối, sau đó chỉ nhận "delta" mỗi tick.
+# Mỗi thông điệp có `seq` tăng dần; khi thấy seq bị nhảy cóc, client gửi
+# {"type": "resync"} và server trả lại một snapshot mới.
+PROTOCOL_VERSION = 1
+
+
+class DashboardStream:
+    """Mã hóa trạng thái kho thành chuỗi snapshot/delta có đánh số thứ tự."""
+    def __init__(self, storage, max_points=DASHBOARD_HISTORY_POINTS):
+        self.storage = storage
+        self.max_points = max_points
+        self.seq = 0
+        self._fields = {}
+        self._load_total = None  # Đọc ở delta đầu tiên: worker có thể khởi động trước tiến trình ghi.
+        self._snapshot_cache = (None, None)
+
+    def snapshot(self):
+        """Toàn bộ dữ liệu dashboard tại `seq` hiện tại."""
+        return {
+            "type": "snapshot", "v": PROTOCOL_VERSION, "seq": self.seq, "max_points": self.max_points,
+            **self.storage.to_dict_for_websocket(),
+        }
+
+    def snapshot_message(self):
+        """Snapshot đã serialize, dùng chung cho mọi client kết nối trong cùng một tick."""
+        seq, message = self._snapshot_cache
+        if seq != self.seq:
+            message = json.dumps(self.snapshot())
+            self._snapshot_cache = (self.seq, message)
+        return message
+
+    def next_delta(self):
+        """Tiến thêm một tick: chỉ gồm điểm tải mới và các trường đã thay đổi."""
+        self.seq += 1
+        fields = self.storage.dashboard_fields()
+        changed = {key: value for key, value in fields.items() if self._fields.get(key) != value}
+        self._fields = fields
+
+        load_history = self.storage.load_history
+        if self._load_total is None:
+            self._load_total = load_history.total
+        new_points = min(load_history.total - self._load_total, self.max_points)
+        self._load_total = load_history.total
+        return {
+            "type": "delta", "v": PROTOCOL_VERSION, "seq": self.seq,
+            "load_points": to_pairs(*load_history.last(new_points)),
+            **changed,
+        }
@@ -0,0 +1,96 @@
+import argparse
+import time
+
+import numpy as np
+
+from app.ai_worker import fit_prophet_forecast
+from app.clock import VirtualClock
+from app.forecasting import FORECAST_BUCKET_MS, HoltWintersForecaster
+from app.simulation import ColdStorage, CONTEXT_HOURS, PREDICTION_PERIOD_MINUTES
+
+# So sánh Holt-Winters trực tuyến với Prophet huấn luyện lại toàn bộ:
+#   python -m benchmarks.forecast --origins 12
+# Dữ liệu là lịch sử tải khởi tạo (có mẫu tải theo giờ trong ngày) với seed cố định.
+# Tại mỗi mốc dự báo, cả hai mô hình dự báo 4 giờ tới và được so với trung bình thực tế
+# của từng bucket 10 phút.
+
+
+def load_series(seed):
+    storage = ColdStorage(seed_snapshot=None, data_dir=None, clock=VirtualClock(), seed=seed, prophet=False)
+    return storage.load_history.timestamps.copy(), storage.load_history.values.copy()
+
+
+def bucket_means(ts, values):
+    buckets = ts // FORECAST_BUCKET_MS
+    keys, inverse = np.unique(buckets, return_inverse=True)
+    return dict(zip(keys.tolist(), (np.bincount(inverse, values) / np.bincount(inverse)).tolist()))
+
+
+def errors(curve, actual):
+    pairs = [(v, actual[t // FORECAST_BUCKET_MS]) for t, v in curve if t // FORECAST_BUCKET_MS in actual]
+    if not pairs:
+        return None
+    predicted, observed = np.array(pairs).T
+    return {"mae": float(np.abs(predicted - observed).mean()),
+            "mape_pct": float((np.abs(predicted - observed) / np.abs(observed)).mean() * 100)}
+
+
+def run(origins=12, spacing_hours=4, seed=7, prophet=True):
+    ts, values = load_series(seed)
+    actual = bucket_means(ts, values)
+    horizon_ms = PREDICTION_PERIOD_MINUTES * 60_000
+    origin_ms = [int(ts[-1]) - horizon_ms - i * spacing_hours * 3_600_000 for i in range(origins)][::-1]
+
+    results = {"holt-winters": {"fit_ms": [], "forecast_ms": [], "mae": [], "mape_pct": []},
+               "prophet": {"fit_ms": [], "forecast_ms": [], "mae": [], "mape_pct": []}}
+    hw = HoltWintersForecaster()
+    fed = 0
+    for origin in origin_ms:
+        end = int(np.searchsorted(ts, origin, side="right"))
+        # Holt-Winters chỉ nạp thêm phần dữ liệu mới từ mốc trước, từng điểm một như khi chạy thật.
+        started = time.perf_counter()
+        for t, v in zip(ts[fed:end].tolist(), values[fed:end].tolist()):
+            hw.observe(t, v)
+        per_point_ms = (time.perf_counter() - started) * 1000 / max(end - fed, 1)
+        fed = end
+        started = time.perf_counter()
+        curve = hw.forecast(origin, PREDICTION_PERIOD_MINUTES)
+        forecast_ms = (time.perf_counter() - started) * 1000
+        _record(results["holt-winters"], per_point_ms, forecast_ms, errors(curve, actual))
+
+        if prophet:
+            start = int(np.searchsorted(ts, origin - CONTEXT_HOURS * 3_600_000))
+            started = time.perf_counter()
+            result = fit_prophet_forecast(ts[start:end], values[start:end], PREDICTION_PERIOD_MINUTES)
+            fit_ms = (time.perf_counter() - started) * 1000
+            _record(results["prophet"], fit_ms, 0.0, errors(result["curve"], actual))
+
+    return {name: {key: round(float(np.mean(samples)), 4) for key, samples in metrics.items() if samples}
+            for name, metrics in results.items() if metrics["mae"]}
+
+
+def _record(metrics, fit_ms, forecast_ms, error):
+    metrics["fit_ms"].append(fit_ms)
+    metrics["forecast_ms"].append(forecast_ms)
+    if error is not None:
+        metrics["mae"].append(error["mae"])
+        metrics["mape_pct"].append(error["mape_pct"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dự báo tải: Holt-Winters trực tuyến và Prophet.")
+    parser.add_argument("--origins", type=int, default=12, help="Số mốc dự báo")
+    parser.add_argument("--spacing-hours", type=float, default=4, help="Khoảng cách giữa các mốc (giờ)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-prophet", action="store_true", help="Bỏ qua Prophet (ví dụ khi chưa cài)")
+    args = parser.parse_args(argv)
+
+    summary = run(args.origins, args.spacing_hours, args.seed, prophet=not args.no_prophet)
+    print(f"{'Mô hình':<14}{'Cập nhật/fit (ms)':>20}{'Dự báo (ms)':>14}{'MAE (kW)':>10}{'MAPE (%)':>10}")
+    for name, metrics in summary.items():
+        print(f"{name:<14}{metrics['fit_ms']:>20.4f}{metrics['forecast_ms']:>14.4f}{metrics['mae']:>10.2f}{metrics['mape_pct']:>10.2f}")
+    print("Holt-Winters: thời gian cập nhật tính trên mỗi điểm tải; Prophet: thời gian huấn luyện lại mỗi mốc.")
+
+
+if __name__ == "__main__":
+    main()
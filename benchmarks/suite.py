@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Bộ benchmark hiệu năng, kết quả dạng JSON để so sánh giữa các lần deploy
+# (cần thêm httpx: pip install -r requirements-dev.txt):
+#   python -m benchmarks.suite --output bench.json
+#   python -m benchmarks.suite --quick --compare bench.json   # thoát mã 1 nếu có hồi quy
+# Chỉ chạy một số nhóm: --only tick,serialization
+# Chỉ số kết thúc bằng "_ms"/"_bytes" càng nhỏ càng tốt, "_rps" càng lớn càng tốt.
+# Module `app` chỉ được import bên trong từng benchmark để mọi log khởi tạo đi sang stderr.
+
+DEFAULT_TOLERANCE = 0.25
+TICK_SECONDS = 2
+HTTP_ENDPOINTS = ("/api/state", "/api/historical-data", "/api/energy-history")
+
+
+def stats_ms(samples_s):
+    samples = np.asarray(samples_s) * 1000
+    return {
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "max_ms": round(float(samples.max()), 4),
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def make_storage(seed=1):
+    from app.clock import VirtualClock
+    from app.simulation import ColdStorage
+    return ColdStorage(seed_snapshot=None, data_dir=None, clock=VirtualClock(), seed=seed, prophet=False)
+
+
+# --- Các nhóm benchmark ---
+def bench_tick(quick):
+    """Độ trễ một tick `update()` đầy đủ và phần lõi mô phỏng (không trường nhiệt, không AI)."""
+    storage = make_storage()
+    ticks = 300 if quick else 3000
+
+    def full_tick():
+        storage.clock.advance(TICK_SECONDS)
+        storage.update()
+
+    def core_tick():
+        storage.clock.advance(TICK_SECONDS)
+        storage._tick(heatmap=False, forecast=False)
+
+    timed(full_tick, 50)
+    return {"update": stats_ms(timed(full_tick, ticks)), "core": stats_ms(timed(core_tick, ticks))}
+
+
+def bench_forecast(quick, prophet):
+    """Thời gian `_run_ai_agent_logic` (Holt-Winters) và, nếu bật, một lần huấn luyện Prophet."""
+    storage = make_storage()
+    storage.update()
+
+    def ai_logic():
+        storage.last_prediction_time = 0
+        storage._run_ai_agent_logic()
+
+    results = {"ai_agent_logic": stats_ms(timed(ai_logic, 50 if quick else 500))}
+    if prophet:
+        from app.ai_worker import fit_prophet_forecast
+        ts, values = storage.load_history.range(int((storage.clock.time() - 24 * 3600) * 1000))
+        results["prophet_fit"] = stats_ms(timed(lambda: fit_prophet_forecast(ts, values, 240), 1 if quick else 3))
+    return results
+
+
+def bench_serialization(quick):
+    """Chi phí serialize trạng thái đầy đủ và payload WebSocket theo kích thước lịch sử tải."""
+    results = {}
+    for size in ((1500, 10_000) if quick else (1500, 15_000, 43_200)):
+        storage = make_storage()
+        missing = size - len(storage.load_history)
+        if missing > 0:
+            last_ts = int(storage.load_history.timestamps[-1])
+            storage._extend_load_history(last_ts + np.arange(1, missing + 1) * TICK_SECONDS * 1000,
+                                         storage.np_rng.uniform(40, 55, missing))
+        storage.update()
+        repeat = 20 if quick else 100
+        full_state = json.dumps(storage.get_full_state())
+        websocket = json.dumps(storage.to_dict_for_websocket())
+        results[f"history_{size}"] = {
+            "history_points": len(storage.load_history),
+            "full_state": stats_ms(timed(lambda: json.dumps(storage.get_full_state()), repeat)),
+            "full_state_bytes": len(full_state.encode()),
+            "websocket_snapshot": stats_ms(timed(lambda: json.dumps(storage.to_dict_for_websocket()), repeat)),
+            "websocket_snapshot_bytes": len(websocket.encode()),
+            "snapshot_publish": stats_ms(timed(storage.snapshots.publish, repeat)),
+        }
+    return results
+
+
+def bench_http(quick):
+    """Thông lượng HTTP qua uvicorn thật, nhiều request đồng thời từ httpx."""
+    import httpx
+    import uvicorn
+    from app.main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    async def load(path, concurrency, total):
+        latencies = []
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30,
+                                     limits=httpx.Limits(max_connections=concurrency)) as client:
+            async def worker(count):
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(total // concurrency) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+        return {"requests": len(latencies), "throughput_rps": round(len(latencies) / elapsed, 1), **stats_ms(latencies)}
+
+    results = {}
+    try:
+        for path in HTTP_ENDPOINTS:
+            for concurrency in ((1, 16) if quick else (1, 16, 64)):
+                total = (100 if quick else 640) // concurrency * concurrency
+                results[f"{path} c={concurrency}"] = asyncio.run(load(path, concurrency, total))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+    return results
+
+
+class _BenchWebSocket:
+    """WebSocket giả trong tiến trình: ghi lại thời điểm nhận từng thông điệp."""
+    def __init__(self, received):
+        self.received = received
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        self.received.append(time.perf_counter())
+
+    async def close(self):
+        pass
+
+
+def bench_websocket(quick):
+    """
+    Độ trễ fan-out của `ConnectionManager` tới 1/100/1000 client cục bộ: từ lúc gọi
+    `broadcast_data()` tới lúc từng client nhận được delta (không tính mạng).
+    """
+    from app.routers.dashboard import ConnectionManager
+    from app.ws_protocol import DashboardStream
+
+    storage = make_storage()
+    stream = DashboardStream(storage)
+
+    async def run(n_clients, broadcasts):
+        manager = ConnectionManager(stream.snapshot_message)
+        inboxes = [[] for _ in range(n_clients)]
+        for inbox in inboxes:
+            await manager.connect(_BenchWebSocket(inbox))
+        await asyncio.sleep(0.05)  # Để mọi client nhận xong snapshot ban đầu.
+        latencies, fanout = [], []
+        for _ in range(broadcasts):
+            storage.clock.advance(TICK_SECONDS)
+            storage.update()
+            for inbox in inboxes:
+                inbox.clear()
+            started = time.perf_counter()
+            await manager.broadcast_data(stream.next_delta())
+            while any(not inbox for inbox in inboxes):
+                await asyncio.sleep(0)
+            received = [inbox[0] - started for inbox in inboxes]
+            latencies.extend(received)
+            fanout.append(max(received))
+        for websocket in list(manager.active_connections):
+            manager.disconnect(websocket)
+        return {"clients": n_clients, "delivery": stats_ms(latencies), "fanout_complete": stats_ms(fanout)}
+
+    return {f"clients_{n}": asyncio.run(run(n, 5 if quick else 20)) for n in (1, 100, 1000)}
+
+
+BENCHMARKS = {
+    "tick": lambda args: bench_tick(args.quick),
+    "forecast": lambda args: bench_forecast(args.quick, not args.no_prophet),
+    "serialization": lambda args: bench_serialization(args.quick),
+    "http": lambda args: bench_http(args.quick),
+    "websocket": lambda args: bench_websocket(args.quick),
+}
+
+
+# --- So sánh kết quả ---
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, name + ".")
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+def compare(current, baseline, tolerance):
+    """Danh sách hồi quy: chỉ số p50/throughput/bytes xấu đi quá `tolerance` so với baseline."""
+    previous = dict(flatten(baseline["results"]))
+    regressions = []
+    for name, value in flatten(current["results"]):
+        old = previous.get(name)
+        if not old:
+            continue
+        if name.endswith(("p50_ms", "_bytes")) and value > old * (1 + tolerance):
+            regressions.append(f"{name}: {old} -> {value}")
+        elif name.endswith("_rps") and value < old * (1 - tolerance):
+            regressions.append(f"{name}: {old} -> {value}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bộ benchmark hiệu năng Cold Storage AI.")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Các nhóm cần chạy, cách nhau bởi dấu phẩy")
+    parser.add_argument("--quick", action="store_true", help="Ít vòng lặp hơn, dùng cho CI")
+    parser.add_argument("--no-prophet", action="store_true", help="Bỏ qua benchmark huấn luyện Prophet")
+    parser.add_argument("--output", default=None, help="Ghi kết quả JSON ra file (mặc định in ra stdout)")
+    parser.add_argument("--compare", default=None, help="File JSON baseline để phát hiện hồi quy")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Mức xấu đi cho phép (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Không có nhóm benchmark: {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": {},
+    }
+    for name in names:
+        print(f"Đang chạy benchmark '{name}'...", file=sys.stderr)
+        started = time.perf_counter()
+        # Log của mô phỏng đi sang stderr để stdout chỉ chứa JSON kết quả.
+        with contextlib.redirect_stdout(sys.stderr):
+            report["results"][name] = BENCHMARKS[name](args)
+        print(f"  xong sau {time.perf_counter() - started:.1f} giây", file=sys.stderr)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Hồi quy: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# Kiểm thử không chạy Prophet (chậm và không cần cho các luồng dữ liệu được kiểm tra).
+os.environ.setdefault("COLD_STORAGE_PROPHET", "0")
@@ -0,0 +1,46 @@
+from app.eventlog import EventLog
+
+
+def _event(ts, event_type="Hệ thống", severity="Thấp"):
+    return {"timestamp": ts, "type": event_type, "severity": severity, "message": str(ts)}
+
+
+def _timestamps(page):
+    return [event["timestamp"] for event in page]
+
+
+def test_late_event_is_filtered_by_time():
+    log = EventLog()
+    for ts in (1000, 2000, 3000, 4000):
+        log.append(_event(ts))
+    log.append(_event(2500, "Năng lượng", "Cao"))
+
+    page, _ = log.query(start_ms=2000, end_ms=3000)
+    assert _timestamps(page) == [3000, 2500, 2000]
+    page, _ = log.query(event_type="Năng lượng", start_ms=2400, end_ms=2600)
+    assert _timestamps(page) == [2500]
+    assert [event["id"] for event in log] == list(range(5))
+
+
+def test_out_of_order_events_paginate_in_time_order():
+    log = EventLog()
+    for ts in (5000, 1000, 4000, 2000, 3000, 3000):
+        log.append(_event(ts))
+    seen, cursor = [], None
+    while True:
+        page, cursor = log.query(cursor=cursor, limit=2)
+        seen += _timestamps(page)
+        if cursor is None:
+            break
+    assert seen == [5000, 4000, 3000, 3000, 2000, 1000]
+
+
+def test_trim_after_late_insert_keeps_newest():
+    log = EventLog(max_events=5)
+    for ts in range(0, 8000, 1000):
+        log.append(_event(ts))
+    log.append(_event(500))
+    assert _timestamps(log)[-5:] == [3000, 4000, 5000, 6000, 7000]
+    page, _ = log.query(start_ms=0, end_ms=4000)
+    assert all(ts <= 4000 for ts in _timestamps(page))
+    assert _timestamps(page) == sorted(_timestamps(page), reverse=True)
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.ingest import MAX_CLOCK_SKEW_MS, parse_payload
+
+NOW_MS = 1_700_000_000_000
+
+
+def _parse(payload, content_type="application/json"):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return parse_payload(body, content_type, NOW_MS)
+
+
+def test_rows_and_columnar():
+    batch = _parse([{"timestamp": NOW_MS - 2000, "zone_a_temp": -19.5, "door_open": "OPEN"},
+                    {"timestamp": NOW_MS, "zone_a_temp": -19.0}])
+    ts, values = batch.series[(None, "zone_a_temp")]
+    assert ts.tolist() == [NOW_MS - 2000, NOW_MS]
+    assert values.tolist() == [-19.5, -19.0]
+    assert batch.series[(None, "door_open")][1].tolist() == [1.0]
+
+    batch = _parse({"timestamps": [NOW_MS - 1000, NOW_MS], "device_id": "comp-01", "current_a": [10, 10.5]})
+    assert batch.series[("comp-01", "current_a")][1].dtype == np.float64
+    assert len(batch) == 2
+
+
+def test_ndjson():
+    body = b'{"timestamp": 1, "humidity": 80}\n{"timestamp": 2, "humidity": 81}\n'
+    batch = _parse(body, "application/x-ndjson")
+    assert batch.series[(None, "humidity")][0].tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("payload", [
+    [{"timestamp": NOW_MS + MAX_CLOCK_SKEW_MS + 1, "humidity": 80}],
+    {"timestamps": [NOW_MS, NOW_MS + MAX_CLOCK_SKEW_MS + 1], "humidity": [80, 81]},
+    [{"timestamp": "1700000000000", "humidity": 80}],
+    [{"humidity": "80"}],
+    [{"humidity": None}],
+    {"timestamps": [NOW_MS], "humidity": ["80"]},
+    {"timestamps": [NOW_MS], "humidity": [None]},
+    {"timestamps": [NOW_MS], "humidity": [[80]]},
+    {"timestamps": ["x"], "humidity": [80]},
+    {"timestamps": [NOW_MS, NOW_MS], "humidity": [80]},
+    {"timestamps": [NOW_MS], "door_open": ["AJAR"]},
+    [{"unknown_metric": 1}],
+    [{"device_id": "comp-01", "zone_a_temp": 1}],
+    [1, 2],
+])
+def test_invalid_payload_rejected(payload):
+    with pytest.raises((ValueError, KeyError, TypeError)):
+        _parse(payload)
+
+
+@pytest.mark.parametrize("body", [b'[{"humidity": NaN}]', b'{"timestamps": [1], "humidity": [Infinity]}'])
+def test_non_finite_rejected(body):
+    with pytest.raises(ValueError):
+        _parse(body)
+
+
+def test_small_clock_skew_accepted():
+    batch = _parse([{"timestamp": NOW_MS + MAX_CLOCK_SKEW_MS, "humidity": 80}])
+    assert len(batch) == 1
@@ -0,0 +1,96 @@
+import numpy as np
+
+from app.tsstore import RECORD_DTYPE, SegmentStore
+
+SEGMENT_BYTES = 64 * RECORD_DTYPE.itemsize
+
+
+def _points(n, start=1_000):
+    ts = start + np.arange(n, dtype=np.int64) * 2000
+    return ts, np.sin(np.arange(n) / 10.0)
+
+
+def test_series_round_trip_across_segments(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_bytes=SEGMENT_BYTES)
+    series = store.series("load")
+    ts, values = _points(300)
+    series.append(int(ts[0]), float(values[0]))
+    series.extend(ts[1:250], values[1:250])
+    for t, v in zip(ts[250:].tolist(), values[250:].tolist()):
+        series.append(t, v)
+    store.flush()
+
+    assert len(series.segments) > 1
+    assert all(s.size <= SEGMENT_BYTES for s in series.segments)
+    read_ts, read_values = series.read()
+    np.testing.assert_array_equal(read_ts, ts)
+    np.testing.assert_array_equal(read_values, values)
+    part_ts, _ = series.read(int(ts[100]), int(ts[199]))
+    np.testing.assert_array_equal(part_ts, ts[100:200])
+    tail_ts, tail_values = series.tail(70)
+    np.testing.assert_array_equal(tail_ts, ts[-70:])
+    np.testing.assert_array_equal(tail_values, values[-70:])
+    store.close()
+
+    reopened = SegmentStore(str(tmp_path), segment_bytes=SEGMENT_BYTES)
+    read_ts, read_values = reopened.series("load").read()
+    np.testing.assert_array_equal(read_ts, ts)
+    np.testing.assert_array_equal(read_values, values)
+    reopened.close()
+
+
+def test_log_round_trip_and_readonly_snapshot(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_bytes=256)
+    records = [(1000 * i, {"kwh": i * 1.5, "note": "ngày " + str(i)}) for i in range(40)]
+    for ts, record in records:
+        store.log("energy_daily").append(ts, record)
+    store.series("load").extend(*_points(10))
+    store.flush()
+
+    snapshot = SegmentStore(str(tmp_path), readonly=True)
+    store.log("energy_daily").append(99_000, {"kwh": 0.0})
+    store.flush()
+    assert list(snapshot.log("energy_daily").iter()) == records
+    assert list(snapshot.log("energy_daily").iter(5000, 7000)) == records[5:8]
+    assert len(snapshot.series("load").read()[0]) == 10
+    assert len(snapshot.series("missing")) == 0
+    snapshot.close()
+    store.close()
+
+
+def test_recover_truncated_record(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_bytes=SEGMENT_BYTES)
+    ts, values = _points(10)
+    store.series("load").extend(ts, values)
+    store.close()
+    path = store.series("load").segments[-1].path
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    reopened = SegmentStore(str(tmp_path), segment_bytes=SEGMENT_BYTES)
+    np.testing.assert_array_equal(reopened.series("load").read()[0], ts)
+    reopened.close()
+
+
+def test_compact_merges_and_drops_old_segments(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_bytes=SEGMENT_BYTES)
+    series = store.series("load")
+    ts, values = _points(400)
+    for i in range(0, 400, 20):
+        series.extend(ts[i:i + 20], values[i:i + 20])
+        series._rotate()  # Segment nhỏ như sau nhiều lần khởi động lại.
+    store.flush()
+    before = len(series.segments)
+    _ = series.read()  # Giữ mapping mở trước khi gộp.
+
+    series.compact()
+    assert len(series.segments) < before
+    read_ts, read_values = series.read()
+    np.testing.assert_array_equal(read_ts, ts)
+    np.testing.assert_array_equal(read_values, values)
+
+    series.compact(min_ts=int(ts[200]))
+    read_ts, _ = series.read()
+    assert read_ts[0] > ts[0] and read_ts[-1] == ts[-1]
+    np.testing.assert_array_equal(read_ts, ts[-len(read_ts):])
+    store.close()